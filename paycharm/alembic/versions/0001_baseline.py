@@ -0,0 +1,75 @@
+"""baseline: orders, order_items, status_history
+
+Схема в том виде, в котором её создавал init_db (create_all).
+Для уже существующей базы достаточно `alembic stamp 0001_baseline`.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "orders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("delivery_address", sa.Text(), nullable=True),
+        sa.Column("contact_email", sa.String(), nullable=True),
+        sa.Column("contact_phone", sa.String(), nullable=True),
+        sa.Column("total_amount", sa.Numeric(12, 2), nullable=True),
+        sa.Column("expected_delivery_date", sa.DateTime(), nullable=True),
+        sa.Column("actual_delivery_date", sa.DateTime(), nullable=True),
+        sa.Column("source_message", sa.Text(), nullable=False),
+    )
+    op.create_index("ix_orders_id", "orders", ["id"])
+
+    op.create_table(
+        "order_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "order_id",
+            sa.Integer(),
+            sa.ForeignKey("orders.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("unit_price", sa.Numeric(12, 2), nullable=False),
+        sa.Column("line_amount", sa.Numeric(12, 2), nullable=False),
+    )
+    op.create_index("ix_order_items_id", "order_items", ["id"])
+
+    op.create_table(
+        "status_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "order_id",
+            sa.Integer(),
+            sa.ForeignKey("orders.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("old_status", sa.String(), nullable=True),
+        sa.Column("new_status", sa.String(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sa.Column("comment", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_status_history_id", "status_history", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("status_history")
+    op.drop_table("order_items")
+    op.drop_table("orders")
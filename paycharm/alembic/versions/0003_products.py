@@ -0,0 +1,56 @@
+"""products: каталог товаров + NOTIFY при изменениях
+
+Revision ID: 0003_products
+Revises: 0002_order_version
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_products"
+down_revision = "0002_order_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "products",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sku", sa.String(), nullable=False, unique=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("aliases", sa.JSON(), nullable=False, server_default="[]"),
+        sa.Column("price", sa.Numeric(12, 2), nullable=False),
+        sa.Column("stock_quantity", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_products_id", "products", ["id"])
+    op.create_index("ix_products_updated_at", "products", ["updated_at"])
+
+    # Любое изменение каталога -> NOTIFY product_catalog, кэши в процессах сбрасываются
+    op.execute(
+        """
+        CREATE FUNCTION notify_product_catalog() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('product_catalog', TG_OP);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_notify
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_product_catalog()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS products_notify ON products")
+    op.execute("DROP FUNCTION IF EXISTS notify_product_catalog()")
+    op.drop_table("products")
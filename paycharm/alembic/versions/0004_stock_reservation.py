@@ -0,0 +1,54 @@
+"""резерв остатков: order_items.sku, orders.stock_reserved
+
+Триггер NOTIFY на products больше не реагирует на изменение stock_quantity:
+резервы идут на каждый заказ и не должны сбрасывать кэш каталога.
+
+Revision ID: 0004_stock_reservation
+Revises: 0003_products
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_stock_reservation"
+down_revision = "0003_products"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("order_items", sa.Column("sku", sa.String(), nullable=True))
+    op.add_column(
+        "orders",
+        sa.Column("stock_reserved", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.create_check_constraint(
+        "ck_products_stock_non_negative", "products", "stock_quantity >= 0"
+    )
+
+    op.execute("DROP TRIGGER products_notify ON products")
+    op.execute(
+        """
+        CREATE TRIGGER products_notify
+        AFTER INSERT OR DELETE OR TRUNCATE OR UPDATE OF sku, name, aliases, price
+        ON products
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_product_catalog()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER products_notify ON products")
+    op.execute(
+        """
+        CREATE TRIGGER products_notify
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_product_catalog()
+        """
+    )
+    op.drop_constraint("ck_products_stock_non_negative", "products", type_="check")
+    op.drop_column("orders", "stock_reserved")
+    op.drop_column("order_items", "sku")
@@ -0,0 +1,43 @@
+"""intake_messages: очередь входящих сообщений Telegram
+
+Revision ID: 0005_intake_messages
+Revises: 0004_stock_reservation
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005_intake_messages"
+down_revision = "0004_stock_reservation"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "intake_messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("telegram_user_id", sa.BigInteger(), nullable=True),
+        sa.Column("telegram_chat_id", sa.BigInteger(), nullable=True),
+        sa.Column("telegram_message_id", sa.Integer(), nullable=True),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("visible_after", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("locked_by", sa.String(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("order_id", sa.Integer(), nullable=True),
+        sa.Column("reply_sent", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.create_index(
+        "ix_intake_messages_status_visible", "intake_messages", ["status", "visible_after"]
+    )
+    op.create_index("ix_intake_messages_user", "intake_messages", ["telegram_user_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_table("intake_messages")
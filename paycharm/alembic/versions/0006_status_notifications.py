@@ -0,0 +1,43 @@
+"""orders.telegram_*; status_notifications (outbox уведомлений о статусе)
+
+Revision ID: 0006_status_notifications
+Revises: 0005_intake_messages
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_status_notifications"
+down_revision = "0005_intake_messages"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("telegram_user_id", sa.BigInteger(), nullable=True))
+    op.add_column("orders", sa.Column("telegram_chat_id", sa.BigInteger(), nullable=True))
+    op.create_index("ix_orders_telegram_user_id", "orders", ["telegram_user_id"])
+
+    op.create_table(
+        "status_notifications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("chat_id", sa.BigInteger(), nullable=False),
+        sa.Column("old_status", sa.String(), nullable=True),
+        sa.Column("new_status", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_status_notifications_unsent", "status_notifications", ["sent_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("status_notifications")
+    op.drop_index("ix_orders_telegram_user_id", table_name="orders")
+    op.drop_column("orders", "telegram_chat_id")
+    op.drop_column("orders", "telegram_user_id")
@@ -0,0 +1,47 @@
+"""orders: NOTIFY orders_changed при создании/изменении/удалении заказа
+
+Revision ID: 0007_orders_notify
+Revises: 0006_status_notifications
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_orders_notify"
+down_revision = "0006_status_notifications"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # payload — id заказа: кэш админки сбрасывает /order <id> и статистику.
+    # DELETE тоже: архиватор (order_archive) удаляет заказы, их карточки устаревают.
+    # Одинаковые уведомления внутри транзакции PostgreSQL склеивает сам.
+    op.execute(
+        """
+        CREATE FUNCTION notify_orders_changed() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('orders_changed', OLD.id::text);
+            ELSE
+                PERFORM pg_notify('orders_changed', NEW.id::text);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER orders_notify
+        AFTER INSERT OR UPDATE OR DELETE ON orders
+        FOR EACH ROW EXECUTE FUNCTION notify_orders_changed()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS orders_notify ON orders")
+    op.execute("DROP FUNCTION IF EXISTS notify_orders_changed()")
@@ -0,0 +1,139 @@
+"""orders, status_history: помесячные RANGE-партиции по created_at / changed_at
+
+Revision ID: 0008_partition_orders
+Revises: 0007_orders_notify
+Create Date: 2026-10-19
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_partition_orders"
+down_revision = "0007_orders_notify"
+branch_labels = None
+depends_on = None
+
+# На сколько месяцев вперёд создаём партиции сразу; дальше —
+# python -m paycharm.app.services.partitions (см. app/services/partitions.py)
+MONTHS_AHEAD = 3
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition(table: str, column: str, extra_indexes: dict) -> None:
+    """
+    Пересоздаёт таблицу как партиционированную с теми же колонками и данными.
+    PK у партиционированной таблицы обязан включать ключ партиционирования,
+    поэтому он становится (id, column); последовательность id сохраняется.
+    """
+    bind = op.get_bind()
+    first = bind.execute(sa.text(f"SELECT min({column}) FROM {table}")).scalar() or date.today()
+    first = date(first.year, first.month, 1)
+    last = _add_months(date.today(), MONTHS_AHEAD)
+
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+    op.execute(
+        f"""
+        CREATE TABLE {table}_partitioned (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE ({column})
+        """
+    )
+    op.execute(f"ALTER TABLE {table}_partitioned ADD PRIMARY KEY (id, {column})")
+
+    month = first
+    while month <= last:
+        end = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {table}_partitioned "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        month = end
+    # Страховка, если обслуживание партиций не запускалось: строки не теряются,
+    # а при создании нужной партиции переносятся в неё
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table}_partitioned DEFAULT")
+
+    op.execute(f"INSERT INTO {table}_partitioned SELECT * FROM {table}")
+    # CASCADE снимает внешние ключи order_items/status_history на orders.id:
+    # на партиционированную таблицу ссылаться можно только по полному PK (id, created_at)
+    op.execute(f"DROP TABLE {table} CASCADE")
+    op.execute(f"ALTER TABLE {table}_partitioned RENAME TO {table}")
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_partitioned_pkey TO {table}_pkey")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+    op.create_index(f"ix_{table}_id", table, ["id"])
+    for name, columns in extra_indexes.items():
+        op.create_index(name, table, columns)
+
+
+def _unpartition(table: str, column: str, extra_indexes: dict) -> None:
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+    op.execute(f"CREATE TABLE {table}_plain (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    op.execute(f"INSERT INTO {table}_plain SELECT * FROM {table}")
+    # Партиции удаляются вместе с родителем; уже отсоединённые остаются как есть
+    op.execute(f"DROP TABLE {table} CASCADE")
+    op.execute(f"ALTER TABLE {table}_plain RENAME TO {table}")
+    op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+    op.create_index(f"ix_{table}_id", table, ["id"])
+    for name, columns in extra_indexes.items():
+        op.create_index(name, table, columns)
+
+
+ORDERS_INDEXES = {
+    "ix_orders_telegram_user_id": ["telegram_user_id"],
+    "ix_orders_created_at": ["created_at"],
+}
+STATUS_HISTORY_INDEXES = {
+    "ix_status_history_order_id": ["order_id"],
+}
+
+
+def upgrade() -> None:
+    _partition("orders", "created_at", ORDERS_INDEXES)
+    _partition("status_history", "changed_at", STATUS_HISTORY_INDEXES)
+
+    # Без внешнего ключа позиции ищутся только по этому индексу
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id"])
+
+    # Триггер 0007 удалён вместе со старой таблицей
+    op.execute(
+        """
+        CREATE TRIGGER orders_notify
+        AFTER INSERT OR UPDATE OR DELETE ON orders
+        FOR EACH ROW EXECUTE FUNCTION notify_orders_changed()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_order_items_order_id", table_name="order_items")
+
+    _unpartition("orders", "created_at", {"ix_orders_telegram_user_id": ["telegram_user_id"]})
+    _unpartition("status_history", "changed_at", {})
+
+    # Позиции и история заказов, отсоединённых обслуживанием партиций,
+    # не дадут вернуть внешние ключи — их удаляем
+    op.execute("DELETE FROM order_items WHERE order_id NOT IN (SELECT id FROM orders)")
+    op.execute("DELETE FROM status_history WHERE order_id NOT IN (SELECT id FROM orders)")
+    op.create_foreign_key(
+        "order_items_order_id_fkey", "order_items", "orders", ["order_id"], ["id"], ondelete="CASCADE"
+    )
+    op.create_foreign_key(
+        "status_history_order_id_fkey", "status_history", "orders", ["order_id"], ["id"], ondelete="CASCADE"
+    )
+
+    op.execute(
+        """
+        CREATE TRIGGER orders_notify
+        AFTER INSERT OR UPDATE OR DELETE ON orders
+        FOR EACH ROW EXECUTE FUNCTION notify_orders_changed()
+        """
+    )
@@ -0,0 +1,90 @@
+"""order_raw_messages: исходный текст заказа и ответ модели отдельно от orders, в zstd
+
+Revision ID: 0009_order_raw_messages
+Revises: 0008_partition_orders
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from paycharm.app.utils.compression import compress_text, decompress_text
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_order_raw_messages"
+down_revision = "0008_partition_orders"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_raw_messages",
+        sa.Column("order_id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("source_message", sa.LargeBinary(), nullable=False),
+        sa.Column("llm_response", sa.LargeBinary(), nullable=True),
+    )
+
+    # Сжимать умеет только Python — переносим пачками по id
+    bind = op.get_bind()
+    raw = sa.table(
+        "order_raw_messages",
+        sa.column("order_id", sa.Integer()),
+        sa.column("created_at", sa.DateTime()),
+        sa.column("source_message", sa.LargeBinary()),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, created_at, source_message FROM orders "
+                "WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            raw.insert(),
+            [
+                {
+                    "order_id": row.id,
+                    "created_at": row.created_at,
+                    "source_message": compress_text(row.source_message),
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    op.drop_column("orders", "source_message")
+
+
+def downgrade() -> None:
+    op.add_column("orders", sa.Column("source_message", sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT order_id, source_message FROM order_raw_messages "
+                "WHERE order_id > :last_id ORDER BY order_id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("UPDATE orders SET source_message = :text WHERE id = :id"),
+            [{"id": row.order_id, "text": decompress_text(row.source_message)} for row in rows],
+        )
+        last_id = rows[-1].order_id
+
+    op.execute("UPDATE orders SET source_message = '' WHERE source_message IS NULL")
+    op.alter_column("orders", "source_message", nullable=False)
+    op.drop_table("order_raw_messages")
@@ -0,0 +1,27 @@
+"""intake_messages.ack_message_id: ответ "обрабатываем", который потом редактируется итогом
+
+Revision ID: 0010_intake_ack_message
+Revises: 0009_order_raw_messages
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0010_intake_ack_message"
+down_revision = "0009_order_raw_messages"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "intake_messages",
+        sa.Column("ack_message_id", sa.Integer(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("intake_messages", "ack_message_id")
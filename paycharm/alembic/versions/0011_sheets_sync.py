@@ -0,0 +1,66 @@
+"""sync_state, sheet_rows и индекс orders(updated_at, id) для синхронизации с Google Sheets
+
+Revision ID: 0011_sheets_sync
+Revises: 0010_intake_ack_message
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0011_sheets_sync"
+down_revision = "0010_intake_ack_message"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_state",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("watermark", sa.DateTime(), nullable=True),
+        sa.Column("watermark_id", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+    )
+    op.create_table(
+        "sheet_rows",
+        sa.Column("order_id", sa.Integer(), primary_key=True),
+        sa.Column("row_number", sa.Integer(), nullable=False),
+        sa.Column("row_hash", sa.String(32), nullable=False),
+        sa.Column("synced_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+    )
+
+    op.execute("UPDATE orders SET updated_at = created_at WHERE updated_at IS NULL")
+    op.create_index("ix_orders_updated_at", "orders", ["updated_at", "id"])
+
+    # UPDATE мимо ORM (скрипты, ручные правки) тоже двигает updated_at;
+    # если значение задали явно (ORM), оставляем его
+    op.execute(
+        """
+        CREATE FUNCTION touch_orders_updated_at() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+                NEW.updated_at := timezone('utc', clock_timestamp());
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER orders_touch_updated_at
+        BEFORE UPDATE ON orders
+        FOR EACH ROW EXECUTE FUNCTION touch_orders_updated_at()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS orders_touch_updated_at ON orders")
+    op.execute("DROP FUNCTION IF EXISTS touch_orders_updated_at()")
+    op.drop_index("ix_orders_updated_at", table_name="orders")
+    op.drop_table("sheet_rows")
+    op.drop_table("sync_state")
@@ -0,0 +1,31 @@
+"""sheet_rows.worksheet: заказы в Google Sheets разложены по листам месяцев
+
+Revision ID: 0012_sheet_rows_worksheet
+Revises: 0011_sheets_sync
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0012_sheet_rows_worksheet"
+down_revision = "0011_sheets_sync"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("sheet_rows", sa.Column("worksheet", sa.String(), nullable=True))
+    # Кэш позиций без названия листа: сбрасываем его вместе с водяным знаком,
+    # следующий цикл sheets_sync заново найдёт строки по колонке Order ID
+    # (с GOOGLE_SHEETS_WORKSHEET_FORMAT = "" — на первом листе, как и раньше)
+    op.execute("DELETE FROM sheet_rows")
+    op.execute("DELETE FROM sync_state WHERE name = 'google_sheets'")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM sheet_rows")
+    op.execute("DELETE FROM sync_state WHERE name = 'google_sheets'")
+    op.drop_column("sheet_rows", "worksheet")
@@ -0,0 +1,49 @@
+"""orders.contact_email_norm / contact_phone_norm с индексами для поиска клиента
+
+Revision ID: 0013_order_contact_norm
+Revises: 0012_sheet_rows_worksheet
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0013_order_contact_norm"
+down_revision = "0012_sheet_rows_worksheet"
+branch_labels = None
+depends_on = None
+
+# Цифры телефона; нормализация та же, что в validation.normalize_phone
+_DIGITS = r"regexp_replace(contact_phone, '\D', '', 'g')"
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("contact_email_norm", sa.String(), nullable=True))
+    op.add_column("orders", sa.Column("contact_phone_norm", sa.String(), nullable=True))
+
+    # Заполнение — не изменение заказа: без NOTIFY и без сдвига updated_at
+    op.execute("ALTER TABLE orders DISABLE TRIGGER USER")
+    op.execute(
+        f"""
+        UPDATE orders SET
+            contact_email_norm = NULLIF(lower(btrim(contact_email)), ''),
+            contact_phone_norm = CASE
+                WHEN {_DIGITS} ~ '^[78][0-9]{{10}}$' THEN '+7' || substr({_DIGITS}, 2)
+                WHEN {_DIGITS} ~ '^[0-9]{{10}}$' THEN '+7' || {_DIGITS}
+            END
+        WHERE contact_email IS NOT NULL OR contact_phone IS NOT NULL
+        """
+    )
+    op.execute("ALTER TABLE orders ENABLE TRIGGER USER")
+
+    op.create_index("ix_orders_contact_email_norm", "orders", ["contact_email_norm", "created_at"])
+    op.create_index("ix_orders_contact_phone_norm", "orders", ["contact_phone_norm", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_contact_phone_norm", table_name="orders")
+    op.drop_index("ix_orders_contact_email_norm", table_name="orders")
+    op.drop_column("orders", "contact_phone_norm")
+    op.drop_column("orders", "contact_email_norm")
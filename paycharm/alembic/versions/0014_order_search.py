@@ -0,0 +1,66 @@
+"""pg_trgm GIN-индексы для /find: адрес, товары и нормализованный исходный текст
+
+Revision ID: 0014_order_search
+Revises: 0013_order_contact_norm
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from paycharm.app.services.order_queries import raw_search_text
+from paycharm.app.utils.compression import decompress_text
+
+
+# revision identifiers, used by Alembic.
+revision = "0014_order_search"
+down_revision = "0013_order_contact_norm"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column("order_raw_messages", sa.Column("search_text", sa.Text(), nullable=True))
+
+    # Распаковать умеет только Python — заполняем пачками по order_id
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT order_id, source_message FROM order_raw_messages "
+                "WHERE order_id > :last_id ORDER BY order_id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("UPDATE order_raw_messages SET search_text = :text WHERE order_id = :id"),
+            [{"id": row.order_id, "text": raw_search_text(decompress_text(row.source_message))} for row in rows],
+        )
+        last_id = rows[-1].order_id
+
+    op.execute(
+        "CREATE INDEX ix_orders_delivery_address_trgm ON orders "
+        "USING gin (delivery_address gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_order_items_name_trgm ON order_items "
+        "USING gin (name gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_order_raw_messages_search_trgm ON order_raw_messages "
+        "USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_order_raw_messages_search_trgm", table_name="order_raw_messages")
+    op.drop_index("ix_order_items_name_trgm", table_name="order_items")
+    op.drop_index("ix_orders_delivery_address_trgm", table_name="orders")
+    op.drop_column("order_raw_messages", "search_text")
+    # Расширение не удаляем: им могут пользоваться и другие объекты базы
@@ -0,0 +1,41 @@
+"""order_raw_messages.intake_message_id: не больше одного заказа на сообщение очереди
+
+Revision ID: 0015_intake_order_unique
+Revises: 0014_order_search
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0015_intake_order_unique"
+down_revision = "0014_order_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("order_raw_messages", sa.Column("intake_message_id", sa.Integer(), nullable=True))
+
+    # Уже обработанные сообщения: связь известна из intake_messages.order_id.
+    # Если сообщение успело создать дубль, привязываем только заказ из order_id
+    op.execute(
+        """
+        UPDATE order_raw_messages r SET intake_message_id = m.id
+        FROM intake_messages m
+        WHERE m.order_id = r.order_id
+        """
+    )
+    op.create_index(
+        "ux_order_raw_messages_intake",
+        "order_raw_messages",
+        ["intake_message_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_order_raw_messages_intake", table_name="order_raw_messages")
+    op.drop_column("order_raw_messages", "intake_message_id")
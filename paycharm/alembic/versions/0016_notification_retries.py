@@ -0,0 +1,31 @@
+"""status_notifications.attempts / retry_after / last_error: повтор временных ошибок отправки
+
+Revision ID: 0016_notification_retries
+Revises: 0015_intake_order_unique
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0016_notification_retries"
+down_revision = "0015_intake_order_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "status_notifications",
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("status_notifications", sa.Column("retry_after", sa.DateTime(), nullable=True))
+    op.add_column("status_notifications", sa.Column("last_error", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("status_notifications", "last_error")
+    op.drop_column("status_notifications", "retry_after")
+    op.drop_column("status_notifications", "attempts")
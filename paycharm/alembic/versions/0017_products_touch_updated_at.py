@@ -0,0 +1,48 @@
+"""products: триггер сдвигает updated_at при правке sku/name/aliases/price мимо ORM
+
+Revision ID: 0017_products_touch_updated_at
+Revises: 0016_notification_retries
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0017_products_touch_updated_at"
+down_revision = "0016_notification_retries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Версия кэша каталога — (count, max(updated_at)): UPDATE products SET price = ...
+    # из psql должен её менять, иначе процессы без NOTIFY (TTL) не перечитают каталог.
+    # Остатки (stock_service) триггер не трогает: их UPDATE не задевает эти колонки.
+    # Если updated_at задали явно (ORM), оставляем его
+    op.execute(
+        """
+        CREATE FUNCTION touch_products_updated_at() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at
+               AND (NEW.sku, NEW.name, NEW.aliases::jsonb, NEW.price)
+                   IS DISTINCT FROM (OLD.sku, OLD.name, OLD.aliases::jsonb, OLD.price) THEN
+                NEW.updated_at := timezone('utc', clock_timestamp());
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER products_touch_updated_at
+        BEFORE UPDATE OF sku, name, aliases, price ON products
+        FOR EACH ROW EXECUTE FUNCTION touch_products_updated_at()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS products_touch_updated_at ON products")
+    op.execute("DROP FUNCTION IF EXISTS touch_products_updated_at()")
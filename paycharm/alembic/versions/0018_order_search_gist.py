@@ -0,0 +1,37 @@
+"""pg_trgm: GIN-индексы /find заменены на GiST для ORDER BY по расстоянию (KNN)
+
+Revision ID: 0018_order_search_gist
+Revises: 0017_products_touch_updated_at
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0018_order_search_gist"
+down_revision = "0017_products_touch_updated_at"
+branch_labels = None
+depends_on = None
+
+# (индекс, таблица, колонка)
+SEARCH_INDEXES = (
+    ("ix_orders_delivery_address_trgm", "orders", "delivery_address"),
+    ("ix_order_items_name_trgm", "order_items", "name"),
+    ("ix_order_raw_messages_search_trgm", "order_raw_messages", "search_text"),
+)
+
+
+def upgrade() -> None:
+    # GIN находит совпадения ILIKE, но лучшие из них приходится сортировать
+    # целиком (частое "москва" — сотни тысяч строк). GiST отвечает и на ILIKE,
+    # и на ORDER BY query <<-> col LIMIT n, отдавая строки сразу по сходству
+    for name, table, column in SEARCH_INDEXES:
+        op.drop_index(name, table_name=table)
+        op.execute(f"CREATE INDEX {name} ON {table} USING gist ({column} gist_trgm_ops)")
+
+
+def downgrade() -> None:
+    for name, table, column in SEARCH_INDEXES:
+        op.drop_index(name, table_name=table)
+        op.execute(f"CREATE INDEX {name} ON {table} USING gin ({column} gin_trgm_ops)")
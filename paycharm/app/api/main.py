@@ -0,0 +1,182 @@
+# paycharm/app/api/main.py
+"""
+HTTP-приём заказов (сайт, маркетплейсы) поверх того же order_service.
+
+Обработчики асинхронные, вся работа с БД и моделью уходит в threadpool,
+состояния в процессе нет — можно запускать несколько воркеров:
+
+    uvicorn paycharm.app.api.main:app --workers 4
+
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Dict
+
+from fastapi import BackgroundTasks, FastAPI, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from paycharm.app.config import settings
+from paycharm.app.database import get_db
+from paycharm.app.schemas import (
+    OrderAccepted,
+    OrderJsonIn,
+    OrderStatusRead,
+    OrderStatusUpdate,
+    OrderTextIn,
+    OrderWithItemsRead,
+)
+from paycharm.app.services.order_service import (
+    InvalidStatusTransition,
+    OrderConcurrencyError,
+    complete_received_order,
+    create_order_from_parsed,
+    create_order_from_text,
+    get_order_by_id,
+    register_order_text,
+    set_order_status,
+)
+from paycharm.app.utils.enums import OrderStatus
+
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="paycharm orders API")
+
+
+async def _in_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполнить func(db, ...) в threadpool с отдельной сессией.
+    func должна вернуть уже готовый ответ (схему), а не ORM-объект:
+    после закрытия сессии ленивые связи не загрузятся.
+    """
+
+    def call():
+        with get_db() as db:
+            return func(db, *args, **kwargs)
+
+    return await run_in_threadpool(call)
+
+
+def _order_read(order) -> OrderWithItemsRead:
+    return OrderWithItemsRead.model_validate(order)
+
+
+def _complete_in_background(order_id: int) -> None:
+    with get_db() as db:
+        try:
+            complete_received_order(db, order_id)
+        except Exception as e:
+            logger.exception("Ошибка фонового разбора заказа #%s: %s", order_id, e)
+
+
+# ==========================
+#  Приём заказов
+# ==========================
+
+@app.post("/orders/text", response_model=OrderWithItemsRead, status_code=status.HTTP_201_CREATED)
+async def create_order_text(payload: OrderTextIn, background_tasks: BackgroundTasks):
+    """
+    Заказ свободным текстом. С defer=true — 202 и номер заказа сразу,
+    разбор моделью идёт в фоне (статус можно смотреть в /orders/{id}/status).
+    Фоновая задача живёт в процессе API: заказы, которые она не успела
+    разобрать (перезапуск), дочищает app/services/deferred_parse.py по cron.
+    """
+    if payload.defer:
+        order_id = await _in_db(lambda db: register_order_text(db, payload.text).id)
+        background_tasks.add_task(_complete_in_background, order_id)
+        accepted = OrderAccepted(order_id=order_id, status=OrderStatus.RECEIVED)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=accepted.model_dump(mode="json"),
+            background=background_tasks,
+        )
+
+    try:
+        return await _in_db(lambda db: _order_read(create_order_from_text(db, payload.text)))
+    except (RuntimeError, ValueError) as e:
+        logger.exception("Не удалось разобрать заказ: %s", e)
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "Не удалось разобрать текст заказа")
+
+
+@app.post("/orders", response_model=OrderWithItemsRead, status_code=status.HTTP_201_CREATED)
+async def create_order_json(payload: OrderJsonIn):
+    """
+    Заказ уже в структурированном виде (сайт/маркетплейс) — без модели.
+    """
+    parsed: Dict[str, Any] = payload.model_dump()
+    raw_text = payload.source_message or payload.model_dump_json()
+
+    return await _in_db(
+        lambda db: _order_read(
+            create_order_from_parsed(
+                db,
+                parsed,
+                raw_text=raw_text,
+                comment="Order created via HTTP API",
+            )
+        )
+    )
+
+
+# ==========================
+#  Просмотр и статусы
+# ==========================
+
+@app.get("/orders/{order_id}", response_model=OrderWithItemsRead)
+async def get_order(order_id: int):
+    def load(db):
+        order = get_order_by_id(db, order_id)
+        return _order_read(order) if order else None
+
+    result = await _in_db(load)
+    if result is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Заказ #{order_id} не найден")
+    return result
+
+
+@app.get("/orders/{order_id}/status", response_model=OrderStatusRead)
+async def get_order_status(order_id: int):
+    def load(db):
+        order = get_order_by_id(db, order_id)
+        if not order:
+            return None
+        return OrderStatusRead(order_id=order.id, status=order.status, updated_at=order.updated_at)
+
+    result = await _in_db(load)
+    if result is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Заказ #{order_id} не найден")
+    return result
+
+
+@app.post("/orders/{order_id}/status", response_model=OrderStatusRead)
+async def update_order_status(order_id: int, payload: OrderStatusUpdate):
+    def change(db):
+        order = set_order_status(
+            db=db,
+            order_id=order_id,
+            new_status=payload.status.value,
+            expected_delivery_date=payload.expected_delivery_date,
+        )
+        return OrderStatusRead(order_id=order.id, status=order.status, updated_at=order.updated_at)
+
+    try:
+        return await _in_db(change)
+    except OrderConcurrencyError as e:
+        raise HTTPException(status.HTTP_409_CONFLICT, str(e))
+    except InvalidStatusTransition as e:
+        raise HTTPException(status.HTTP_409_CONFLICT, str(e))
+    except ValueError as e:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(e))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "paycharm.app.api.main:app",
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        workers=settings.API_WORKERS,
+    )
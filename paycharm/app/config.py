@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -23,8 +23,11 @@ class Settings(BaseSettings):
     # Ключ для Google Gemini (gmini)
     AI_KEY: Optional[str] = None
 
-    # Можно вынести имя модели в конфиг, чтобы не хардкодить в ai_parser
+    # Модель должна поддерживать response_schema и system instruction
     GEMINI_MODEL: str = "gemini-1.5-flash"
+    # Держать инструкцию и каталог в кэше контекста Gemini (если модель и размер позволяют)
+    GEMINI_CONTEXT_CACHE: bool = True
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS: int = 3600
 
     # === Telegram (боты / kurigram) ===
     TELEGRAM_USER_BOT_TOKEN: Optional[str] = None
@@ -37,6 +40,21 @@ class Settings(BaseSettings):
     # === Google Sheets ===
     GOOGLE_SHEETS_CREDENTIALS_PATH: Optional[str] = None
     GOOGLE_SHEETS_SPREADSHEET_ID: Optional[str] = None
+    # Заказы пишутся на лист месяца создания (strftime по created_at, например "Orders %Y-%m"),
+    # листы создаются сами. Пустая строка — всё на первый лист, как раньше.
+    # Включать только для новой таблицы: строки, уже лежащие на первом листе, на листах
+    # месяцев не найдутся и будут дописаны туда второй раз (переноса старых строк нет)
+    GOOGLE_SHEETS_WORKSHEET_FORMAT: str = ""
+    # Синхронизация изменённых заказов в таблицу (app/integrations/sheets_sync.py).
+    # True — синхронизация запущена и пишет в таблицу одна: прямые записи
+    # (append_order_to_sheet и др.) отключаются, иначе заказ мог попасть в таблицу дважды
+    SHEETS_SYNC_ENABLED: bool = False
+    SHEETS_SYNC_INTERVAL_SECONDS: float = 60.0
+    # Заказов на один batch_update
+    SHEETS_SYNC_BATCH_SIZE: int = 500
+    # Заказы, изменённые за последние столько секунд, перечитываются каждый цикл:
+    # транзакция могла закоммитить более раннюю updated_at уже после прошлого цикла
+    SHEETS_SYNC_OVERLAP_SECONDS: int = 120
 
     # === Email (SMTP) ===
     SMTP_HOST: Optional[str] = None
@@ -45,6 +63,88 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     ORDER_NOTIFICATION_EMAIL: Optional[str] = None
 
+    # === HTTP API (app/api/main.py) ===
+    API_HOST: str = "0.0.0.0"
+    API_PORT: int = 8000
+    API_WORKERS: int = 1
+    # Отложенный разбор (defer=true): заказы, не разобранные фоновой задачей
+    # (процесс API перезапустился), дочищает app/services/deferred_parse.py
+    DEFERRED_PARSE_STALE_SECONDS: int = 300
+    # Сколько раз пробовать разобрать заказ, прежде чем оставить его в PARSE_FAILED
+    DEFERRED_PARSE_MAX_ATTEMPTS: int = 3
+
+    # === Логи ботов (app/utils/logging_config.py) ===
+    LOG_LEVEL: str = "INFO"
+    # JSON по строке на запись; False — обычный текст
+    LOG_JSON: bool = True
+    # Длиннее — обрезаем (тексты клиентов целиком в логи не нужны)
+    LOG_MAX_MESSAGE_CHARS: int = 500
+    # Записей в очереди на вывод; при переполнении новые отбрасываются
+    LOG_QUEUE_SIZE: int = 10000
+    # Доля записей ниже WARNING, которая пишется для шумных логгеров (и их потомков)
+    LOG_SAMPLE_RATES: Dict[str, float] = {"paycharm.tg.manager_listener.messages": 0.1}
+
+    # === Слушатель аккаунта менеджера ===
+    # Сколько клиентов обрабатываем одновременно
+    LISTENER_MAX_CONCURRENCY: int = 32
+    # Сколько необработанных сообщений одного клиента держим в очереди
+    LISTENER_MAX_QUEUE_PER_USER: int = 20
+    # Через сколько секунд простоя очередь клиента удаляется
+    LISTENER_IDLE_USER_SECONDS: float = 60.0
+    # Сколько секунд тишины в чате ждём, прежде чем разбирать пачку сообщений
+    CONVERSATION_DEBOUNCE_SECONDS: float = 3.0
+    # Сколько живёт недособранный заказ (нет адреса/контактов) и сколько таких чатов помним
+    CONVERSATION_TTL_SECONDS: int = 1800
+    CONVERSATION_MAX_CHATS: int = 10000
+    # После стольких сообщений создаём заказ с тем, что есть (контакты уточнит менеджер)
+    CONVERSATION_MAX_MESSAGES: int = 6
+    # Столько вызовов модели на один недособранный заказ, не больше. Если к этому
+    # моменту (или к CONVERSATION_MAX_MESSAGES) товаров так и нет — переписку забываем
+    CONVERSATION_MAX_MODEL_CALLS: int = 4
+
+    # === Админ-бот ===
+    # Сколько секунд живут закэшированные ответы /stats и /order
+    # (изменения заказов сбрасывают кэш сразу, TTL — страховка)
+    ADMIN_CACHE_TTL_SECONDS: float = 30.0
+    ADMIN_CACHE_MAX_ENTRIES: int = 1000
+
+    # === Очередь входящих сообщений (intake_messages) ===
+    # True — слушатель только кладёт сообщения в очередь, заказы создают воркеры
+    INTAKE_QUEUE_ENABLED: bool = False
+    INTAKE_WORKERS: int = 4
+    # Через сколько секунд сообщение упавшего воркера снова станет доступно
+    INTAKE_VISIBILITY_TIMEOUT_SECONDS: int = 120
+    # После стольких неудачных попыток сообщение уходит в dead letter
+    INTAKE_MAX_ATTEMPTS: int = 5
+
+    # === Уведомления клиентам о смене статуса (telegram_notify) ===
+    NOTIFY_GLOBAL_RATE_PER_SECOND: float = 20.0
+    NOTIFY_PER_CHAT_INTERVAL_SECONDS: float = 1.0
+    # Смены статуса одного заказа в пределах окна склеиваются в одно сообщение
+    NOTIFY_MERGE_WINDOW_SECONDS: float = 5.0
+    # Временные ошибки отправки повторяются с растущей задержкой, потом событие бросаем
+    NOTIFY_MAX_ATTEMPTS: int = 5
+
+    # === Каталог товаров ===
+    # Как часто (сек) сверять версию кэша каталога с таблицей products.
+    # Изменения через LISTEN/NOTIFY подхватываются сразу, TTL — страховка.
+    PRODUCT_CATALOG_TTL_SECONDS: int = 60
+    # Минимальная оценка нечёткого совпадения (0..1), ниже — товар "неоднозначный"
+    PRODUCT_MATCH_THRESHOLD: float = 0.6
+
+    # === Партиции orders / status_history (app/services/partitions.py) ===
+    # На сколько месяцев вперёд заранее создаём партиции
+    PARTITION_MONTHS_AHEAD: int = 3
+    # Партиции старше стольких месяцев отсоединяются от основной таблицы
+    PARTITION_KEEP_MONTHS: int = 24
+
+    # === Холодный архив заказов (app/services/order_archive.py) ===
+    # Каталог с Parquet-файлами; метрики читают его вместе с базой
+    ARCHIVE_DIR: str = "archive"
+    # Закрытые заказы старше стольких месяцев уходят из базы в архив
+    # (меньше PARTITION_KEEP_MONTHS: архивируем раньше, чем партиция отсоединится)
+    ARCHIVE_AFTER_MONTHS: int = 12
+
 
 settings = Settings()
 
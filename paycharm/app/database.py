@@ -2,28 +2,58 @@
 
 from __future__ import annotations
 
+import logging
+import select
+import threading
 from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Optional
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from paycharm.app.config import settings
 
 
-# Создаём engine для подключения к PostgreSQL
-engine = create_engine(
-    settings.DATABASE_URL,  # теперь это обычная строка из .env
-    future=True,
-    echo=False,             # можно True, если хочешь видеть SQL-запросы
-)
+logger = logging.getLogger(__name__)
 
-# Фабрика сессий
-SessionLocal = sessionmaker(
-    bind=engine,
-    autoflush=False,
-    autocommit=False,
-    future=True,
-)
+
+# engine и фабрика сессий создаются при первом обращении, а не при импорте:
+# модули можно импортировать без драйвера БД и до настройки окружения
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    return create_engine(
+        settings.DATABASE_URL,  # теперь это обычная строка из .env
+        future=True,
+        echo=False,             # можно True, если хочешь видеть SQL-запросы
+    )
+
+
+@lru_cache(maxsize=None)
+def get_sessionmaker() -> sessionmaker:
+    return sessionmaker(
+        bind=get_engine(),
+        autoflush=False,
+        autocommit=False,
+        future=True,
+    )
+
+
+def new_session() -> Session:
+    """
+    Новая сессия БД. Закрыть должен вызывающий (или используйте get_db).
+    """
+    return get_sessionmaker()()
+
+
+def __getattr__(name: str):
+    # Совместимость со старым кодом: database.engine / database.SessionLocal
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @contextmanager
@@ -39,8 +69,54 @@ def get_db():
             db.query(...)
 
     """
-    db = SessionLocal()
+    db = new_session()
     try:
         yield db
     finally:
         db.close()
+
+
+def listen(
+    channel: str,
+    callback: Callable[[str], None],
+    stop_event: Optional[threading.Event] = None,
+    poll_timeout: float = 5.0,
+) -> threading.Thread:
+    """
+    Подписка на PostgreSQL LISTEN/NOTIFY в фоновом потоке.
+
+    callback(payload) вызывается из потока-слушателя на каждое уведомление
+    в канале channel. Поток демонический; остановить можно через stop_event.
+
+        listen("product_catalog", lambda payload: cache.invalidate())
+
+    """
+    stop_event = stop_event or threading.Event()
+
+    def _run() -> None:
+        raw = get_engine().raw_connection()
+        try:
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN "{channel}"')
+
+            while not stop_event.is_set():
+                ready, _, _ = select.select([conn], [], [], poll_timeout)
+                if not ready:
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        callback(notify.payload)
+                    except Exception:
+                        logger.exception("Ошибка в обработчике NOTIFY %s", channel)
+        except Exception:
+            logger.exception("Слушатель LISTEN %s остановлен из-за ошибки", channel)
+        finally:
+            raw.close()
+
+    thread = threading.Thread(target=_run, name=f"pg-listen-{channel}", daemon=True)
+    thread.start()
+    return thread
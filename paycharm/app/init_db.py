@@ -3,19 +3,30 @@
 from __future__ import annotations
 
 from paycharm.app.config import settings
-from paycharm.app.database import engine
+from paycharm.app.database import get_engine, new_session
 from paycharm.app.models import Base
+from paycharm.app.services.catalog_service import seed_products
 
 
 def init_db() -> None:
     """
     Создаёт все таблицы в базе данных, используя SQLAlchemy.
-    Без Alembic, просто create_all().
+    Без Alembic, просто create_all() — удобно для локальной/тестовой базы.
+
+    Существующую базу обновляем миграциями:
+        alembic -c paycharm/alembic.ini upgrade head
     """
     print(f"Подключаемся к базе: {settings.DATABASE_URL}")
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
     print("✅ Таблицы созданы (если их не было).")
 
+    db = new_session()
+    try:
+        added = seed_products(db)
+    finally:
+        db.close()
+    print(f"✅ Стартовый каталог: добавлено товаров — {added}.")
+
 
 if __name__ == "__main__":
     init_db()
@@ -1,32 +1,15 @@
 # paycharm/app/integrations/email_service.py
 from __future__ import annotations
 
-import smtplib
-import ssl
-from email.message import EmailMessage
-from typing import List, Tuple, Optional
+from typing import Sequence
 
 from paycharm.app.config import settings
-from paycharm.app.database import SessionLocal
-from paycharm.app.models import Order, OrderItem
+from paycharm.app.database import get_db
+from paycharm.app.read_models import OrderItemView, OrderWithItems
+from paycharm.app.services.order_queries import get_order_with_items
 
 
-def _get_order_with_items(order_id: int) -> Tuple[Optional[Order], List[OrderItem]]:
-    """
-    Вытаскиваем заказ и его позиции по ID из БД.
-    """
-    db = SessionLocal()
-    try:
-        order = db.query(Order).filter(Order.id == order_id).first()
-        if not order:
-            return None, []
-        items = list(order.items)
-        return order, items
-    finally:
-        db.close()
-
-
-def _items_to_text(items: List[OrderItem]) -> str:
+def _items_to_text(items: Sequence[OrderItemView]) -> str:
     """
     Человекочитаемый список товаров для письма.
     """
@@ -40,13 +23,18 @@ def _items_to_text(items: List[OrderItem]) -> str:
     return "\n".join(lines)
 
 
-def send_order_notification_email(order: Order) -> None:
+def send_order_notification_email(order: OrderWithItems) -> None:
     """
     Основная функция: отправляет письмо админу/менеджеру
-    о создании нового заказа, когда у нас уже есть объект Order.
+    о создании нового заказа, когда у нас уже есть заказ.
     ЭТО ТА ФУНКЦИЯ, КОТОРУЮ ИМПОРТИРУЕТ manager_listener.
     """
-    items: List[OrderItem] = list(getattr(order, "items", []))
+    # smtplib/ssl/email нужны только при отправке — не тянем их при импорте
+    import smtplib
+    import ssl
+    from email.message import EmailMessage
+
+    items = order.items
 
     total = float(order.total_amount or 0)
 
@@ -85,7 +73,8 @@ def send_new_order_notification(order_id: int) -> None:
     Старая функция-обёртка для обратной совместимости:
     принимает order_id, достаёт заказ из БД и вызывает send_order_notification_email.
     """
-    order, _ = _get_order_with_items(order_id)
+    with get_db() as db:
+        order = get_order_with_items(db, order_id)
     if not order:
         return
 
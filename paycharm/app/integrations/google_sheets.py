@@ -1,30 +1,83 @@
 # paycharm/app/integrations/google_sheets.py
 from __future__ import annotations
 
+import threading
 from datetime import datetime
-from typing import Optional, List
-
-import gspread
-from google.oauth2.service_account import Credentials
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence
 
 from paycharm.app.config import settings
-from paycharm.app.database import SessionLocal
-from paycharm.app.models import Order, OrderItem
+from paycharm.app.database import get_db
+from paycharm.app.read_models import OrderItemView, OrderWithItems
+from paycharm.app.services.order_queries import get_order_with_items
 
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
+# Сколько строк у нового листа сразу (дальше append расширяет сам)
+NEW_SHEET_ROWS = 1000
+
+# Открытые листы процесса с проверенным заголовком: {название: worksheet}
+_worksheets: Dict[Optional[str], Any] = {}
+_worksheets_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_spreadsheet():
+    # gspread и google-auth тяжёлые — импортируем только когда реально пишем в таблицу
+    import gspread
+    from google.oauth2.service_account import Credentials
 
-def _get_sheet():
     creds = Credentials.from_service_account_file(
         settings.GOOGLE_SHEETS_CREDENTIALS_PATH,
         scopes=SCOPES,
     )
     client = gspread.authorize(creds)
-    spreadsheet = client.open_by_key(settings.GOOGLE_SHEETS_SPREADSHEET_ID)
-    # Для простоты — первый лист
-    sheet = spreadsheet.sheet1
-    return sheet
+    return client.open_by_key(settings.GOOGLE_SHEETS_SPREADSHEET_ID)
+
+
+def worksheet_title(created_at: Optional[datetime]) -> Optional[str]:
+    """
+    Название листа для заказа: по месяцу создания (GOOGLE_SHEETS_WORKSHEET_FORMAT).
+    None — ротация выключена, всё пишется на первый лист.
+    """
+    fmt = settings.GOOGLE_SHEETS_WORKSHEET_FORMAT
+    if not fmt:
+        return None
+    return (created_at or datetime.utcnow()).strftime(fmt)
+
+
+def get_sheet(created_at: Optional[datetime] = None):
+    """
+    Лист, на котором лежит заказ, созданный в created_at. Нет листа — создаётся
+    с заголовком. Каждый лист хранит один месяц, поэтому поиск строки и
+    дописывание не замедляются с ростом всей таблицы.
+    """
+    title = worksheet_title(created_at)
+    with _worksheets_lock:
+        sheet = _worksheets.get(title)
+        if sheet is None:
+            sheet = _open_worksheet(title)
+            ensure_header(sheet)
+            _worksheets[title] = sheet
+        return sheet
+
+
+def _open_worksheet(title: Optional[str]):
+    import gspread
+
+    spreadsheet = get_spreadsheet()
+    if title is None:
+        return spreadsheet.sheet1
+    try:
+        return spreadsheet.worksheet(title)
+    except gspread.WorksheetNotFound:
+        pass
+    try:
+        return spreadsheet.add_worksheet(title=title, rows=NEW_SHEET_ROWS, cols=len(HEADER))
+    except gspread.exceptions.APIError:
+        # Лист только что создал другой процесс
+        return spreadsheet.worksheet(title)
 
 
 HEADER = [
@@ -39,9 +92,22 @@ HEADER = [
     "Expected Delivery",
     "Actual Delivery",
 ]
+LAST_COLUMN = chr(ord("A") + len(HEADER) - 1)
+
 
+def row_range(row_number: int) -> str:
+    return f"A{row_number}:{LAST_COLUMN}{row_number}"
 
-def _ensure_header(sheet):
+
+def a1_range(sheet, row_number: int) -> str:
+    """
+    Диапазон строки с названием листа — для пакетной записи сразу в несколько листов.
+    """
+    title = sheet.title.replace("'", "''")
+    return f"'{title}'!{row_range(row_number)}"
+
+
+def ensure_header(sheet):
     existing = sheet.row_values(1)
     if existing != HEADER:
         if existing:
@@ -55,113 +121,88 @@ def _format_datetime(dt: Optional[datetime]) -> str:
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
 
-def _items_to_string(items: List[OrderItem]) -> str:
+def _items_to_string(items: Sequence[OrderItemView]) -> str:
     parts = [f"{item.name} x{item.quantity}" for item in items]
     return "; ".join(parts)
 
 
-def write_order_to_google_sheet(order_id: int) -> None:
-    """Добавляем строку с заказом в конец таблицы (по order_id через БД)."""
-    db = SessionLocal()
-    try:
-        order: Order | None = db.query(Order).filter(Order.id == order_id).first()
-        if not order:
-            return
+def order_row(order: OrderWithItems) -> list:
+    return [
+        str(order.id),
+        _format_datetime(order.created_at),
+        order.status,
+        _items_to_string(order.items),
+        float(order.total_amount or 0),
+        order.delivery_address or "",
+        order.contact_email or "",
+        order.contact_phone or "",
+        _format_datetime(order.expected_delivery_date),
+        _format_datetime(order.actual_delivery_date),
+    ]
 
-        items: List[OrderItem] = order.items
 
-        sheet = _get_sheet()
-        _ensure_header(sheet)
+def _load_order(order_id: int) -> Optional[OrderWithItems]:
+    with get_db() as db:
+        return get_order_with_items(db, order_id)
 
-        row = [
-            str(order.id),
-            _format_datetime(order.created_at),
-            order.status,
-            _items_to_string(items),
-            float(order.total_amount or 0),
-            order.delivery_address or "",
-            order.contact_email or "",
-            order.contact_phone or "",
-            _format_datetime(order.expected_delivery_date),
-            _format_datetime(order.actual_delivery_date),
-        ]
 
-        sheet.append_row(row)
-    finally:
-        db.close()
+def _sync_owns_sheet() -> bool:
+    """
+    Таблицу ведёт sheets_sync (SHEETS_SYNC_ENABLED): прямые записи пропускаем,
+    заказ попадёт в таблицу следующим циклом синхронизации.
+    """
+    return settings.SHEETS_SYNC_ENABLED
+
+
+def write_order_to_google_sheet(order_id: int) -> None:
+    """Добавляем строку с заказом в конец таблицы (по order_id через БД)."""
+    if _sync_owns_sheet():
+        return
+    order = _load_order(order_id)
+    if not order:
+        return
+
+    get_sheet(order.created_at).append_row(order_row(order))
 
 
 def update_order_in_google_sheet(order_id: int) -> None:
     """
     Находит строку по Order ID и обновляет её (статус, суммы, даты).
     Если строка не найдена — добавляем новую строку.
+    Ищем только на листе месяца создания заказа и только по колонке Order ID.
     """
-    db = SessionLocal()
-    try:
-        order: Order | None = db.query(Order).filter(Order.id == order_id).first()
-        if not order:
-            return
-
-        items: List[OrderItem] = order.items
-
-        sheet = _get_sheet()
-        _ensure_header(sheet)
-
-        # Ищем строку, где в первом столбце наш order_id
-        records = sheet.get_all_values()
-        # records[0] — заголовок
-        row_index = None
-        for i, row in enumerate(records[1:], start=2):  # начинаем с 2-й строки
-            if row and row[0] == str(order.id):
-                row_index = i
-                break
-
-        if row_index is None:
-            # если нет — просто добавим новую строку
-            write_order_to_google_sheet(order_id)
-            return
-
-        new_row = [
-            str(order.id),
-            _format_datetime(order.created_at),
-            order.status,
-            _items_to_string(items),
-            float(order.total_amount or 0),
-            order.delivery_address or "",
-            order.contact_email or "",
-            order.contact_phone or "",
-            _format_datetime(order.expected_delivery_date),
-            _format_datetime(order.actual_delivery_date),
-        ]
-
-        sheet.update(f"A{row_index}:J{row_index}", [new_row])
-    finally:
-        db.close()
+    if _sync_owns_sheet():
+        return
+    order = _load_order(order_id)
+    if not order:
+        return
+
+    sheet = get_sheet(order.created_at)
+
+    # Ищем строку, где в первом столбце наш order_id
+    ids = sheet.col_values(1)
+    # ids[0] — заголовок
+    row_index = None
+    for i, value in enumerate(ids[1:], start=2):  # начинаем с 2-й строки
+        if value == str(order.id):
+            row_index = i
+            break
+
+    if row_index is None:
+        # если нет — просто добавим новую строку
+        sheet.append_row(order_row(order))
+        return
+
+    sheet.update(row_range(row_index), [order_row(order)])
 
 
 # 🆕 ВОТ ЭТОЙ ФУНКЦИИ НЕ ХВАТАЛО
-def append_order_to_sheet(order: Order) -> None:
+def append_order_to_sheet(order: OrderWithItems) -> None:
     """
     Добавляет строку с заказом в конец таблицы,
-    когда у нас уже есть объект Order (без отдельного запроса в БД).
-    Используется в manager_listener / order_service.
+    когда у нас уже есть заказ (без отдельного запроса в БД).
+    Используется в manager_listener / intake_worker.
     """
-    items: List[OrderItem] = order.items
-
-    sheet = _get_sheet()
-    _ensure_header(sheet)
-
-    row = [
-        str(order.id),
-        _format_datetime(order.created_at),
-        order.status,
-        _items_to_string(items),
-        float(order.total_amount or 0),
-        order.delivery_address or "",
-        order.contact_email or "",
-        order.contact_phone or "",
-        _format_datetime(order.expected_delivery_date),
-        _format_datetime(order.actual_delivery_date),
-    ]
-
-    sheet.append_row(row)
+    if _sync_owns_sheet():
+        return
+    get_sheet(order.created_at).append_row(order_row(order))
@@ -0,0 +1,274 @@
+# paycharm/app/integrations/sheets_sync.py
+"""
+Инкрементальная синхронизация заказов из базы в Google Sheets.
+
+Ловит всё, что меняется мимо update_order_in_google_sheet: массовые правки,
+отмены, даты доставки из скриптов. Цикл:
+
+1. заказы с (updated_at, id) выше водяного знака (sync_state) — по индексу
+   ix_orders_updated_at, пачками по SHEETS_SYNC_BATCH_SIZE
+2. строка таблицы для заказа сравнивается с хэшем в sheet_rows — неизменённые
+   пропускаются
+3. изменённые строки всех листов уходят одним values_batch_update, новые —
+   одним append_rows на лист месяца (google_sheets.get_sheet); номер строки
+   заказа, которого нет в кэше, ищется по колонке Order ID его листа
+   (одно чтение листа за цикл)
+
+Пачка без изменений — ноль запросов к API, с изменениями — два-три.
+
+Вместе с циклом включайте SHEETS_SYNC_ENABLED: тогда строки дописывает только
+синхронизация, а прямые записи из слушателя и воркеров отключены. Иначе
+заказ, созданный между чтением колонки Order ID и append_rows, попал бы
+в таблицу дважды.
+
+    python -m paycharm.app.integrations.sheets_sync            # цикл раз в SHEETS_SYNC_INTERVAL_SECONDS
+    python -m paycharm.app.integrations.sheets_sync --once
+    python -m paycharm.app.integrations.sheets_sync --rebuild  # забыть кэш и сверить всю таблицу
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import Session
+
+from paycharm.app.config import settings
+from paycharm.app.database import get_db
+from paycharm.app.integrations.google_sheets import (
+    a1_range,
+    get_sheet,
+    get_spreadsheet,
+    order_row,
+    worksheet_title,
+)
+from paycharm.app.models import Order, SheetRow, SyncState
+from paycharm.app.services.order_queries import get_orders_with_items
+
+
+logger = logging.getLogger(__name__)
+
+SYNC_NAME = "google_sheets"
+
+_UPDATED_RANGE_RE = re.compile(r"![A-Z]+(\d+)")
+
+
+def row_hash(row: list) -> str:
+    data = json.dumps(row, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _load_state(db: Session) -> SyncState:
+    state = db.get(SyncState, SYNC_NAME)
+    if state is None:
+        state = SyncState(name=SYNC_NAME, watermark=None, watermark_id=0)
+        db.add(state)
+    return state
+
+
+def _changed_order_ids(
+    db: Session, cursor: Tuple[Optional[datetime], int], limit: int
+) -> List[Tuple[int, datetime]]:
+    query = select(Order.id, Order.updated_at).where(Order.updated_at.is_not(None))
+    if cursor[0] is not None:
+        query = query.where(tuple_(Order.updated_at, Order.id) > tuple_(cursor[0], cursor[1]))
+    rows = db.execute(query.order_by(Order.updated_at, Order.id).limit(limit))
+    return [(row.id, row.updated_at) for row in rows]
+
+
+def _sheet_positions(sheet) -> Dict[int, int]:
+    """
+    {order_id: номер строки} по колонке Order ID — для заказов, которых нет в sheet_rows
+    (например, дописанных слушателем до включения SHEETS_SYNC_ENABLED).
+    """
+    positions = {}
+    for row_number, value in enumerate(sheet.col_values(1)[1:], start=2):
+        if value.isdigit():
+            positions.setdefault(int(value), row_number)
+    return positions
+
+
+def _first_appended_row(response) -> Optional[int]:
+    updated_range = ((response or {}).get("updates") or {}).get("updatedRange", "")
+    match = _UPDATED_RANGE_RE.search(updated_range)
+    return int(match.group(1)) if match else None
+
+
+class _SheetWriter:
+    """
+    Колонка Order ID листа читается только при первой необходимости,
+    не чаще раза за цикл.
+    """
+
+    def __init__(self):
+        self._positions: Dict[Optional[str], Dict[int, int]] = {}
+
+    def position(self, created_at: Optional[datetime], order_id: int) -> Optional[int]:
+        title = worksheet_title(created_at)
+        if title not in self._positions:
+            self._positions[title] = _sheet_positions(get_sheet(created_at))
+        return self._positions[title].get(order_id)
+
+    def remember(self, created_at: Optional[datetime], order_id: int, row_number: int) -> None:
+        positions = self._positions.get(worksheet_title(created_at))
+        if positions is not None:
+            positions[order_id] = row_number
+
+
+def _sync_page(db: Session, writer: _SheetWriter, order_ids: List[int]) -> Dict[str, int]:
+    cached = {
+        row.order_id: row
+        for row in db.execute(select(SheetRow).where(SheetRow.order_id.in_(order_ids))).scalars()
+    }
+
+    updates = []
+    appends: Dict[Optional[str], list] = {}
+    for order in get_orders_with_items(db, order_ids):
+        row = order_row(order)
+        digest = row_hash(row)
+        title = worksheet_title(order.created_at)
+        known = cached.get(order.id)
+        if known is not None and known.worksheet != title:
+            # Лист сменился (другой GOOGLE_SHEETS_WORKSHEET_FORMAT) — старая позиция не годится
+            known_row = None
+        else:
+            known_row = known.row_number if known is not None else None
+            if known is not None and known.row_hash == digest:
+                continue
+        row_number = known_row or writer.position(order.created_at, order.id)
+        if row_number is None:
+            appends.setdefault(title, []).append((order, row, digest))
+        else:
+            updates.append((order, row_number, row, digest))
+
+    now = datetime.utcnow()
+    if updates:
+        get_spreadsheet().values_batch_update({
+            "valueInputOption": "RAW",
+            "data": [
+                {"range": a1_range(get_sheet(order.created_at), row_number), "values": [row]}
+                for order, row_number, row, _ in updates
+            ],
+        })
+    written = [(order, row_number, digest) for order, row_number, _, digest in updates]
+
+    for rows in appends.values():
+        response = get_sheet(rows[0][0].created_at).append_rows([row for _, row, _ in rows])
+        first_row = _first_appended_row(response)
+        for offset, (order, _, digest) in enumerate(rows):
+            if first_row is None:
+                # Номер строки неизвестен — найдём по колонке Order ID в следующем цикле
+                continue
+            written.append((order, first_row + offset, digest))
+            writer.remember(order.created_at, order.id, first_row + offset)
+
+    for order, row_number, digest in written:
+        title = worksheet_title(order.created_at)
+        known = cached.get(order.id)
+        if known is None:
+            db.add(SheetRow(
+                order_id=order.id, worksheet=title, row_number=row_number, row_hash=digest, synced_at=now,
+            ))
+        else:
+            known.worksheet = title
+            known.row_number = row_number
+            known.row_hash = digest
+            known.synced_at = now
+
+    return {"updated": len(updates), "appended": sum(len(rows) for rows in appends.values())}
+
+
+def sync_orders(
+    db: Session,
+    batch_size: int = settings.SHEETS_SYNC_BATCH_SIZE,
+    overlap_seconds: int = settings.SHEETS_SYNC_OVERLAP_SECONDS,
+) -> Dict[str, int]:
+    """
+    Один цикл синхронизации. Возвращает {"checked", "updated", "appended"}.
+
+    Водяной знак сохраняется после каждой записанной пачки, но не дальше
+    now - overlap_seconds: недавно изменённые заказы перечитываются следующим
+    циклом (лишний раз записаны не будут — хэш совпадёт).
+    """
+    state = _load_state(db)
+    cursor = (state.watermark, state.watermark_id)
+    writer = _SheetWriter()
+    totals = {"checked": 0, "updated": 0, "appended": 0}
+
+    while True:
+        changed = _changed_order_ids(db, cursor, batch_size)
+        if not changed:
+            break
+        counts = _sync_page(db, writer, [order_id for order_id, _ in changed])
+        totals["checked"] += len(changed)
+        totals["updated"] += counts["updated"]
+        totals["appended"] += counts["appended"]
+
+        last_id, last_ts = changed[-1]
+        cursor = (last_ts, last_id)
+        horizon = datetime.utcnow() - timedelta(seconds=overlap_seconds)
+        if last_ts <= horizon:
+            state.watermark, state.watermark_id = last_ts, last_id
+        elif state.watermark is None or state.watermark < horizon:
+            state.watermark, state.watermark_id = horizon, 0
+        db.commit()
+
+        if len(changed) < batch_size:
+            break
+
+    return totals
+
+
+def reset(db: Session) -> None:
+    """
+    Забыть водяной знак и кэш строк: следующий цикл сверит все заказы
+    с таблицей (и найдёт их строки по колонке Order ID).
+    """
+    db.execute(delete(SheetRow))
+    db.execute(delete(SyncState).where(SyncState.name == SYNC_NAME))
+    db.commit()
+
+
+def run_forever(interval: float = settings.SHEETS_SYNC_INTERVAL_SECONDS) -> None:
+    while True:
+        started = time.monotonic()
+        try:
+            with get_db() as db:
+                totals = sync_orders(db)
+            if totals["updated"] or totals["appended"]:
+                logger.info("Синхронизация с Google Sheets: %s", totals)
+        except Exception as e:
+            logger.exception("Ошибка синхронизации с Google Sheets: %s", e)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="один цикл и выход")
+    parser.add_argument("--rebuild", action="store_true", help="сбросить кэш строк и водяной знак")
+    parser.add_argument("--interval", type=float, default=settings.SHEETS_SYNC_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not settings.SHEETS_SYNC_ENABLED:
+        logger.warning(
+            "SHEETS_SYNC_ENABLED не включён: слушатель и воркеры тоже дописывают строки, возможны дубли"
+        )
+    if args.rebuild:
+        with get_db() as db:
+            reset(db)
+    if args.once or args.rebuild:
+        with get_db() as db:
+            print(sync_orders(db))
+        return
+    run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# paycharm/app/integrations/telegram_notify.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from paycharm.app.config import settings
+from paycharm.app.database import get_db
+from paycharm.app.models import Order, StatusNotification
+
+
+logger = logging.getLogger(__name__)
+
+# Человекочитаемые статусы для клиента
+STATUS_TITLES: Dict[str, str] = {
+    "received": "получен",
+    "parse_failed": "требует уточнения",
+    "pending": "в обработке",
+    "invalid_contact": "нужны корректные контакты",
+    "out_of_stock": "нет в наличии",
+    "ambiguous_items": "нужно уточнить товары",
+    "confirmed": "подтверждён",
+    "shipped": "отправлен",
+    "delivered": "доставлен",
+    "cancelled": "отменён",
+}
+
+FETCH_BATCH = 500
+IDLE_SLEEP_SECONDS = 1.0
+# Сколько чатов помним для лимита per_chat_interval, прежде чем чистить старые
+CHAT_STATE_LIMIT = 10000
+# Задержка повтора после временной ошибки: 10, 20, 40, ... секунд, но не больше 10 минут
+RETRY_BASE_SECONDS = 10
+MAX_RETRY_DELAY_SECONDS = 600
+
+
+def _permanent_errors() -> tuple:
+    """
+    Ошибки Telegram, после которых повтор не поможет: клиент заблокировал
+    аккаунт, чат недоступен, пользователь удалён.
+    """
+    from pyrogram.errors import InputUserDeactivated, PeerIdInvalid, UserIsBlocked
+
+    return (InputUserDeactivated, PeerIdInvalid, UserIsBlocked)
+
+
+def enqueue_status_notification(
+    db: Session,
+    order: Order,
+    old_status: Optional[str],
+    new_status: str,
+) -> None:
+    """
+    Записать событие смены статуса в outbox (status_notifications).
+    Коммит делает вызывающий — вместе со сменой статуса.
+    Заказы без Telegram-чата (например, из HTTP API) пропускаем.
+    """
+    if order.telegram_chat_id is None:
+        return
+    db.add(
+        StatusNotification(
+            order_id=order.id,
+            chat_id=order.telegram_chat_id,
+            old_status=old_status,
+            new_status=new_status,
+        )
+    )
+
+
+def format_status_message(order_id: int, old_status: Optional[str], new_status: str) -> str:
+    new_title = STATUS_TITLES.get(new_status, new_status)
+    if old_status and old_status != new_status:
+        old_title = STATUS_TITLES.get(old_status, old_status)
+        return f"📦 Заказ №{order_id}: статус изменён — {old_title} → {new_title}"
+    return f"📦 Заказ №{order_id}: {new_title}"
+
+
+class RateLimiter:
+    """
+    Token bucket: не больше rate событий в секунду, пики до burst.
+    pause() — остановить всех ожидающих (например, на время FloodWait).
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class StatusNotifier:
+    """
+    Отправка уведомлений о смене статуса из outbox.
+
+    - несколько быстрых смен статуса одного заказа склеиваются в одно сообщение:
+      группа отправляется, когда по заказу нет новых событий merge_window секунд
+    - общий лимит global_rate сообщений/сек и не чаще одного сообщения в
+      per_chat_interval секунд в один чат
+    - FloodWait от Telegram останавливает отправку на указанное время, затем повтор
+    - событие отмечается отправленным только после успеха или ошибки, которую
+      повтор не исправит (_permanent_errors); остальные ошибки — повтор с задержкой,
+      не больше max_attempts попыток
+    """
+
+    def __init__(
+        self,
+        client,
+        global_rate: float = settings.NOTIFY_GLOBAL_RATE_PER_SECOND,
+        per_chat_interval: float = settings.NOTIFY_PER_CHAT_INTERVAL_SECONDS,
+        merge_window: float = settings.NOTIFY_MERGE_WINDOW_SECONDS,
+        max_attempts: int = settings.NOTIFY_MAX_ATTEMPTS,
+        concurrency: int = 8,
+    ):
+        self.client = client
+        self.limiter = RateLimiter(global_rate, burst=max(1, int(global_rate)))
+        self.per_chat_interval = per_chat_interval
+        self.merge_window = merge_window
+        self.max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._chat_next_at: Dict[int, float] = {}
+
+    async def run(self) -> None:
+        while True:
+            try:
+                sent = await self.drain_once()
+            except Exception as e:
+                logger.exception("Ошибка при отправке уведомлений о статусе: %s", e)
+                sent = 0
+            if not sent:
+                await asyncio.sleep(IDLE_SLEEP_SECONDS)
+
+    async def drain_once(self) -> int:
+        """
+        Один проход по outbox. Возвращает число отправленных сообщений.
+        """
+        groups = await asyncio.to_thread(self._load_ready_groups)
+        if not groups:
+            return 0
+        results = await asyncio.gather(*(self._send_group(group) for group in groups))
+        return sum(results)
+
+    def _load_ready_groups(self) -> List[List[StatusNotification]]:
+        """
+        Неотправленные события, сгруппированные по заказу, в порядке появления.
+        Группы, по которым события были меньше merge_window назад, ждут;
+        как и группы, у которых не истекла задержка повтора (retry_after).
+        """
+        with get_db() as db:
+            rows = db.execute(
+                select(StatusNotification)
+                .where(StatusNotification.sent_at.is_(None))
+                .order_by(StatusNotification.id)
+                .limit(FETCH_BATCH)
+            ).scalars().all()
+
+        by_order: "OrderedDict[int, List[StatusNotification]]" = OrderedDict()
+        for row in rows:
+            by_order.setdefault(row.order_id, []).append(row)
+
+        now = datetime.utcnow()
+        ready_before = now - timedelta(seconds=self.merge_window)
+        return [
+            group
+            for group in by_order.values()
+            if group[-1].created_at <= ready_before
+            and all(row.retry_after is None or row.retry_after <= now for row in group)
+        ]
+
+    async def _send_group(self, group: List[StatusNotification]) -> int:
+        first, last = group[0], group[-1]
+        ids = [row.id for row in group]
+
+        # Статус вернулся к исходному — клиенту сообщать нечего
+        if first.old_status == last.new_status:
+            await asyncio.to_thread(_mark_sent, ids)
+            return 0
+
+        text = format_status_message(last.order_id, first.old_status, last.new_status)
+        async with self._semaphore:
+            await self._wait_for_chat(last.chat_id)
+            try:
+                await self._send(last.chat_id, text)
+            except _permanent_errors() as e:
+                logger.warning("Чат %s недоступен, уведомление о заказе #%s пропущено: %s", last.chat_id, last.order_id, e)
+                await asyncio.to_thread(_mark_sent, ids)
+                return 0
+            except Exception as e:
+                attempts = max(row.attempts for row in group) + 1
+                if attempts >= self.max_attempts:
+                    logger.error(
+                        "Уведомление о заказе #%s в чат %s не отправлено за %s попыток: %s",
+                        last.order_id, last.chat_id, attempts, e,
+                    )
+                    await asyncio.to_thread(_mark_sent, ids)
+                else:
+                    logger.warning(
+                        "Не удалось уведомить чат %s о заказе #%s (попытка %s), повторим: %s",
+                        last.chat_id, last.order_id, attempts, e,
+                    )
+                    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAX_RETRY_DELAY_SECONDS)
+                    await asyncio.to_thread(_schedule_retry, ids, attempts, delay, f"{type(e).__name__}: {e}")
+                return 0
+        await asyncio.to_thread(_mark_sent, ids)
+        return 1
+
+    async def _wait_for_chat(self, chat_id: int) -> None:
+        now = time.monotonic()
+        if len(self._chat_next_at) > CHAT_STATE_LIMIT:
+            self._chat_next_at = {k: v for k, v in self._chat_next_at.items() if v > now}
+        next_at = self._chat_next_at.get(chat_id, 0.0)
+        self._chat_next_at[chat_id] = max(now, next_at) + self.per_chat_interval
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+
+    async def _send(self, chat_id: int, text: str) -> None:
+        from pyrogram.errors import FloodWait
+
+        while True:
+            await self.limiter.acquire()
+            try:
+                await self.client.send_message(chat_id, text)
+                return
+            except FloodWait as e:
+                wait = float(e.value) + 1
+                logger.warning("FloodWait %.0f c при отправке в чат %s", wait, chat_id)
+                self.limiter.pause(wait)
+
+
+def _schedule_retry(ids: List[int], attempts: int, delay: float, error: str) -> None:
+    with get_db() as db:
+        db.execute(
+            update(StatusNotification)
+            .where(StatusNotification.id.in_(ids))
+            .values(
+                attempts=attempts,
+                retry_after=datetime.utcnow() + timedelta(seconds=delay),
+                last_error=error[:2000],
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+def _mark_sent(ids: List[int]) -> None:
+    with get_db() as db:
+        db.execute(
+            update(StatusNotification)
+            .where(StatusNotification.id.in_(ids))
+            .values(sent_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
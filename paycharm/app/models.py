@@ -6,12 +6,18 @@ from datetime import datetime
 
 from sqlalchemy import (
     Column,
+    BigInteger,
+    Boolean,
+    CheckConstraint,
     Integer,
     String,
     Numeric,
     DateTime,
     ForeignKey,
     Text,
+    JSON,
+    Index,
+    LargeBinary,
 )
 from sqlalchemy.orm import relationship, declarative_base
 
@@ -23,10 +29,15 @@ Base = declarative_base()
 
 
 class Order(Base):
+    # В PostgreSQL таблица разбита на помесячные партиции по created_at
+    # (миграция 0008, обслуживание — app/services/partitions.py): PK там (id, created_at),
+    # внешних ключей на orders.id нет, удаление позиций/истории — каскадом ORM.
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # В PostgreSQL обновляется и триггером (миграция 0011) — правки мимо ORM
+    # тоже видны синхронизации с Google Sheets (integrations/sheets_sync.py)
     updated_at = Column(
         DateTime,
         default=datetime.utcnow,
@@ -39,13 +50,26 @@ class Order(Base):
     delivery_address = Column(Text, nullable=True)
     contact_email = Column(String, nullable=True)
     contact_phone = Column(String, nullable=True)
+    # Контакты в одном виде (validation.normalize_email / normalize_phone) —
+    # для поиска заказов клиента (/customer) по индексу
+    contact_email_norm = Column(String, nullable=True)
+    contact_phone_norm = Column(String, nullable=True)
 
     total_amount = Column(Numeric(12, 2), default=0)
 
     expected_delivery_date = Column(DateTime, nullable=True)
     actual_delivery_date = Column(DateTime, nullable=True)
 
-    source_message = Column(Text, nullable=False)
+    # Откуда пришёл заказ — сюда шлём уведомления о смене статуса
+    telegram_user_id = Column(BigInteger, nullable=True, index=True)
+    telegram_chat_id = Column(BigInteger, nullable=True)
+
+    # Остатки по позициям списаны (stock_service.reserve_stock), при отмене вернём
+    stock_reserved = Column(Boolean, nullable=False, default=False)
+
+    # Версия строки для оптимистичной блокировки: каждый UPDATE через ORM
+    # выполняется как compare-and-set (WHERE id = ? AND version = ?)
+    version = Column(Integer, nullable=False, default=1)
 
     items = relationship(
         "OrderItem",
@@ -57,6 +81,20 @@ class Order(Base):
         back_populates="order",
         cascade="all, delete-orphan",
     )
+    # Исходный текст и ответ модели — в отдельной таблице, грузятся только по запросу
+    raw_message = relationship(
+        "OrderRawMessage",
+        primaryjoin="Order.id == foreign(OrderRawMessage.order_id)",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        Index("ix_orders_updated_at", "updated_at", "id"),
+        Index("ix_orders_contact_email_norm", "contact_email_norm", "created_at"),
+        Index("ix_orders_contact_phone_norm", "contact_phone_norm", "created_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
 
 class OrderItem(Base):
@@ -67,9 +105,11 @@ class OrderItem(Base):
         Integer,
         ForeignKey("orders.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
 
     name = Column(String, nullable=False)
+    sku = Column(String, nullable=True)  # None — товар не сопоставлен с каталогом
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Numeric(12, 2), nullable=False)
     line_amount = Column(Numeric(12, 2), nullable=False)
@@ -85,6 +125,7 @@ class StatusHistory(Base):
         Integer,
         ForeignKey("orders.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
     old_status = Column(String, nullable=True)
     new_status = Column(String, nullable=False)
@@ -92,3 +133,130 @@ class StatusHistory(Base):
     comment = Column(Text, nullable=True)
 
     order = relationship("Order", back_populates="status_history")
+
+
+# Сырые тексты заказа, сжатые zstd (utils/compression.py): читаются только
+# в /order <id> raw и при отложенном разборе, поэтому не раздувают строку orders
+class OrderRawMessage(Base):
+    __tablename__ = "order_raw_messages"
+
+    # Без внешнего ключа: orders партиционирована (см. миграцию 0008)
+    order_id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    source_message = Column(LargeBinary, nullable=False)
+    llm_response = Column(LargeBinary, nullable=True)
+    # Нормализованный исходный текст (order_queries.raw_search_text) под триграммный
+    # индекс для /find: сжатый source_message искать нельзя
+    search_text = Column(Text, nullable=True)
+    # Сообщение очереди, из которого создан заказ. Уникальность здесь, а не в orders:
+    # уникальный индекс партиционированной таблицы обязан включать created_at.
+    # Повторная доставка сообщения не создаст второй заказ (order_service.create_order_from_parsed)
+    intake_message_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ux_order_raw_messages_intake", "intake_message_id", unique=True),
+    )
+
+
+class Product(Base):
+    __tablename__ = "products"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sku = Column(String, unique=True, nullable=False)
+    name = Column(String, nullable=False)
+    # Альтернативные названия товара: ["айфон 15", "iphone15", ...]
+    aliases = Column(JSON, nullable=False, default=list)
+
+    price = Column(Numeric(12, 2), nullable=False)
+    stock_quantity = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        index=True,
+    )
+
+    __table_args__ = (
+        CheckConstraint("stock_quantity >= 0", name="ck_products_stock_non_negative"),
+    )
+
+
+# Outbox уведомлений клиенту о смене статуса: пишется в той же транзакции,
+# что и смена статуса, отправляет integrations/telegram_notify.StatusNotifier
+class StatusNotification(Base):
+    __tablename__ = "status_notifications"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
+    old_status = Column(String, nullable=True)
+    new_status = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    # Неудачные попытки отправки (временные ошибки) и когда пробовать снова
+    attempts = Column(Integer, nullable=False, default=0)
+    retry_after = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_status_notifications_unsent", "sent_at", "id"),
+    )
+
+
+# Очередь входящих сообщений: слушатель Telegram только кладёт сюда текст,
+# воркеры (services/intake_worker.py) разбирают его в заказы.
+class IntakeMessage(Base):
+    __tablename__ = "intake_messages"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    telegram_user_id = Column(BigInteger, nullable=True)
+    telegram_chat_id = Column(BigInteger, nullable=True)
+    telegram_message_id = Column(Integer, nullable=True)
+    # Сообщение "принято, обрабатываем": итог заказа редактирует его, а не шлётся отдельно
+    ack_message_id = Column(Integer, nullable=True)
+    text = Column(Text, nullable=False)
+
+    # pending -> processing -> done / dead
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Когда сообщение снова можно взять в работу: задержка ретрая
+    # или истечение visibility timeout у упавшего воркера
+    visible_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    order_id = Column(Integer, nullable=True)
+    reply_sent = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        Index("ix_intake_messages_status_visible", "status", "visible_after"),
+        Index("ix_intake_messages_user", "telegram_user_id", "id"),
+    )
+
+
+# Состояние фоновых синхронизаций: {name: водяной знак (updated_at, id)}
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=True)
+    watermark_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+# Где лежит заказ в Google Sheets и хэш того, что туда записано:
+# синхронизация пишет только строки, хэш которых изменился
+class SheetRow(Base):
+    __tablename__ = "sheet_rows"
+
+    # Без внешнего ключа: orders партиционирована (см. миграцию 0008)
+    order_id = Column(Integer, primary_key=True)
+    # Лист месяца (google_sheets.worksheet_title); NULL — первый лист
+    worksheet = Column(String, nullable=True)
+    row_number = Column(Integer, nullable=False)
+    row_hash = Column(String(32), nullable=False)
+    synced_at = Column(DateTime, default=datetime.utcnow, nullable=False)
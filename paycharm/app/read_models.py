@@ -0,0 +1,86 @@
+# app/read_models.py
+"""
+Лёгкие неизменяемые представления заказов для чтения: списки в админке,
+Google Sheets, email, ответы клиентам.
+
+В отличие от ORM-объектов не привязаны к сессии (нет ленивых связей и
+identity map), занимают меньше памяти и их можно спокойно передавать между
+потоками. Строятся запросами только нужных колонок — см. services/order_queries.py.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class OrderItemView:
+    name: str
+    sku: Optional[str]
+    quantity: int
+    unit_price: Decimal
+    line_amount: Decimal
+
+
+@dataclass(frozen=True, slots=True)
+class OrderSummary:
+    """
+    Строка списка заказов (/orders).
+    """
+    id: int
+    created_at: datetime
+    status: str
+    total_amount: Decimal
+
+
+@dataclass(frozen=True, slots=True)
+class OrderWithItems:
+    """
+    Заказ целиком: карточка в админке, строка в Sheets, письмо, ответ клиенту.
+    """
+    id: int
+    created_at: datetime
+    status: str
+    total_amount: Decimal
+    delivery_address: Optional[str]
+    contact_email: Optional[str]
+    contact_phone: Optional[str]
+    expected_delivery_date: Optional[datetime]
+    actual_delivery_date: Optional[datetime]
+    items: Tuple[OrderItemView, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class OrderRawText:
+    """
+    Исходный текст заказа и сырой ответ модели (/order <id> raw).
+    """
+    order_id: int
+    source_message: str
+    llm_response: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class OrderSearchHit:
+    """
+    Найденный заказ (/find): score — лучшее сходство запроса с адресом,
+    товаром или исходным текстом (0..1).
+    """
+    order: OrderSummary
+    score: float
+    delivery_address: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class CustomerOrders:
+    """
+    Заказы клиента по телефону или email (/customer).
+    total_spent — без отменённых заказов.
+    """
+    contact: str
+    orders_count: int
+    total_spent: Decimal
+    last_order_at: Optional[datetime]
+    orders: Tuple[OrderSummary, ...]
@@ -1,7 +1,7 @@
 # app/schemas.py
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 from paycharm.app.utils.enums import OrderStatus
 
@@ -19,8 +19,7 @@ class OrderItemRead(BaseModel):
     unit_price: float
     line_amount: float
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class OrderCreate(BaseModel):
@@ -36,12 +35,55 @@ class OrderCreate(BaseModel):
 class OrderRead(BaseModel):
     id: int
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime]
     status: OrderStatus
     delivery_address: Optional[str]
-    contact_email: Optional[EmailStr]
+    # В базе бывают и невалидные адреса (статус INVALID_CONTACT), поэтому просто str
+    contact_email: Optional[str]
     contact_phone: Optional[str]
     total_amount: float
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OrderWithItemsRead(OrderRead):
+    items: List[OrderItemRead] = []
+    expected_delivery_date: Optional[datetime] = None
+    actual_delivery_date: Optional[datetime] = None
+
+
+# === HTTP API (app/api/main.py) ===
+
+class OrderTextIn(BaseModel):
+    text: str
+    # True — вернуть 202 сразу, разбор текста сделать в фоне
+    defer: bool = False
+
+
+class OrderItemIn(BaseModel):
+    name: str
+    quantity: int
+
+
+class OrderJsonIn(BaseModel):
+    items: List[OrderItemIn]
+    delivery_address: Optional[str] = None
+    contact_email: Optional[str] = None
+    contact_phone: Optional[str] = None
+    source_message: Optional[str] = None
+
+
+class OrderAccepted(BaseModel):
+    order_id: int
+    status: OrderStatus
+
+
+class OrderStatusRead(BaseModel):
+    order_id: int
+    status: OrderStatus
+    updated_at: Optional[datetime]
+
+
+class OrderStatusUpdate(BaseModel):
+    status: OrderStatus
+    expected_delivery_date: Optional[date] = None
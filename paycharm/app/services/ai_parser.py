@@ -3,75 +3,261 @@
 from __future__ import annotations
 
 import json
-from typing import Dict, Any
-
-import google.generativeai as genai
+import logging
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict
 
 from paycharm.app.config import settings
+from paycharm.app.utils.json_stream import StreamingObjectParser
+
 
+logger = logging.getLogger(__name__)
 
+# Постоянная часть запроса: уходит в system instruction (и в кэш контекста),
+# а не в текст каждого запроса
 SYSTEM_PROMPT = """
 Ты — система обработки заказов. Пользователь пишет текстом, что хочет купить.
 Твоя задача — выделить товары, адрес доставки, email и телефон.
-Верни строго JSON без пояснений.
-
-Формат:
-{
-  "items": [
-    {"name": "iPhone 15", "quantity": 2},
-    {"name": "AirPods Pro", "quantity": 1}
-  ],
-  "delivery_address": "ул. Ленина 15, кв 44",
-  "contact_email": "ivanov@mail.ru",
-  "contact_phone": "+79161234567",
-  "status": "pending"
-}
 
-Если каких-то данных нет — ставь null или пустую строку.
-Никаких комментариев, текста до или после JSON. Только чистый JSON.
+Если каких-то данных нет — ставь пустую строку, если товаров нет — пустой список.
+Если товар узнаётся в каталоге ниже — пиши название как в каталоге.
 """
 
 
-# Проверяем наличие ключа
-if not settings.AI_KEY:
-    raise RuntimeError(
-        "AI_KEY не задан в .env. Укажи AI_KEY=... (ключ Gemini) и перезапусти."
-    )
+class OrderItemSchema(TypedDict):
+    name: str
+    quantity: int
 
-# Настройка Gemini SDK
-genai.configure(api_key=settings.AI_KEY)
 
-# ЖЁСТКО фиксируем модель, чтобы .env не ломал нам жизнь
-MODEL_NAME = "gemini-pro"
+class ParsedOrderSchema(TypedDict):
+    """
+    Схема ответа модели (response_schema): модель возвращает ровно этот JSON,
+    без markdown и пояснений.
+    """
+    items: List[OrderItemSchema]
+    delivery_address: str
+    contact_email: str
+    contact_phone: str
+
 
+GENERATION_CONFIG: Dict[str, Any] = {
+    "temperature": 0.1,
+    "response_mime_type": "application/json",
+    "response_schema": ParsedOrderSchema,
+}
 
-def parse_order_text(text: str) -> Dict[str, Any]:
+# Кэш контекста пересоздаём чуть раньше, чем он истечёт у провайдера
+CONTEXT_CACHE_REFRESH_MARGIN_SECONDS = 60
+# Сменённый кэш удаляем не сразу: запросы, начатые на старой модели (до
+# LISTENER_MAX_CONCURRENCY потоков), должны успеть дочитать ответ
+CONTEXT_CACHE_RETIRE_GRACE_SECONDS = 300
+
+
+@lru_cache(maxsize=1)
+def _genai():
     """
-    Отправляет текст заказа в модель Gemini и возвращает распарсенный JSON.
+    Gemini SDK импортируется и настраивается при первом разборе заказа:
+    модули, которые заказы не разбирают (админ-бот, API статусов), не платят
+    за импорт SDK и не требуют AI_KEY.
+    """
+    # Проверяем наличие ключа
+    if not settings.AI_KEY:
+        raise RuntimeError(
+            "AI_KEY не задан в .env. Укажи AI_KEY=... (ключ Gemini) и перезапусти."
+        )
+
+    import google.generativeai as genai
+    import google.generativeai.caching  # noqa: F401 — genai.caching для кэша контекста
+
+    # Настройка Gemini SDK
+    genai.configure(api_key=settings.AI_KEY)
+    return genai
+
+
+def _catalog_names() -> Tuple[str, ...]:
+    """
+    Названия товаров из кэша каталога — часть постоянной инструкции.
+    Без базы (например, каталог ещё не заведён) работаем без них.
     """
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
+        from paycharm.app.services.catalog_service import product_catalog
+
+        return tuple(sorted(product_catalog.names()))
     except Exception as e:
-        raise RuntimeError(f"Ошибка инициализации модели Gemini '{MODEL_NAME}': {e}")
+        logger.warning("Не удалось получить каталог для инструкции модели: %s", e)
+        return ()
+
+
+def _instruction(names: Tuple[str, ...]) -> str:
+    if not names:
+        return SYSTEM_PROMPT
+    return SYSTEM_PROMPT + "\nКаталог:\n" + "\n".join(f"- {name}" for name in names) + "\n"
+
+
+class _ModelHolder:
+    """
+    Модель с инструкцией под текущий каталог. Пересоздаётся, когда меняется
+    каталог или истекает кэш контекста.
+
+    Если провайдер поддерживает кэш контекста (GEMINI_CONTEXT_CACHE) и
+    инструкция для него не слишком короткая, инструкция хранится у провайдера
+    и в каждом запросе не передаётся. Не получилось — обычная system instruction.
+    Старый кэш удаляется через CONTEXT_CACHE_RETIRE_GRACE_SECONDS после замены
+    (или истекает у провайдера сам, если это наступит раньше).
+    """
 
-    prompt = f"{SYSTEM_PROMPT}\n\nТекст пользователя:\n{text}"
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple[str, Tuple[str, ...]]] = None
+        self._model = None
+        self._cache = None
+        # Когда кэш истечёт у провайдера (без запаса на пересоздание)
+        self._cache_expires_at = float("inf")
+        self._expires_at = float("inf")
+        # Заменённые кэши: [(когда удалить, кэш)]
+        self._retired: List[Tuple[float, Any]] = []
+        self._cache_failed: Optional[Tuple[str, Tuple[str, ...]]] = None
 
+    def get(self):
+        genai = _genai()
+        names = _catalog_names()
+        key = (settings.GEMINI_MODEL, names)
+        with self._lock:
+            if self._retired:
+                self._delete_retired()
+            if self._model is not None and key == self._key and time.monotonic() < self._expires_at:
+                return self._model
+
+            self._retire_cache()
+            instruction = _instruction(names)
+            self._model = None
+            self._expires_at = float("inf")
+            if settings.GEMINI_CONTEXT_CACHE and key != self._cache_failed and hasattr(genai, "caching"):
+                self._model = self._cached_model(genai, instruction, key)
+            if self._model is None:
+                try:
+                    self._model = genai.GenerativeModel(
+                        settings.GEMINI_MODEL,
+                        system_instruction=instruction,
+                        generation_config=GENERATION_CONFIG,
+                    )
+                except Exception as e:
+                    raise RuntimeError(f"Ошибка инициализации модели Gemini '{settings.GEMINI_MODEL}': {e}")
+            self._key = key
+            return self._model
+
+    def _cached_model(self, genai, instruction: str, key):
+        ttl = settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+        try:
+            cache = genai.caching.CachedContent.create(
+                model=settings.GEMINI_MODEL,
+                display_name="paycharm-order-parser",
+                system_instruction=instruction,
+                ttl=timedelta(seconds=ttl),
+            )
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content=cache,
+                generation_config=GENERATION_CONFIG,
+            )
+        except Exception as e:
+            # Например, инструкция короче минимального размера кэша или модель его не поддерживает
+            logger.info("Кэш контекста Gemini недоступен, инструкция уходит с каждым запросом: %s", e)
+            self._cache_failed = key
+            return None
+        self._cache = cache
+        self._cache_expires_at = time.monotonic() + ttl
+        self._expires_at = time.monotonic() + max(ttl - CONTEXT_CACHE_REFRESH_MARGIN_SECONDS, 1)
+        logger.info("Создан кэш контекста Gemini %s", getattr(cache, "name", ""))
+        return model
+
+    def _retire_cache(self) -> None:
+        """
+        Отложить удаление текущего кэша: модель на нём ещё может отвечать
+        в других потоках. Кэш, который истечёт раньше срока удаления, не трогаем.
+        """
+        if self._cache is None:
+            return
+        delete_at = time.monotonic() + CONTEXT_CACHE_RETIRE_GRACE_SECONDS
+        if delete_at < self._cache_expires_at:
+            self._retired.append((delete_at, self._cache))
+        self._cache = None
+        self._cache_expires_at = float("inf")
+
+    def _delete_retired(self) -> None:
+        now = time.monotonic()
+        pending = []
+        for delete_at, cache in self._retired:
+            if delete_at > now:
+                pending.append((delete_at, cache))
+                continue
+            try:
+                cache.delete()
+            except Exception as e:
+                logger.warning("Не удалось удалить кэш контекста Gemini: %s", e)
+        self._retired = pending
+
+
+_model_holder = _ModelHolder()
+
+
+def _chunk_text(chunk) -> str:
+    # У служебных кусков стрима (например, финального с причиной остановки) текста нет
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.1,
-            },
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+
+def parse_order_text(text: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Отправляет текст заказа в модель Gemini и возвращает распарсенный JSON.
+
+    fields — если задано, просим модель заполнить только эти поля
+    (например, ["delivery_address"] для дозаполнения заказа из нескольких сообщений).
+    """
+    data, _ = parse_order_text_with_raw(text, fields)
+    return data
+
+
+def parse_order_text_with_raw(
+    text: str,
+    fields: Optional[List[str]] = None,
+    on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    То же, что parse_order_text, плюс сырой ответ модели — он сохраняется
+    вместе с заказом (order_raw_messages), чтобы разбирать спорные случаи.
+
+    Ответ читается стримом: каждая позиция уходит в on_item, как только
+    модель её дописала (например, чтобы сразу сопоставить товар с каталогом),
+    остальной JSON — после последнего куска.
+    """
+    model = _model_holder.get()
+
+    prompt = ""
+    if fields:
+        prompt = (
+            f"Нужны только поля: {', '.join(fields)}. "
+            "Остальные поля верни пустыми.\n\n"
         )
+    prompt = f"{prompt}Текст пользователя:\n{text}"
+
+    parser = StreamingObjectParser("items", on_item=on_item)
+    try:
+        for chunk in model.generate_content(prompt, stream=True):
+            parser.feed(_chunk_text(chunk))
     except Exception as e:
         # Здесь будет, например, ошибка 404 модели, лимиты и т.д.
         raise RuntimeError(f"Ошибка запроса к модели Gemini: {e}")
 
-    raw = (response.text or "").strip()
+    raw = parser.text.strip()
 
-    # Пытаемся распарсить JSON
+    # С response_schema ответ — чистый JSON; ошибка здесь — обрыв/фильтр ответа
     try:
-        data = json.loads(raw)
+        data = parser.close()
     except json.JSONDecodeError:
         raise ValueError(f"Не удалось распарсить JSON из ответа модели: {raw}")
 
@@ -82,4 +268,4 @@ def parse_order_text(text: str) -> Dict[str, Any]:
     data.setdefault("contact_phone", "")
     data.setdefault("status", "pending")
 
-    return data
+    return data, raw
@@ -0,0 +1,230 @@
+# paycharm/app/services/catalog_service.py
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from paycharm.app.config import settings
+from paycharm.app.database import listen, new_session
+from paycharm.app.models import Product
+from paycharm.app.utils.fuzzy_match import TrigramIndex
+from paycharm.app.utils.product_catalog import PRODUCTS
+
+
+logger = logging.getLogger(__name__)
+
+# Канал NOTIFY, в который пишет триггер на таблице products (см. миграцию 0003)
+CATALOG_CHANNEL = "product_catalog"
+
+# Результаты сопоставления названия из заказа с каталогом
+MATCH_FOUND = "found"
+MATCH_AMBIGUOUS = "ambiguous"
+MATCH_NOT_FOUND = "not_found"
+
+# Кандидаты хуже этого порога не показываем вовсе
+MIN_CANDIDATE_SCORE = 0.3
+# Если второй кандидат (другой SKU) ближе этого к первому — выбрать не можем
+AMBIGUITY_MARGIN = 0.05
+
+
+def _lookup_key(name: str) -> str:
+    """
+    Ключ для точного поиска: без регистра и лишних пробелов.
+    """
+    return " ".join(name.split()).casefold()
+
+
+class ProductCatalogCache:
+    """
+    In-process кэш таблицы products.
+
+    Поиск по названию/алиасу — обычный dict.get, без похода в БД.
+    Раз в ttl секунд (или сразу после invalidate()) сверяем версию каталога
+    в БД и перечитываем его, только если она изменилась. NOTIFY от триггера
+    (invalidate(force=True)) перечитывает без сверки: правка мимо ORM могла
+    не сдвинуть updated_at (до миграции 0017 — любая правка SQL-запросом).
+    """
+
+    def __init__(self, ttl_seconds: int = 60):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._by_sku: Dict[str, Dict[str, Any]] = {}
+        self._index = TrigramIndex()
+        self._version: Optional[Tuple[int, Any]] = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._force = False
+
+    @property
+    def version(self) -> Optional[Tuple[int, Any]]:
+        return self._version
+
+    def invalidate(self, *_args, force: bool = False) -> None:
+        """
+        Пометить кэш устаревшим: при следующем обращении сверим версию
+        (force=True — перечитаем каталог, даже если версия та же).
+        """
+        if force:
+            self._force = True
+        self._stale = True
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        self._ensure_fresh()
+        return self._by_name.get(_lookup_key(name))
+
+    def get_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
+        self._ensure_fresh()
+        return self._by_sku.get(sku)
+
+    def names(self) -> List[str]:
+        """
+        Названия всех товаров (без алиасов) — например, для инструкции модели.
+        """
+        self._ensure_fresh()
+        return [entry["name"] for entry in self._by_sku.values()]
+
+    def resolve(self, name: str, threshold: float) -> Dict[str, Any]:
+        """
+        Сопоставить название из заказа с товаром каталога.
+
+        Возвращает {"status", "product", "score", "candidates"}:
+          - found: лучший кандидат не хуже threshold и заметно лучше второго
+          - ambiguous: есть похожие товары, но уверенно выбрать нельзя
+          - not_found: ничего похожего нет
+        """
+        product = self.get(name)
+        if product is not None:
+            return {"status": MATCH_FOUND, "product": product, "score": 1.0, "candidates": []}
+
+        by_sku = self._by_sku
+        matches = [
+            (by_sku[sku], score)
+            for sku, score in self._index.search(name, limit=3)
+            if score >= MIN_CANDIDATE_SCORE and sku in by_sku
+        ]
+        if not matches:
+            return {"status": MATCH_NOT_FOUND, "product": None, "score": 0.0, "candidates": []}
+
+        best, best_score = matches[0]
+        candidates = [p["name"] for p, _ in matches]
+        clear_winner = len(matches) == 1 or best_score - matches[1][1] > AMBIGUITY_MARGIN
+        if best_score >= threshold and clear_winner:
+            return {"status": MATCH_FOUND, "product": best, "score": best_score, "candidates": []}
+        return {
+            "status": MATCH_AMBIGUOUS,
+            "product": None,
+            "score": best_score,
+            "candidates": candidates,
+        }
+
+    def _ensure_fresh(self) -> None:
+        if not self._stale and time.monotonic() - self._checked_at < self.ttl_seconds:
+            return
+        # Перечитывает один поток, остальные продолжают работать со старой копией
+        if not self._lock.acquire(blocking=self._version is None):
+            return
+        try:
+            self.refresh(force=self._force)
+        finally:
+            self._lock.release()
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Сверить версию каталога и при необходимости перечитать его целиком.
+        """
+        self._stale = False
+        self._force = False
+        self._checked_at = time.monotonic()
+
+        db = new_session()
+        try:
+            version = _catalog_version(db)
+            if not force and version == self._version:
+                return
+
+            by_name: Dict[str, Dict[str, Any]] = {}
+            by_sku: Dict[str, Dict[str, Any]] = {}
+            index = TrigramIndex()
+            for product in db.execute(select(Product)).scalars():
+                entry = {
+                    "sku": product.sku,
+                    "name": product.name,
+                    "price": Decimal(product.price),
+                    # Остатков в кэше нет: они меняются без смены версии каталога,
+                    # наличие решает резерв (stock_service.reserve_stock)
+                    "aliases": list(product.aliases or []),
+                }
+                by_sku[product.sku] = entry
+                by_name[_lookup_key(product.name)] = entry
+                index.add(product.sku, product.name)
+                for alias in entry["aliases"]:
+                    # Алиас не перетирает настоящее название другого товара
+                    by_name.setdefault(_lookup_key(alias), entry)
+                    index.add(product.sku, alias)
+        except Exception:
+            # Не получилось — попробуем снова при следующем обращении
+            self._stale = True
+            self._force = self._force or force
+            raise
+        finally:
+            db.close()
+
+        # Подменяем ссылки целиком, чтобы читатели не видели полуготовый каталог
+        self._by_name = by_name
+        self._by_sku = by_sku
+        self._index = index
+        self._version = version
+        logger.info("Каталог товаров перечитан: %s SKU, версия %s", len(by_sku), version)
+
+
+def _catalog_version(db: Session) -> Tuple[int, Any]:
+    """
+    Версия каталога: (количество товаров, max(updated_at)).
+    """
+    count, last_update = db.execute(
+        select(func.count(Product.id), func.max(Product.updated_at))
+    ).one()
+    return count, last_update
+
+
+product_catalog = ProductCatalogCache(ttl_seconds=settings.PRODUCT_CATALOG_TTL_SECONDS)
+
+
+def start_catalog_listener() -> None:
+    """
+    Сбрасывать кэш каталога сразу по NOTIFY от триггера на products.
+    Вызывается один раз при старте процесса (бот/воркер).
+    """
+    listen(CATALOG_CHANNEL, lambda _payload: product_catalog.invalidate(force=True))
+
+
+def seed_products(db: Session) -> int:
+    """
+    Заливает стартовый каталог из utils/product_catalog.PRODUCTS.
+    Существующие SKU не трогаем. Возвращает число добавленных товаров.
+    """
+    existing = set(db.execute(select(Product.sku)).scalars())
+    added = 0
+    for name, data in PRODUCTS.items():
+        if data["sku"] in existing:
+            continue
+        db.add(
+            Product(
+                sku=data["sku"],
+                name=name,
+                aliases=data.get("aliases", []),
+                price=data["price"],
+                stock_quantity=data.get("stock_quantity", 0),
+            )
+        )
+        added += 1
+    db.commit()
+    return added
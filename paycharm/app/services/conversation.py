@@ -0,0 +1,177 @@
+# paycharm/app/services/conversation.py
+"""
+Сборка заказа из нескольких сообщений одного чата.
+
+Клиент часто пишет по частям: сначала товары, потом адрес, потом телефон.
+Частично разобранный заказ хранится между сообщениями (состояние — обычный dict),
+каждое новое сообщение дозаполняет только недостающие поля:
+
+- email и телефон ищутся регулярками, без модели
+- в модель уходит только остаток текста и только с недостающими полями;
+  если в сообщении кроме контактов ничего нет — модель не вызывается
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from paycharm.app.read_models import OrderWithItems
+from paycharm.app.services.ai_parser import parse_order_text_with_raw
+from paycharm.app.services.validation import (
+    PHONE_IN_TEXT_RE,
+    extract_email,
+    extract_phone,
+    is_valid_email,
+    is_valid_phone,
+    prefetch_item_match,
+)
+
+FIELD_TITLES: Dict[str, str] = {
+    "items": "что хотите заказать (товары и количество)",
+    "delivery_address": "адрес доставки",
+    "contact_email": "email",
+    "contact_phone": "телефон в формате +7XXXXXXXXXX",
+}
+
+# "то же самое, что в прошлый раз", "как в прошлый раз", "повторите последний заказ"
+REPEAT_ORDER_RE = re.compile(
+    r"\bто\s*же\s+сам\w*"
+    r"|\b(?:как|что)\s+(?:и\s+)?(?:в\s+)?прошлый\s+раз\b"
+    r"|\bповтори\w*\s+(?:мой\s+)?(?:прошл|последн|предыдущ)\w*(?:\s+заказ\w*)?",
+    re.IGNORECASE,
+)
+# Слова, которые могут окружать фразу повтора, не меняя заказа. Всё остальное
+# ("то же самое, но без чехла", "как в прошлый раз, только на работу") —
+# уже правка заказа, её разбирает модель
+REPEAT_FILLER_RE = re.compile(
+    r"\b(?:пожалуйста|пжл|пж|плиз|мне|нам|мой|снова|опять|ещ[её](?:\s+раз)?|тоже|да|ну|и|"
+    r"заказ\w*|закаж\w*|хочу|хотим|давайте|можно|сделайте|оформите|"
+    r"привет|здравствуйте|добрый\s+(?:день|вечер)|доброе\s+утро|спасибо)\b",
+    re.IGNORECASE,
+)
+# Длинное сообщение с такой фразой — уже не просто повтор (там новые данные), его разбирает модель
+REPEAT_MAX_CHARS = 80
+
+# Остаток сообщения короче этого (без пробелов и знаков) модели не отправляем
+MIN_TEXT_FOR_MODEL = 3
+
+_NOT_WORD_RE = re.compile(r"[\W_]+")
+
+
+def new_conversation() -> Dict[str, Any]:
+    return {
+        "texts": [],
+        "items": [],
+        "delivery_address": "",
+        "contact_email": "",
+        "contact_phone": "",
+        "model_calls": 0,
+        "llm_responses": [],
+    }
+
+
+def missing_fields(state: Dict[str, Any]) -> List[str]:
+    missing = []
+    if not state["items"]:
+        missing.append("items")
+    if not state["delivery_address"]:
+        missing.append("delivery_address")
+    if not is_valid_email(state["contact_email"]):
+        missing.append("contact_email")
+    if not is_valid_phone(state["contact_phone"]):
+        missing.append("contact_phone")
+    return missing
+
+
+def absorb_messages(
+    state: Dict[str, Any],
+    texts: List[str],
+    parse: Callable[..., Tuple[Dict[str, Any], str]] = parse_order_text_with_raw,
+) -> None:
+    """
+    Дозаполнить состояние из пачки новых сообщений (разбираются одним вызовом).
+    Уже заполненные поля не перезаписываются.
+    """
+    state["texts"].extend(texts)
+    text = "\n".join(texts)
+    rest = text
+
+    if "contact_email" in missing_fields(state):
+        email = extract_email(text)
+        if email:
+            state["contact_email"] = email
+            rest = rest.replace(email, " ")
+
+    if "contact_phone" in missing_fields(state):
+        phone = extract_phone(text)
+        if phone:
+            state["contact_phone"] = phone
+            rest = PHONE_IN_TEXT_RE.sub(" ", rest, count=1)
+
+    missing = missing_fields(state)
+    if not missing or len(_NOT_WORD_RE.sub("", rest)) < MIN_TEXT_FOR_MODEL:
+        return
+
+    parsed, raw = parse(rest, fields=missing, on_item=prefetch_item_match)
+    state["model_calls"] += 1
+    state["llm_responses"].append(raw)
+    _merge_parsed(state, parsed)
+
+
+def _merge_parsed(state: Dict[str, Any], parsed: Dict[str, Any]) -> None:
+    if not state["items"] and parsed.get("items"):
+        state["items"] = parsed["items"]
+    if not state["delivery_address"] and parsed.get("delivery_address"):
+        state["delivery_address"] = parsed["delivery_address"]
+    if not is_valid_email(state["contact_email"]) and parsed.get("contact_email"):
+        state["contact_email"] = parsed["contact_email"]
+    if not is_valid_phone(state["contact_phone"]) and parsed.get("contact_phone"):
+        # Модель могла вернуть номер в любом формате — приводим к +7XXXXXXXXXX
+        state["contact_phone"] = extract_phone(parsed["contact_phone"]) or parsed["contact_phone"]
+
+
+def is_repeat_request(texts: List[str]) -> bool:
+    """
+    Клиент просит повторить прошлый заказ и больше ничего не пишет: всё
+    сообщение — фраза повтора, вежливые слова (REPEAT_FILLER_RE) и знаки
+    препинания. Тогда заказ можно собрать без модели.
+    """
+    text = " ".join(text.strip() for text in texts)
+    if len(text) > REPEAT_MAX_CHARS or REPEAT_ORDER_RE.search(text) is None:
+        return False
+    rest = REPEAT_FILLER_RE.sub(" ", REPEAT_ORDER_RE.sub(" ", text))
+    return not _NOT_WORD_RE.sub("", rest)
+
+
+def repeat_order_parsed(order: OrderWithItems) -> Dict[str, Any]:
+    """
+    Прошлый заказ в виде разобранных данных для create_order_from_parsed:
+    цены, наличие и статус считаются заново.
+    """
+    return {
+        "items": [{"name": item.name, "quantity": item.quantity} for item in order.items],
+        "delivery_address": order.delivery_address or "",
+        "contact_email": order.contact_email or "",
+        "contact_phone": order.contact_phone or "",
+    }
+
+
+def conversation_text(state: Dict[str, Any]) -> str:
+    """
+    Все сообщения разговора — сохраняется в заказ как source_message.
+    """
+    return "\n".join(state["texts"])
+
+
+def conversation_llm_response(state: Dict[str, Any]) -> Optional[str]:
+    """
+    Сырые ответы модели за разговор (по одному на вызов) — сохраняются рядом с текстом.
+    """
+    return "\n---\n".join(state["llm_responses"]) or None
+
+
+def format_missing_request(state: Dict[str, Any], missing: Optional[List[str]] = None) -> str:
+    missing = missing_fields(state) if missing is None else missing
+    lines = ["📝 Чтобы оформить заказ, пришлите, пожалуйста:"]
+    lines.extend(f"• {FIELD_TITLES[field]}" for field in missing)
+    return "\n".join(lines)
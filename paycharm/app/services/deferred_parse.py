@@ -0,0 +1,109 @@
+# paycharm/app/services/deferred_parse.py
+"""
+Дочистка отложенного разбора заказов (POST /orders/text с defer=true).
+
+API разбирает такие заказы фоновой задачей в своём процессе: если процесс
+перезапустился или упал, заказ остался бы в RECEIVED навсегда. Здесь такие
+заказы (RECEIVED дольше DEFERRED_PARSE_STALE_SECONDS) разбираются заново,
+как и PARSE_FAILED — пока неудачных попыток меньше DEFERRED_PARSE_MAX_ATTEMPTS
+(попытки считаются по status_history).
+
+Запуск по cron, например раз в минуту:
+
+    python -m paycharm.app.services.deferred_parse
+    python -m paycharm.app.services.deferred_parse --limit 100
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from paycharm.app.config import settings
+from paycharm.app.database import get_db
+from paycharm.app.models import Order, StatusHistory
+from paycharm.app.services.order_service import complete_received_order
+from paycharm.app.utils.enums import OrderStatus
+
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 50
+
+
+def find_stale_orders(
+    db: Session,
+    stale_seconds: int = settings.DEFERRED_PARSE_STALE_SECONDS,
+    max_attempts: int = settings.DEFERRED_PARSE_MAX_ATTEMPTS,
+    limit: int = SWEEP_BATCH_SIZE,
+) -> List[int]:
+    """
+    id заказов, которые пора разобрать заново: RECEIVED, созданные раньше
+    now - stale_seconds, и PARSE_FAILED, не менявшиеся столько же и с числом
+    неудачных попыток меньше max_attempts.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    failures = (
+        select(func.count())
+        .select_from(StatusHistory)
+        .where(
+            StatusHistory.order_id == Order.id,
+            StatusHistory.new_status == OrderStatus.PARSE_FAILED.value,
+        )
+        .scalar_subquery()
+    )
+    return list(
+        db.execute(
+            select(Order.id)
+            .where(
+                or_(
+                    and_(Order.status == OrderStatus.RECEIVED.value, Order.created_at < cutoff),
+                    and_(
+                        Order.status == OrderStatus.PARSE_FAILED.value,
+                        Order.updated_at < cutoff,
+                        failures < max_attempts,
+                    ),
+                )
+            )
+            .order_by(Order.id)
+            .limit(limit)
+        ).scalars()
+    )
+
+
+def sweep(db: Session, limit: int = SWEEP_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Один проход: разобрать найденные заказы. Возвращает {"parsed", "failed"}.
+    Ошибка одного заказа не останавливает остальные: он остаётся в PARSE_FAILED
+    до следующего прохода (или навсегда, когда попытки кончатся).
+    """
+    totals = {"parsed": 0, "failed": 0}
+    for order_id in find_stale_orders(db, limit=limit):
+        try:
+            complete_received_order(db, order_id, retry_failed=True)
+        except Exception as e:
+            logger.warning("Заказ #%s снова не разобран: %s", order_id, e)
+            db.rollback()
+            totals["failed"] += 1
+        else:
+            totals["parsed"] += 1
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=SWEEP_BATCH_SIZE, help="заказов за проход")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with get_db() as db:
+        totals = sweep(db, limit=args.limit)
+    logger.info("Отложенный разбор: %s", totals)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# paycharm/app/services/intake_queue.py
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import exists, select, update
+from sqlalchemy.orm import Session, aliased
+
+from paycharm.app.models import IntakeMessage
+
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_DEAD = "dead"
+
+# Задержка перед повтором: 2, 4, 8, ... секунд, но не больше 5 минут
+MAX_RETRY_DELAY_SECONDS = 300
+
+
+def enqueue_message(
+    db: Session,
+    text: str,
+    telegram_user_id: Optional[int] = None,
+    telegram_chat_id: Optional[int] = None,
+    telegram_message_id: Optional[int] = None,
+    ack_message_id: Optional[int] = None,
+) -> int:
+    """
+    Положить входящее сообщение в очередь. Один INSERT + commit — миллисекунды,
+    сколько бы ни отвечала модель. Возвращает id сообщения в очереди.
+
+    ack_message_id — уже отправленный клиенту ответ "обрабатываем";
+    итог потом редактирует его.
+    """
+    message = IntakeMessage(
+        text=text,
+        telegram_user_id=telegram_user_id,
+        telegram_chat_id=telegram_chat_id,
+        telegram_message_id=telegram_message_id,
+        ack_message_id=ack_message_id,
+        status=STATUS_PENDING,
+        visible_after=datetime.utcnow(),
+    )
+    db.add(message)
+    db.commit()
+    return message.id
+
+
+def claim_messages(
+    db: Session,
+    worker_id: str,
+    limit: int = 1,
+    visibility_timeout: int = 120,
+) -> List[IntakeMessage]:
+    """
+    Взять до limit сообщений в работу.
+
+    - SELECT ... FOR UPDATE SKIP LOCKED: воркеры не ждут друг друга
+    - сообщения со статусом processing, у которых истёк visibility timeout
+      (воркер упал), берутся повторно
+    - сообщение клиента не берём, пока не обработаны его более ранние
+      сообщения — порядок в рамках одного клиента сохраняется
+    """
+    now = datetime.utcnow()
+    earlier = aliased(IntakeMessage)
+    active = (STATUS_PENDING, STATUS_PROCESSING)
+
+    ids = db.execute(
+        select(IntakeMessage.id)
+        .where(
+            IntakeMessage.status.in_(active),
+            IntakeMessage.visible_after <= now,
+            ~exists().where(
+                earlier.telegram_user_id == IntakeMessage.telegram_user_id,
+                earlier.id < IntakeMessage.id,
+                earlier.status.in_(active),
+            ),
+        )
+        .order_by(IntakeMessage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=IntakeMessage)
+    ).scalars().all()
+
+    if not ids:
+        db.rollback()
+        return []
+
+    db.execute(
+        update(IntakeMessage)
+        .where(IntakeMessage.id.in_(ids))
+        .values(
+            status=STATUS_PROCESSING,
+            attempts=IntakeMessage.attempts + 1,
+            visible_after=now + timedelta(seconds=visibility_timeout),
+            locked_by=worker_id,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    return list(
+        db.execute(
+            select(IntakeMessage).where(IntakeMessage.id.in_(ids)).order_by(IntakeMessage.id)
+        ).scalars()
+    )
+
+
+def _owned_by(message_id: int, worker_id: str):
+    return (
+        IntakeMessage.id == message_id,
+        IntakeMessage.status == STATUS_PROCESSING,
+        IntakeMessage.locked_by == worker_id,
+    )
+
+
+def extend_visibility(db: Session, message_id: int, worker_id: str, visibility_timeout: int) -> bool:
+    """
+    Продлить visibility timeout сообщения, пока воркер его разбирает (heartbeat).
+    False — сообщение уже не наше: таймаут истёк и его взял другой воркер.
+    """
+    result = db.execute(
+        update(IntakeMessage)
+        .where(*_owned_by(message_id, worker_id))
+        .values(visible_after=datetime.utcnow() + timedelta(seconds=visibility_timeout))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def complete_message(db: Session, message_id: int, order_id: Optional[int], worker_id: str) -> bool:
+    """
+    Отметить сообщение обработанным — только если оно всё ещё за этим воркером.
+    False — сообщение перехватил другой воркер, итог запишет он.
+    """
+    result = db.execute(
+        update(IntakeMessage)
+        .where(*_owned_by(message_id, worker_id))
+        .values(status=STATUS_DONE, order_id=order_id, last_error=None, locked_by=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def fail_message(
+    db: Session, message: IntakeMessage, error: str, max_attempts: int, worker_id: str
+) -> Optional[str]:
+    """
+    Ошибка обработки: вернуть в очередь с задержкой или, если попытки
+    закончились, отправить в dead letter (status = dead). Возвращает новый статус;
+    None — сообщение уже не за этим воркером, его статус не трогаем.
+    """
+    if message.attempts >= max_attempts:
+        new_status = STATUS_DEAD
+        visible_after = datetime.utcnow()
+    else:
+        new_status = STATUS_PENDING
+        delay = min(2 ** message.attempts, MAX_RETRY_DELAY_SECONDS)
+        visible_after = datetime.utcnow() + timedelta(seconds=delay)
+
+    result = db.execute(
+        update(IntakeMessage)
+        .where(*_owned_by(message.id, worker_id))
+        .values(
+            status=new_status,
+            visible_after=visible_after,
+            last_error=error[:2000],
+            locked_by=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return new_status if result.rowcount > 0 else None
+
+
+def fetch_unsent_replies(db: Session, limit: int = 50) -> List[IntakeMessage]:
+    """
+    Обработанные (или окончательно упавшие) сообщения, по которым клиенту
+    ещё не ответили.
+    """
+    return list(
+        db.execute(
+            select(IntakeMessage)
+            .where(
+                IntakeMessage.status.in_((STATUS_DONE, STATUS_DEAD)),
+                IntakeMessage.reply_sent.is_(False),
+            )
+            .order_by(IntakeMessage.id)
+            .limit(limit)
+        ).scalars()
+    )
+
+
+def mark_reply_sent(db: Session, message_id: int) -> None:
+    db.execute(
+        update(IntakeMessage)
+        .where(IntakeMessage.id == message_id)
+        .values(reply_sent=True)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
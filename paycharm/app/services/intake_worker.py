@@ -0,0 +1,218 @@
+# paycharm/app/services/intake_worker.py
+"""
+Пул процессов, разбирающих очередь intake_messages в заказы.
+
+    python -m paycharm.app.services.intake_worker            # INTAKE_WORKERS процессов
+    python -m paycharm.app.services.intake_worker --workers 8
+
+Ответ клиенту отправляет слушатель (tg/manager_listener.py): у воркеров нет
+Telegram-сессии, они только отмечают сообщение как обработанное.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from paycharm.app.config import settings
+from paycharm.app.database import get_db
+from paycharm.app.services.intake_queue import (
+    STATUS_DEAD,
+    claim_messages,
+    complete_message,
+    extend_visibility,
+    fail_message,
+)
+
+
+logger = logging.getLogger(__name__)
+
+IDLE_SLEEP_SECONDS = 0.5
+# Heartbeat продлевает visibility timeout каждую треть таймаута
+HEARTBEAT_FRACTION = 3
+
+
+@contextmanager
+def _heartbeat(message_id: int, worker_id: str, visibility_timeout: int):
+    """
+    Пока выполняется блок, фоновый поток продлевает visibility timeout
+    сообщения: долгий ответ модели не отдаёт его второму воркеру.
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(visibility_timeout / HEARTBEAT_FRACTION):
+            try:
+                with get_db() as db:
+                    if not extend_visibility(db, message_id, worker_id, visibility_timeout):
+                        logger.warning("Сообщение #%s уже взял другой воркер", message_id)
+                        return
+            except Exception as e:
+                logger.exception("Не удалось продлить сообщение #%s: %s", message_id, e)
+
+    thread = threading.Thread(target=beat, name=f"intake-heartbeat-{message_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def process_message(message) -> int:
+    """
+    Создать заказ из сообщения очереди, затем (не критично) Sheets и email.
+    Возвращает id заказа.
+
+    Доставка «как минимум один раз»: если воркер упадёт между созданием заказа
+    и complete_message, сообщение обработается повторно после visibility timeout.
+    Второй заказ при этом не появится: заказ привязан к сообщению уникальным
+    order_raw_messages.intake_message_id, повтор вернёт уже созданный.
+
+    "Как в прошлый раз" без других данных собирается из прошлого заказа
+    клиента без модели — как у слушателя без очереди.
+    """
+    # Импортируем здесь, чтобы процесс-родитель не тянул модель и интеграции
+    from paycharm.app.integrations.email_service import send_order_notification_email
+    from paycharm.app.integrations.google_sheets import append_order_to_sheet
+    from paycharm.app.services.conversation import is_repeat_request, repeat_order_parsed
+    from paycharm.app.services.order_queries import get_last_customer_order, order_with_items_from_orm
+    from paycharm.app.services.order_service import (
+        create_order_from_parsed,
+        create_order_from_text,
+        get_intake_order,
+    )
+
+    with get_db() as db:
+        existing = get_intake_order(db, message.id)
+        if existing is not None:
+            # Заказ создан прошлой доставкой: модель и уведомления не повторяем
+            return existing.id
+
+        last = None
+        if message.telegram_user_id is not None and is_repeat_request([message.text]):
+            last = get_last_customer_order(db, message.telegram_user_id)
+        if last is not None and last.items:
+            created = create_order_from_parsed(
+                db,
+                repeat_order_parsed(last),
+                raw_text=message.text,
+                telegram_user_id=message.telegram_user_id,
+                telegram_chat_id=message.telegram_chat_id,
+                comment=f"Repeat of order #{last.id}",
+                intake_message_id=message.id,
+            )
+        else:
+            created = create_order_from_text(
+                db=db,
+                raw_text=message.text,
+                telegram_user_id=message.telegram_user_id,
+                telegram_chat_id=message.telegram_chat_id,
+                intake_message_id=message.id,
+            )
+        order = order_with_items_from_orm(created)
+
+    try:
+        append_order_to_sheet(order)
+    except Exception as e:
+        logger.exception("Ошибка при записи заказа в Google Sheets: %s", e)
+
+    try:
+        send_order_notification_email(order)
+    except Exception as e:
+        logger.exception("Ошибка при отправке email уведомления: %s", e)
+
+    return order.id
+
+
+def run_worker(worker_id: str, stop=None) -> None:
+    """
+    Цикл одного воркера: взять сообщение, обработать, отметить результат.
+    stop — multiprocessing.Event для мягкой остановки (None — работать вечно).
+    """
+    logger.info("Воркер %s запущен", worker_id)
+    while stop is None or not stop.is_set():
+        with get_db() as db:
+            messages = claim_messages(
+                db,
+                worker_id=worker_id,
+                limit=1,
+                visibility_timeout=settings.INTAKE_VISIBILITY_TIMEOUT_SECONDS,
+            )
+
+        if not messages:
+            time.sleep(IDLE_SLEEP_SECONDS)
+            continue
+
+        for message in messages:
+            try:
+                with _heartbeat(message.id, worker_id, settings.INTAKE_VISIBILITY_TIMEOUT_SECONDS):
+                    order_id = process_message(message)
+            except Exception as e:
+                logger.exception("Ошибка обработки сообщения #%s: %s", message.id, e)
+                with get_db() as db:
+                    status = fail_message(
+                        db,
+                        message,
+                        error=f"{type(e).__name__}: {e}",
+                        max_attempts=settings.INTAKE_MAX_ATTEMPTS,
+                        worker_id=worker_id,
+                    )
+                if status == STATUS_DEAD:
+                    logger.error("Сообщение #%s отправлено в dead letter", message.id)
+                elif status is None:
+                    logger.warning("Сообщение #%s уже взял другой воркер, ошибку не записываем", message.id)
+                continue
+
+            with get_db() as db:
+                completed = complete_message(db, message.id, order_id, worker_id)
+            if completed:
+                logger.info("Сообщение #%s -> заказ #%s", message.id, order_id)
+            else:
+                logger.warning("Сообщение #%s уже взял другой воркер (заказ #%s)", message.id, order_id)
+
+
+def _worker_main(index: int, stop) -> None:
+    logging.basicConfig(level=logging.INFO)
+    # Ctrl+C обрабатывает родитель, воркер завершает текущее сообщение
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(f"{socket.gethostname()}:{os.getpid()}:{index}", stop)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Воркеры очереди входящих сообщений")
+    parser.add_argument("--workers", type=int, default=settings.INTAKE_WORKERS)
+    args = parser.parse_args()
+
+    if not settings.AI_KEY:
+        raise SystemExit("AI_KEY не задан в .env — воркерам нечем разбирать заказы")
+
+    logging.basicConfig(level=logging.INFO)
+    # spawn: каждый воркер создаёт свой engine/пул соединений с нуля
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    processes = [
+        ctx.Process(target=_worker_main, args=(i, stop), name=f"intake-worker-{i}")
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Останавливаем воркеры…")
+        stop.set()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
 # paycharm/app/services/metrics_service.py
-
+"""
+Метрики для /stats: агрегаты считает база (GROUP BY по дням, только нужные
+колонки, окно по created_at отсекает лишние партиции), заказы из холодного
+архива (services/order_archive.py) добавляются агрегатами по Parquet-файлам.
+"""
 from __future__ import annotations
 
 from collections import defaultdict
 from datetime import datetime, timedelta, date
 from decimal import Decimal
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from paycharm.app.models import Order
+from paycharm.app.services.order_archive import archived_delivery_pairs, archived_sales_by_day
 
 
 def _to_decimal(value) -> Decimal:
@@ -23,6 +29,17 @@ def _to_decimal(value) -> Decimal:
     return Decimal(str(value))
 
 
+def _to_date(value) -> date:
+    """
+    date() в SQLite возвращает строку, в PostgreSQL — date.
+    """
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
 def get_sales_metrics(db: Session, days: int = 30) -> Dict[str, Any]:
     """
     Метрики продаж за последние N дней.
@@ -37,28 +54,25 @@ def get_sales_metrics(db: Session, days: int = 30) -> Dict[str, Any]:
         ],
     }
     """
-    now = datetime.utcnow()
-    date_from = now - timedelta(days=days)
-
-    orders: List[Order] = (
-        db.query(Order)
-        .filter(Order.created_at >= date_from)
-        .all()
-    )
-
-    total_revenue = Decimal("0")
-    total_orders = len(orders)
+    date_from = datetime.utcnow() - timedelta(days=days)
 
     by_day_map: Dict[date, Dict[str, Any]] = defaultdict(lambda: {"orders": 0, "revenue": Decimal("0")})
 
-    for order in orders:
-        total_amount = _to_decimal(getattr(order, "total_amount", 0))
-        created_at: datetime = getattr(order, "created_at", now)
-        day = created_at.date()
+    day = func.date(Order.created_at)
+    rows = db.execute(
+        select(day, func.count(Order.id), func.sum(Order.total_amount))
+        .where(Order.created_at >= date_from)
+        .group_by(day)
+    )
+    for value, orders, revenue in rows:
+        data = by_day_map[_to_date(value)]
+        data["orders"] += orders
+        data["revenue"] += _to_decimal(revenue)
 
-        total_revenue += total_amount
-        by_day_map[day]["orders"] += 1
-        by_day_map[day]["revenue"] += total_amount
+    for value, (orders, revenue) in archived_sales_by_day(date_from).items():
+        data = by_day_map[value]
+        data["orders"] += orders
+        data["revenue"] += _to_decimal(revenue)
 
     by_day_list: List[Dict[str, Any]] = []
     for d, data in sorted(by_day_map.items(), key=lambda x: x[0]):
@@ -71,8 +85,8 @@ def get_sales_metrics(db: Session, days: int = 30) -> Dict[str, Any]:
         )
 
     return {
-        "total_revenue": total_revenue,
-        "total_orders": total_orders,
+        "total_revenue": sum((data["revenue"] for data in by_day_list), Decimal("0")),
+        "total_orders": sum(data["orders"] for data in by_day_list),
         "by_day": by_day_list,
     }
 
@@ -92,48 +106,45 @@ def get_delivery_metrics(db: Session, days: int = 30) -> Dict[str, Any]:
     on_time — delay <= 0
     late    — delay > 0
     """
-    now = datetime.utcnow()
-    date_from = now - timedelta(days=days)
-
-    orders: List[Order] = (
-        db.query(Order)
-        .filter(Order.created_at >= date_from)
-        .all()
+    date_from = datetime.utcnow() - timedelta(days=days)
+
+    # База отдаёт не заказы, а пары (ожидаемый день, фактический день) с числом заказов
+    pairs: Dict[Tuple[date, date], int] = defaultdict(int)
+    expected = func.date(Order.expected_delivery_date)
+    actual = func.date(Order.actual_delivery_date)
+    rows = db.execute(
+        select(expected, actual, func.count(Order.id))
+        .where(
+            Order.created_at >= date_from,
+            Order.expected_delivery_date.isnot(None),
+            Order.actual_delivery_date.isnot(None),
+        )
+        .group_by(expected, actual)
     )
+    for expected_day, actual_day, count in rows:
+        pairs[(_to_date(expected_day), _to_date(actual_day))] += count
+
+    for key, count in archived_delivery_pairs(date_from).items():
+        pairs[key] += count
 
-    delays: List[int] = []
+    total_delay = 0
+    delivered = 0
     on_time = 0
     late = 0
 
-    for order in orders:
-        expected = getattr(order, "expected_delivery_date", None)
-        actual = getattr(order, "actual_delivery_date", None)
-
-        if not expected or not actual:
-            continue
-
-        # Приводим к date
-        if isinstance(expected, datetime):
-            expected_date = expected.date()
-        else:
-            expected_date = expected
-
-        if isinstance(actual, datetime):
-            actual_date = actual.date()
-        else:
-            actual_date = actual
-
+    for (expected_date, actual_date), count in pairs.items():
         delay_days = (actual_date - expected_date).days
-        delays.append(delay_days)
+        total_delay += delay_days * count
+        delivered += count
 
         if delay_days <= 0:
-            on_time += 1
+            on_time += count
         else:
-            late += 1
+            late += count
 
     avg_delay: Optional[float] = None
-    if delays:
-        avg_delay = sum(delays) / len(delays)
+    if delivered:
+        avg_delay = total_delay / delivered
 
     return {
         "avg_delay_days": avg_delay,
@@ -0,0 +1,353 @@
+# paycharm/app/services/order_archive.py
+"""
+Холодный архив закрытых заказов в Parquet.
+
+Закрытые (DELIVERED / CANCELLED) заказы старше ARCHIVE_AFTER_MONTHS месяцев
+вместе с позициями, историей статусов и исходными текстами выгружаются в файлы
+и удаляются из базы. Раскладка — по месяцу создания заказа:
+
+    {ARCHIVE_DIR}/orders/month=2025-03/<первый id>-<последний id>.parquet
+    {ARCHIVE_DIR}/order_items/month=2025-03/...
+    {ARCHIVE_DIR}/status_history/month=2025-03/...
+
+Метрики (services/metrics_service.py) складывают агрегаты по базе с агрегатами
+по архиву: файлы читаются через memory map и только за месяцы, попавшие в окно.
+
+Запуск по cron (до обслуживания партиций: ARCHIVE_AFTER_MONTHS < PARTITION_KEEP_MONTHS,
+чтобы закрытые заказы ушли в архив раньше, чем их партиция будет отсоединена):
+
+    python -m paycharm.app.services.order_archive
+    python -m paycharm.app.services.order_archive --months 18 --dry-run
+
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from paycharm.app.config import settings
+from paycharm.app.database import get_db
+from paycharm.app.models import Order, OrderItem, OrderRawMessage, SheetRow, StatusHistory
+from paycharm.app.services.partitions import add_months, month_start
+from paycharm.app.utils.compression import decompress_text
+from paycharm.app.utils.enums import ALLOWED_TRANSITIONS
+
+
+logger = logging.getLogger(__name__)
+
+# Финальные статусы: из них переходов нет, заказ больше не меняется
+CLOSED_STATUSES = [status.value for status, allowed in ALLOWED_TRANSITIONS.items() if not allowed]
+
+# Заказов в одном файле
+ARCHIVE_BATCH_SIZE = 10_000
+
+_MONTH_DIR_RE = re.compile(r"^month=(\d{4})-(\d{2})$")
+
+
+@lru_cache(maxsize=1)
+def _arrow():
+    """
+    pyarrow импортируется при первой выгрузке/чтении архива: без архива
+    метрики и боты его не загружают.
+    """
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.parquet
+
+    return pyarrow
+
+
+def _schemas() -> Dict[str, Any]:
+    pa = _arrow()
+    money = pa.decimal128(12, 2)
+    ts = pa.timestamp("us")
+    return {
+        "orders": pa.schema([
+            ("id", pa.int64()),
+            ("created_at", ts),
+            ("updated_at", ts),
+            ("status", pa.string()),
+            ("delivery_address", pa.string()),
+            ("contact_email", pa.string()),
+            ("contact_phone", pa.string()),
+            ("total_amount", money),
+            ("expected_delivery_date", ts),
+            ("actual_delivery_date", ts),
+            ("telegram_user_id", pa.int64()),
+            ("telegram_chat_id", pa.int64()),
+            ("source_message", pa.string()),
+            ("llm_response", pa.string()),
+        ]),
+        "order_items": pa.schema([
+            ("id", pa.int64()),
+            ("order_id", pa.int64()),
+            ("name", pa.string()),
+            ("sku", pa.string()),
+            ("quantity", pa.int32()),
+            ("unit_price", money),
+            ("line_amount", money),
+        ]),
+        "status_history": pa.schema([
+            ("id", pa.int64()),
+            ("order_id", pa.int64()),
+            ("old_status", pa.string()),
+            ("new_status", pa.string()),
+            ("changed_at", ts),
+            ("comment", pa.string()),
+        ]),
+    }
+
+
+def _archive_root(archive_dir: Optional[str]) -> Path:
+    return Path(archive_dir or settings.ARCHIVE_DIR)
+
+
+# ==========================
+#  Выгрузка
+# ==========================
+
+def archive_orders(
+    db: Session,
+    before: datetime,
+    archive_dir: Optional[str] = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Перенести в архив закрытые заказы, созданные раньше before.
+    Возвращает {"orders", "order_items", "status_history"} — сколько строк перенесено
+    (в dry_run — сколько заказов было бы перенесено).
+    """
+    closed = (Order.status.in_(CLOSED_STATUSES), Order.created_at < before)
+    if dry_run:
+        count = db.execute(select(func.count(Order.id)).where(*closed)).scalar_one()
+        return {"orders": count, "order_items": 0, "status_history": 0}
+
+    totals = {"orders": 0, "order_items": 0, "status_history": 0}
+    first = db.execute(select(func.min(Order.created_at)).where(*closed)).scalar()
+    if first is None:
+        return totals
+
+    root = _archive_root(archive_dir)
+    month = month_start(first)
+    while month < before.date():
+        start = datetime.combine(month, datetime.min.time())
+        end = min(datetime.combine(add_months(month, 1), datetime.min.time()), before)
+        while True:
+            # Условие по created_at — чтобы запрос шёл только в партицию месяца
+            ids = db.execute(
+                select(Order.id)
+                .where(Order.status.in_(CLOSED_STATUSES), Order.created_at >= start, Order.created_at < end)
+                .order_by(Order.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            for table, count in _archive_batch(db, root, month, start, end, ids).items():
+                totals[table] += count
+        month = add_months(month, 1)
+    return totals
+
+
+def _archive_batch(
+    db: Session,
+    root: Path,
+    month: date,
+    start: datetime,
+    end: datetime,
+    ids: List[int],
+) -> Dict[str, int]:
+    """
+    Записать пачку заказов в файлы и удалить её из базы.
+    Файлы пишутся во временные, переименовываются перед коммитом удаления;
+    если коммит не прошёл — файлы убираются, заказы остаются в базе.
+    """
+    pa = _arrow()
+    schemas = _schemas()
+    in_month = (Order.created_at >= start, Order.created_at < end, Order.id.in_(ids))
+
+    order_rows = db.execute(
+        select(
+            Order.id,
+            Order.created_at,
+            Order.updated_at,
+            Order.status,
+            Order.delivery_address,
+            Order.contact_email,
+            Order.contact_phone,
+            Order.total_amount,
+            Order.expected_delivery_date,
+            Order.actual_delivery_date,
+            Order.telegram_user_id,
+            Order.telegram_chat_id,
+            OrderRawMessage.source_message,
+            OrderRawMessage.llm_response,
+        )
+        .outerjoin(OrderRawMessage, OrderRawMessage.order_id == Order.id)
+        .where(*in_month)
+    ).mappings().all()
+    orders = [
+        {
+            **row,
+            "source_message": decompress_text(row["source_message"]),
+            "llm_response": decompress_text(row["llm_response"]),
+        }
+        for row in order_rows
+    ]
+    items = db.execute(
+        select(*(OrderItem.__table__.c[name] for name in schemas["order_items"].names))
+        .where(OrderItem.order_id.in_(ids))
+    ).mappings().all()
+    # История не старше заказа: условие по changed_at отсекает лишние партиции
+    history = db.execute(
+        select(*(StatusHistory.__table__.c[name] for name in schemas["status_history"].names))
+        .where(StatusHistory.order_id.in_(ids), StatusHistory.changed_at >= start)
+    ).mappings().all()
+
+    tables = {
+        "orders": pa.Table.from_pylist(orders, schema=schemas["orders"]),
+        "order_items": pa.Table.from_pylist([dict(row) for row in items], schema=schemas["order_items"]),
+        "status_history": pa.Table.from_pylist([dict(row) for row in history], schema=schemas["status_history"]),
+    }
+
+    name = f"{ids[0]}-{ids[-1]}.parquet"
+    written: List[Tuple[Path, Path]] = []
+    for kind, table in tables.items():
+        directory = root / kind / f"month={month:%Y-%m}"
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / f".{name}.tmp"
+        pa.parquet.write_table(table, tmp, compression="zstd")
+        written.append((tmp, directory / name))
+
+    try:
+        db.execute(delete(OrderItem).where(OrderItem.order_id.in_(ids)))
+        db.execute(delete(StatusHistory).where(StatusHistory.order_id.in_(ids), StatusHistory.changed_at >= start))
+        db.execute(delete(OrderRawMessage).where(OrderRawMessage.order_id.in_(ids)))
+        # Кэш строк Google Sheets: заказ больше не изменится, синхронизация его не увидит
+        db.execute(delete(SheetRow).where(SheetRow.order_id.in_(ids)))
+        db.execute(delete(Order).where(*in_month))
+        for tmp, final in written:
+            os.replace(tmp, final)
+        db.commit()
+    except Exception:
+        db.rollback()
+        for tmp, final in written:
+            for path in (tmp, final):
+                if path.exists():
+                    path.unlink()
+        raise
+
+    logger.info("Архив %s: %s заказов (#%s..#%s)", f"{month:%Y-%m}", len(ids), ids[0], ids[-1])
+    return {kind: table.num_rows for kind, table in tables.items()}
+
+
+# ==========================
+#  Чтение для метрик
+# ==========================
+
+def _month_files(root: Path, kind: str, date_from: datetime) -> List[Path]:
+    """
+    Файлы архива за месяцы, которые пересекаются с окном [date_from, ...).
+    """
+    base = root / kind
+    if not base.is_dir():
+        return []
+    first = month_start(date_from.date())
+    files: List[Path] = []
+    for directory in base.iterdir():
+        match = _MONTH_DIR_RE.match(directory.name)
+        if match and date(int(match.group(1)), int(match.group(2)), 1) >= first:
+            files.extend(sorted(directory.glob("*.parquet")))
+    return files
+
+
+def _read_orders(date_from: datetime, columns: List[str], archive_dir: Optional[str]):
+    files = _month_files(_archive_root(archive_dir), "orders", date_from)
+    if not files:
+        return None
+    pa = _arrow()
+    tables = [
+        pa.parquet.read_table(path, columns=columns, memory_map=True, filters=[("created_at", ">=", date_from)])
+        for path in files
+    ]
+    return pa.concat_tables(tables)
+
+
+def archived_sales_by_day(date_from: datetime, archive_dir: Optional[str] = None) -> Dict[date, Tuple[int, Any]]:
+    """
+    {день: (заказов, выручка)} по архиву начиная с date_from.
+    """
+    table = _read_orders(date_from, ["created_at", "total_amount"], archive_dir)
+    if table is None or table.num_rows == 0:
+        return {}
+    pa = _arrow()
+    pc = pa.compute
+    grouped = (
+        pa.table({"day": pc.cast(table["created_at"], pa.date32()), "total_amount": table["total_amount"]})
+        .group_by("day")
+        .aggregate([
+            ("total_amount", "count", pc.CountOptions(mode="all")),
+            ("total_amount", "sum"),
+        ])
+    )
+    return {
+        row["day"]: (row["total_amount_count"], row["total_amount_sum"])
+        for row in grouped.to_pylist()
+    }
+
+
+def archived_delivery_pairs(date_from: datetime, archive_dir: Optional[str] = None) -> Dict[Tuple[date, date], int]:
+    """
+    {(ожидаемая дата, фактическая дата): заказов} по архиву начиная с date_from.
+    """
+    table = _read_orders(date_from, ["id", "created_at", "expected_delivery_date", "actual_delivery_date"], archive_dir)
+    if table is None or table.num_rows == 0:
+        return {}
+    pa = _arrow()
+    pc = pa.compute
+    table = table.filter(
+        pc.and_(pc.is_valid(table["expected_delivery_date"]), pc.is_valid(table["actual_delivery_date"]))
+    )
+    grouped = (
+        pa.table({
+            "expected": pc.cast(table["expected_delivery_date"], pa.date32()),
+            "actual": pc.cast(table["actual_delivery_date"], pa.date32()),
+            "id": table["id"],
+        })
+        .group_by(["expected", "actual"])
+        .aggregate([("id", "count")])
+    )
+    return {(row["expected"], row["actual"]): row["id_count"] for row in grouped.to_pylist()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=settings.ARCHIVE_AFTER_MONTHS, help="архивировать старше N месяцев")
+    parser.add_argument("--dir", default=None, help=f"каталог архива (по умолчанию {settings.ARCHIVE_DIR})")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать заказы")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    before = datetime.combine(add_months(month_start(date.today()), -args.months), datetime.min.time())
+    with get_db() as db:
+        result = archive_orders(db, before, args.dir, args.batch_size, dry_run=args.dry_run)
+
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(
+        f"{prefix}заказы до {before:%Y-%m-%d}: {result['orders']}, "
+        f"позиций {result['order_items']}, записей истории {result['status_history']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
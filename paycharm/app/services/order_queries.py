@@ -0,0 +1,325 @@
+# paycharm/app/services/order_queries.py
+"""
+Чтение заказов в read models (app/read_models.py) без ORM-объектов:
+выбираем только нужные колонки и сразу собираем неизменяемые представления.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Float, Text, case, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from paycharm.app.models import Order, OrderItem, OrderRawMessage
+from paycharm.app.read_models import (
+    CustomerOrders,
+    OrderItemView,
+    OrderRawText,
+    OrderSearchHit,
+    OrderSummary,
+    OrderWithItems,
+)
+from paycharm.app.services.validation import normalize_email, normalize_phone
+from paycharm.app.utils.compression import decompress_text
+from paycharm.app.utils.enums import OrderStatus
+from paycharm.app.utils.fuzzy_match import normalize_name
+
+# Короче триграммный индекс не помогает (pg_trgm нужно хотя бы 3 символа)
+SEARCH_MIN_QUERY_CHARS = 3
+# Сколько символов исходного текста индексируется для поиска
+SEARCH_TEXT_MAX_CHARS = 2000
+# Совпадений на источник (адрес / товары / текст), из которых выбирается лучшее:
+# GiST-индекс отдаёт их сразу по сходству, частый фрагмент вроде "москва"
+# не заставляет сортировать сотни тысяч строк
+SEARCH_MAX_CANDIDATES = 1000
+
+_ORDER_COLUMNS = (
+    Order.id,
+    Order.created_at,
+    Order.status,
+    Order.total_amount,
+    Order.delivery_address,
+    Order.contact_email,
+    Order.contact_phone,
+    Order.expected_delivery_date,
+    Order.actual_delivery_date,
+)
+
+_ITEM_COLUMNS = (
+    OrderItem.order_id,
+    OrderItem.name,
+    OrderItem.sku,
+    OrderItem.quantity,
+    OrderItem.unit_price,
+    OrderItem.line_amount,
+)
+
+
+def list_order_summaries(db: Session, limit: int = 10) -> List[OrderSummary]:
+    """
+    Последние N заказов по дате создания (убывание).
+    """
+    rows = db.execute(
+        select(Order.id, Order.created_at, Order.status, Order.total_amount)
+        .order_by(Order.created_at.desc())
+        .limit(limit)
+    )
+    return [
+        OrderSummary(id=row.id, created_at=row.created_at, status=row.status, total_amount=_money(row.total_amount))
+        for row in rows
+    ]
+
+
+def find_customer_orders(db: Session, contact: str, limit: int = 10) -> Optional[CustomerOrders]:
+    """
+    Заказы клиента по телефону или email в любом написании — по индексам
+    contact_phone_norm / contact_email_norm. None — contact не похож ни на то, ни на другое.
+    """
+    if "@" in contact:
+        column, value = Order.contact_email_norm, normalize_email(contact)
+    else:
+        column, value = Order.contact_phone_norm, normalize_phone(contact)
+    if value is None:
+        return None
+
+    stats = db.execute(
+        select(
+            func.count(),
+            func.sum(case((Order.status != OrderStatus.CANCELLED.value, Order.total_amount), else_=0)),
+            func.max(Order.created_at),
+        ).where(column == value)
+    ).one()
+    rows = db.execute(
+        select(Order.id, Order.created_at, Order.status, Order.total_amount)
+        .where(column == value)
+        .order_by(Order.created_at.desc())
+        .limit(limit)
+    )
+    return CustomerOrders(
+        contact=value,
+        orders_count=stats[0],
+        total_spent=_money(stats[1]),
+        last_order_at=stats[2],
+        orders=tuple(
+            OrderSummary(id=row.id, created_at=row.created_at, status=row.status, total_amount=_money(row.total_amount))
+            for row in rows
+        ),
+    )
+
+
+def get_last_customer_order(db: Session, telegram_user_id: int) -> Optional[OrderWithItems]:
+    """
+    Последний разобранный заказ клиента Telegram (для "как в прошлый раз").
+    """
+    order_id = db.execute(
+        select(Order.id)
+        .where(
+            Order.telegram_user_id == telegram_user_id,
+            Order.status.not_in((OrderStatus.RECEIVED.value, OrderStatus.PARSE_FAILED.value)),
+        )
+        .order_by(Order.created_at.desc())
+        .limit(1)
+    ).scalar()
+    if order_id is None:
+        return None
+    return get_order_with_items(db, order_id)
+
+
+def raw_search_text(raw_text: str) -> str:
+    """
+    Исходный текст заказа для поиска (order_raw_messages.search_text):
+    нижний регистр, ё -> е, только буквы и цифры, первые SEARCH_TEXT_MAX_CHARS символов.
+    """
+    return normalize_name(raw_text or "")[:SEARCH_TEXT_MAX_CHARS]
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _distance(query: str, column):
+    """
+    query <<-> column (pg_trgm): 1 - word_similarity(query, column), по нему
+    сортирует GiST-индекс.
+    """
+    return literal(query, Text).op("<<->", return_type=Float)(column)
+
+
+def find_orders(db: Session, query: str, limit: int = 10, offset: int = 0) -> Tuple[List[OrderSearchHit], bool]:
+    """
+    Заказы, у которых фрагмент query есть в адресе доставки, в названии товара
+    или в исходном тексте. Подстрока ищется по GiST-индексам pg_trgm
+    (миграция 0018), порядок — по сходству (word_similarity), затем новые выше.
+
+    Возвращает (страница результатов, есть ли следующая страница).
+    Из каждого источника берётся не больше SEARCH_MAX_CANDIDATES лучших совпадений
+    (KNN-обход индекса по query <<-> col). Среди равных по сходству индекс
+    отдаёт строки в произвольном порядке: если равных больше лимита, в выдачу
+    попадают не обязательно самые новые из них.
+    Только PostgreSQL.
+    """
+    query = " ".join(query.split())
+    normalized = normalize_name(query)
+    if len(normalized) < SEARCH_MIN_QUERY_CHARS:
+        return [], False
+
+    pattern = _like_pattern(query)
+    address_score = func.word_similarity(query, Order.delivery_address)
+    item_score = func.word_similarity(query, OrderItem.name)
+    # Совпадение только в тексте сообщения чуть ниже прямого в адресе/товаре
+    text_score = func.word_similarity(normalized, OrderRawMessage.search_text) * literal(0.9)
+
+    # Лимит источника — по лучшим совпадениям, а не по первым попавшимся строкам.
+    # <<-> — расстояние 1 - word_similarity: GiST-индекс отдаёт строки сразу в этом
+    # порядке и останавливается на лимите. Второй ключ сортировки не добавляем —
+    # с ним Postgres досортировывал бы все равные совпадения
+    by_address = (
+        select(Order.id.label("order_id"), address_score.label("score"))
+        .where(Order.delivery_address.ilike(pattern, escape="\\"))
+        .order_by(_distance(query, Order.delivery_address))
+    )
+    by_item = (
+        select(OrderItem.order_id.label("order_id"), item_score.label("score"))
+        .where(OrderItem.name.ilike(pattern, escape="\\"))
+        .order_by(_distance(query, OrderItem.name))
+    )
+    by_text = (
+        select(OrderRawMessage.order_id.label("order_id"), text_score.label("score"))
+        .where(OrderRawMessage.search_text.like(_like_pattern(normalized), escape="\\"))
+        .order_by(_distance(normalized, OrderRawMessage.search_text))
+    )
+
+    sources = [source.limit(SEARCH_MAX_CANDIDATES).subquery() for source in (by_address, by_item, by_text)]
+    matches = union_all(*(select(source.c.order_id, source.c.score) for source in sources)).subquery()
+    best = (
+        select(matches.c.order_id, func.max(matches.c.score).label("score"))
+        .group_by(matches.c.order_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Order.id,
+            Order.created_at,
+            Order.status,
+            Order.total_amount,
+            Order.delivery_address,
+            best.c.score,
+        )
+        .join(best, best.c.order_id == Order.id)
+        .order_by(best.c.score.desc(), Order.created_at.desc())
+        .offset(offset)
+        .limit(limit + 1)
+    ).all()
+
+    hits = [
+        OrderSearchHit(
+            order=OrderSummary(
+                id=row.id, created_at=row.created_at, status=row.status, total_amount=_money(row.total_amount)
+            ),
+            score=float(row.score or 0),
+            delivery_address=row.delivery_address,
+        )
+        for row in rows[:limit]
+    ]
+    return hits, len(rows) > limit
+
+
+def get_order_with_items(db: Session, order_id: int) -> Optional[OrderWithItems]:
+    orders = get_orders_with_items(db, [order_id])
+    return orders[0] if orders else None
+
+
+def get_orders_with_items(db: Session, order_ids: Iterable[int]) -> List[OrderWithItems]:
+    """
+    Заказы с позициями двумя запросами (заказы + все их позиции), в порядке id.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return []
+
+    items_by_order: Dict[int, List[OrderItemView]] = defaultdict(list)
+    for row in db.execute(
+        select(*_ITEM_COLUMNS).where(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.id)
+    ):
+        items_by_order[row.order_id].append(
+            OrderItemView(
+                name=row.name,
+                sku=row.sku,
+                quantity=row.quantity,
+                unit_price=_money(row.unit_price),
+                line_amount=_money(row.line_amount),
+            )
+        )
+
+    rows = db.execute(select(*_ORDER_COLUMNS).where(Order.id.in_(order_ids)).order_by(Order.id))
+    return [
+        OrderWithItems(
+            id=row.id,
+            created_at=row.created_at,
+            status=row.status,
+            total_amount=_money(row.total_amount),
+            delivery_address=row.delivery_address,
+            contact_email=row.contact_email,
+            contact_phone=row.contact_phone,
+            expected_delivery_date=row.expected_delivery_date,
+            actual_delivery_date=row.actual_delivery_date,
+            items=tuple(items_by_order.get(row.id, ())),
+        )
+        for row in rows
+    ]
+
+
+def get_order_raw_text(db: Session, order_id: int) -> Optional[OrderRawText]:
+    """
+    Сырые тексты заказа — отдельным запросом, распаковываются только здесь.
+    """
+    row = db.execute(
+        select(OrderRawMessage.source_message, OrderRawMessage.llm_response)
+        .where(OrderRawMessage.order_id == order_id)
+    ).first()
+    if row is None:
+        return None
+    return OrderRawText(
+        order_id=order_id,
+        source_message=decompress_text(row.source_message),
+        llm_response=decompress_text(row.llm_response),
+    )
+
+
+def order_with_items_from_orm(order: Order) -> OrderWithItems:
+    """
+    Снимок уже загруженного ORM-заказа (например, сразу после создания) —
+    чтобы дальше по конвейеру шёл объект без сессии.
+    """
+    return OrderWithItems(
+        id=order.id,
+        created_at=order.created_at,
+        status=order.status,
+        total_amount=_money(order.total_amount),
+        delivery_address=order.delivery_address,
+        contact_email=order.contact_email,
+        contact_phone=order.contact_phone,
+        expected_delivery_date=order.expected_delivery_date,
+        actual_delivery_date=order.actual_delivery_date,
+        items=tuple(
+            OrderItemView(
+                name=item.name,
+                sku=item.sku,
+                quantity=item.quantity,
+                unit_price=_money(item.unit_price),
+                line_amount=_money(item.line_amount),
+            )
+            for item in order.items
+        ),
+    )
+
+
+def _money(value) -> Decimal:
+    if value is None:
+        return Decimal("0")
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
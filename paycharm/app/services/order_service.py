@@ -2,22 +2,90 @@
 
 from __future__ import annotations
 
+import logging
 from collections import defaultdict
 from datetime import datetime, timedelta, date
 from decimal import Decimal
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Callable, Dict, Any, List, Optional
 
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-from paycharm.app.models import Order, OrderItem, StatusHistory
-from paycharm.app.utils.enums import OrderStatus
+from paycharm.app.integrations.telegram_notify import enqueue_status_notification
+from paycharm.app.models import Order, OrderItem, OrderRawMessage, StatusHistory
+from paycharm.app.utils.compression import compress_text, decompress_text
+from paycharm.app.utils.enums import OrderStatus, can_transition
 from paycharm.app.services.validation import (
     is_valid_email,
     is_valid_phone,
+    normalize_email,
+    normalize_phone,
     check_items_availability,
     calculate_total,
+    determine_status,
+    prefetch_item_match,
 )
-from paycharm.app.services.ai_parser import parse_order_text
+from paycharm.app.services.ai_parser import parse_order_text_with_raw
+from paycharm.app.services.order_queries import raw_search_text
+from paycharm.app.services.stock_service import (
+    lines_by_sku,
+    reserve_stock,
+    release_stock,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Канал NOTIFY, в который пишет триггер на таблице orders (см. миграцию 0007):
+# payload — id созданного/изменённого/удалённого заказа
+ORDERS_CHANNEL = "orders_changed"
+
+# Подписчики на изменения заказов в этом процессе (например, кэш ответов
+# админки): вызываются с id заказа после коммита, в потоке вызывающего
+order_change_listeners: List[Callable[[int], None]] = []
+
+# Статусы, в которых заказ держит резерв остатков: переход в них из статуса без
+# резерва (OUT_OF_STOCK, AMBIGUOUS_ITEMS) списывает остатки, в OUT_OF_STOCK — возвращает
+STOCK_HOLDING_STATUSES = frozenset({
+    OrderStatus.PENDING,
+    OrderStatus.INVALID_CONTACT,
+    OrderStatus.CONFIRMED,
+})
+
+# Код ошибки PostgreSQL lock_not_available (FOR UPDATE NOWAIT не смог взять блокировку)
+LOCK_NOT_AVAILABLE_PGCODE = "55P03"
+
+
+class OrderConcurrencyError(RuntimeError):
+    """
+    Заказ одновременно меняет другой админ/воркер — нужно повторить попытку.
+    """
+
+
+class InvalidStatusTransition(ValueError):
+    """
+    Переход между статусами не разрешён таблицей ALLOWED_TRANSITIONS.
+    """
+
+
+class InsufficientStockError(InvalidStatusTransition):
+    """
+    Перевести заказ в статус с резервом нельзя: остатков не хватает.
+    """
+
+
+def _is_lock_not_available(exc: OperationalError) -> bool:
+    return getattr(exc.orig, "pgcode", None) == LOCK_NOT_AVAILABLE_PGCODE
+
+
+def _order_changed(order_id: int) -> None:
+    for listener in list(order_change_listeners):
+        try:
+            listener(order_id)
+        except Exception:
+            logger.exception("Ошибка в подписчике изменений заказа #%s", order_id)
 
 
 # ==========================
@@ -29,6 +97,7 @@ def create_order_from_text(
     raw_text: str,
     telegram_user_id: Optional[int] = None,
     telegram_chat_id: Optional[int] = None,
+    intake_message_id: Optional[int] = None,
 ) -> Order:
     """
     Главная функция: принимает текст сообщения пользователя,
@@ -37,10 +106,182 @@ def create_order_from_text(
     raw_text — исходный текст сообщения (из Telegram).
     telegram_user_id / telegram_chat_id — опциональные идентификаторы,
     можно использовать для отправки уведомлений при смене статуса.
+    intake_message_id — сообщение очереди intake_messages (см. create_order_from_parsed).
+    """
+    parsed, llm_response = parse_order_text_with_raw(raw_text, on_item=prefetch_item_match)
+
+    return create_order_from_parsed(
+        db,
+        parsed,
+        raw_text=raw_text,
+        telegram_user_id=telegram_user_id,
+        telegram_chat_id=telegram_chat_id,
+        llm_response=llm_response,
+        intake_message_id=intake_message_id,
+    )
+
+
+def create_order_from_parsed(
+    db: Session,
+    parsed: Dict[str, Any],
+    raw_text: str,
+    telegram_user_id: Optional[int] = None,
+    telegram_chat_id: Optional[int] = None,
+    comment: str = "Order created from user message",
+    llm_response: Optional[str] = None,
+    intake_message_id: Optional[int] = None,
+) -> Order:
+    """
+    Создать заказ из уже разобранных данных (ответ модели или JSON из API):
+    {"items": [{"name", "quantity"}], "delivery_address", "contact_email", "contact_phone"}.
+
+    llm_response — сырой ответ модели, сохраняется сжатым рядом с исходным текстом.
+    intake_message_id — не больше одного заказа на сообщение очереди: если другой
+    воркер уже создал заказ из него, транзакция откатывается и возвращается тот заказ.
+    """
+    raw_message = _raw_message(raw_text, llm_response)
+    raw_message.intake_message_id = intake_message_id
+    order = Order(
+        raw_message=raw_message,
+        telegram_user_id=telegram_user_id,
+        telegram_chat_id=telegram_chat_id,
+    )
+    db.add(order)
+
+    try:
+        _fill_order(db, order, parsed, old_status=None, comment=comment)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = get_intake_order(db, intake_message_id) if intake_message_id is not None else None
+        if existing is None:
+            raise
+        logger.info("Заказ из сообщения очереди #%s уже создан: #%s", intake_message_id, existing.id)
+        return existing
+    db.refresh(order)
+    _order_changed(order.id)
+    return order
+
+
+def register_order_text(
+    db: Session,
+    raw_text: str,
+    telegram_user_id: Optional[int] = None,
+    telegram_chat_id: Optional[int] = None,
+) -> Order:
+    """
+    Быстро сохранить текст заказа без разбора (статус RECEIVED), чтобы сразу
+    отдать клиенту номер заказа. Разбор — complete_received_order.
+    """
+    order = Order(
+        status=OrderStatus.RECEIVED.value,
+        raw_message=_raw_message(raw_text),
+        telegram_user_id=telegram_user_id,
+        telegram_chat_id=telegram_chat_id,
+    )
+    db.add(order)
+    db.flush()
+
+    db.add(
+        StatusHistory(
+            order_id=order.id,
+            old_status=None,
+            new_status=OrderStatus.RECEIVED.value,
+            comment="Order text received, parsing deferred",
+        )
+    )
+    db.commit()
+    db.refresh(order)
+    _order_changed(order.id)
+    return order
+
+
+def complete_received_order(db: Session, order_id: int, retry_failed: bool = False) -> Order:
     """
+    Разобрать текст заказа в статусе RECEIVED и заполнить его.
+    Если модель не справилась — статус PARSE_FAILED, исключение пробрасываем.
 
-    parsed: Dict[str, Any] = parse_order_text(raw_text)
+    retry_failed — разбирать заново и заказ в PARSE_FAILED (повтор из deferred_parse).
+    """
+    order = (
+        db.query(Order)
+        .filter(Order.id == order_id)
+        .with_for_update()
+        .first()
+    )
+    if not order:
+        raise ValueError(f"Order with id={order_id} not found")
+    retryable = {OrderStatus.RECEIVED.value}
+    if retry_failed:
+        retryable.add(OrderStatus.PARSE_FAILED.value)
+    if order.status not in retryable:
+        # Уже разобран (например, повторная доставка задачи)
+        db.rollback()
+        return order
+    old_status = order.status
 
+    raw = order.raw_message
+    try:
+        parsed, llm_response = parse_order_text_with_raw(
+            decompress_text(raw.source_message), on_item=prefetch_item_match
+        )
+    except Exception as e:
+        order.status = OrderStatus.PARSE_FAILED.value
+        db.add(
+            StatusHistory(
+                order_id=order.id,
+                old_status=old_status,
+                new_status=OrderStatus.PARSE_FAILED.value,
+                comment=f"Parsing failed: {e}"[:1000],
+            )
+        )
+        db.commit()
+        _order_changed(order_id)
+        raise
+
+    raw.llm_response = compress_text(llm_response)
+    _fill_order(
+        db,
+        order,
+        parsed,
+        old_status=old_status,
+        comment="Order parsed from user message",
+    )
+    db.commit()
+    db.refresh(order)
+    _order_changed(order.id)
+    return order
+
+
+def get_intake_order(db: Session, intake_message_id: int) -> Optional[Order]:
+    """
+    Заказ, созданный из сообщения очереди intake_messages, или None.
+    """
+    order_id = db.execute(
+        select(OrderRawMessage.order_id).where(OrderRawMessage.intake_message_id == intake_message_id)
+    ).scalar()
+    return db.get(Order, order_id) if order_id is not None else None
+
+
+def _raw_message(raw_text: str, llm_response: Optional[str] = None) -> OrderRawMessage:
+    return OrderRawMessage(
+        source_message=compress_text(raw_text),
+        llm_response=compress_text(llm_response),
+        search_text=raw_search_text(raw_text),
+    )
+
+
+def _fill_order(
+    db: Session,
+    order: Order,
+    parsed: Dict[str, Any],
+    old_status: Optional[str],
+    comment: str,
+) -> None:
+    """
+    Валидация, расчёт, позиции, история и резерв остатков для заказа.
+    Коммит делает вызывающий.
+    """
     items = parsed.get("items") or []
     delivery_address = parsed.get("delivery_address") or ""
     contact_email = parsed.get("contact_email") or ""
@@ -51,34 +292,19 @@ def create_order_from_text(
     phone_ok = is_valid_phone(contact_phone)
 
     # Проверка наличия и цен
-    all_in_stock, items_with_prices = check_items_availability(items)
-    total = calculate_total(items_with_prices)  # Decimal или float
+    _, items_with_prices = check_items_availability(items)
+    total = calculate_total(items_with_prices)  # Decimal, посчитан в копейках
 
     # Определяем статус
-    status = OrderStatus.PENDING
-    if not email_ok or not phone_ok:
-        status = OrderStatus.INVALID_CONTACT
-    if not all_in_stock:
-        status = OrderStatus.OUT_OF_STOCK
-
-    # Сбор kwargs для Order (поддерживаем опциональные поля)
-    order_kwargs: Dict[str, Any] = dict(
-        status=status.value,
-        delivery_address=delivery_address,
-        contact_email=contact_email,
-        contact_phone=contact_phone,
-        total_amount=total,
-        source_message=raw_text,
-    )
-
-    # Если в модели Order есть поля telegram_user_id / telegram_chat_id — заполним
-    if telegram_user_id is not None and hasattr(Order, "telegram_user_id"):
-        order_kwargs["telegram_user_id"] = telegram_user_id
-    if telegram_chat_id is not None and hasattr(Order, "telegram_chat_id"):
-        order_kwargs["telegram_chat_id"] = telegram_chat_id
-
-    order = Order(**order_kwargs)
-    db.add(order)
+    status = determine_status(email_ok, phone_ok, items_with_prices)
+
+    order.status = status.value
+    order.delivery_address = delivery_address
+    order.contact_email = contact_email
+    order.contact_phone = contact_phone
+    order.contact_email_norm = normalize_email(contact_email)
+    order.contact_phone_norm = normalize_phone(contact_phone)
+    order.total_amount = total
     db.flush()  # получим order.id до commit
 
     # Позиции заказа
@@ -90,6 +316,7 @@ def create_order_from_text(
         order_item = OrderItem(
             order_id=order.id,
             name=item["name"],
+            sku=item["sku"],
             quantity=quantity,
             unit_price=unit_price,
             line_amount=line_amount,
@@ -99,15 +326,22 @@ def create_order_from_text(
     # История статусов
     history = StatusHistory(
         order_id=order.id,
-        old_status=None,
+        old_status=old_status,
         new_status=status.value,
-        comment="Order created from user message",
+        comment=comment,
     )
     db.add(history)
 
-    db.commit()
-    db.refresh(order)
-    return order
+    # Резерв остатков — последним шагом перед commit, чтобы блокировки
+    # строк products держались как можно меньше
+    if status in (OrderStatus.PENDING, OrderStatus.INVALID_CONTACT):
+        db.flush()
+        if reserve_stock(db, lines_by_sku(items_with_prices)):
+            order.stock_reserved = True
+        else:
+            # Остатка не хватило (или товар раскупили, пока разбирали заказ)
+            order.status = OrderStatus.OUT_OF_STOCK.value
+            history.new_status = OrderStatus.OUT_OF_STOCK.value
 
 
 # ==========================
@@ -143,51 +377,95 @@ def set_order_status(
     Сменить статус заказа, дополнительно можно указать ожидаемую дату доставки.
 
     Логика:
-      - находим заказ
+      - блокируем строку заказа (SELECT ... FOR UPDATE NOWAIT)
+      - проверяем, что переход разрешён (ALLOWED_TRANSITIONS)
       - пишем запись в StatusHistory
       - при статусе DELIVERED ставим actual_delivery_date (если не стоит)
-      - сохраняем и возвращаем обновлённый заказ
+      - при переходе в STOCK_HOLDING_STATUSES без резерва списываем остатки
+        (не хватило — InsufficientStockError, статус не меняется)
+      - при статусах CANCELLED / OUT_OF_STOCK возвращаем зарезервированные остатки
+      - ставим в очередь уведомление клиенту (status_notifications)
+      - сохраняем (compare-and-set по Order.version) и возвращаем обновлённый заказ
+
+    Если заказ прямо сейчас меняет кто-то другой — OrderConcurrencyError,
+    если переход недопустим — InvalidStatusTransition (InsufficientStockError).
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise ValueError(f"Order with id={order_id} not found")
-
-    # Если используем enum — проверим, что такой статус существует
     try:
-        os = OrderStatus(new_status)
-        status_value = os.value
+        status = OrderStatus(new_status)
     except ValueError:
-        # Если значение не из enum — всё равно сохраняем строку,
-        # но можно выбросить ошибку, если хочешь строгий контроль.
-        status_value = new_status
-
-    old_status = order.status
-    order.status = status_value
-
-    if expected_delivery_date is not None:
-        # предполагаем, что поле в модели: expected_delivery_date (Date/DateTime)
-        order.expected_delivery_date = expected_delivery_date
+        raise InvalidStatusTransition(f"Unknown order status: {new_status!r}")
 
-    # Если заказ доставлен — пометим фактическую дату доставки
     try:
-        delivered_status = OrderStatus.DELIVERED.value
+        order = (
+            db.query(Order)
+            .filter(Order.id == order_id)
+            .with_for_update(nowait=True)
+            .first()
+        )
+        if not order:
+            raise ValueError(f"Order with id={order_id} not found")
+
+        old_status = order.status
+        try:
+            old = OrderStatus(old_status)
+        except ValueError:
+            # Старые/ручные значения статуса не ограничиваем
+            old = None
+
+        if old is not None and not can_transition(old, status):
+            raise InvalidStatusTransition(
+                f"Transition {old.value} -> {status.value} is not allowed for order {order_id}"
+            )
+
+        order.status = status.value
+
+        if expected_delivery_date is not None:
+            order.expected_delivery_date = expected_delivery_date
+
+        # Если заказ доставлен — пометим фактическую дату доставки
+        if status == OrderStatus.DELIVERED and order.actual_delivery_date is None:
+            order.actual_delivery_date = datetime.utcnow()
+
+        # Отмена и "нет в наличии" возвращают зарезервированные остатки
+        if status in (OrderStatus.CANCELLED, OrderStatus.OUT_OF_STOCK) and order.stock_reserved:
+            release_stock(db, lines_by_sku(order.items))
+            order.stock_reserved = False
+
+        # Подтвердить/вернуть в работу заказ без резерва — только списав остатки
+        if status in STOCK_HOLDING_STATUSES and not order.stock_reserved:
+            if not reserve_stock(db, lines_by_sku(order.items)):
+                raise InsufficientStockError(
+                    f"Not enough stock to move order {order_id} to {status.value}"
+                )
+            order.stock_reserved = True
+
+        # История статусов
+        history = StatusHistory(
+            order_id=order.id,
+            old_status=old_status,
+            new_status=status.value,
+            comment="Status changed via admin bot",
+        )
+        db.add(history)
+
+        # Уведомление клиенту уходит через outbox в той же транзакции
+        if old_status != status.value:
+            enqueue_status_notification(db, order, old_status, status.value)
+
+        db.commit()
+    except (OperationalError, StaleDataError) as e:
+        db.rollback()
+        if isinstance(e, OperationalError) and not _is_lock_not_available(e):
+            raise
+        raise OrderConcurrencyError(
+            f"Order {order_id} is being modified concurrently, retry later"
+        ) from e
     except Exception:
-        delivered_status = "delivered"
-
-    if status_value == delivered_status and getattr(order, "actual_delivery_date", None) is None:
-        order.actual_delivery_date = datetime.utcnow()
-
-    # История статусов
-    history = StatusHistory(
-        order_id=order.id,
-        old_status=old_status,
-        new_status=status_value,
-        comment="Status changed via admin bot",
-    )
-    db.add(history)
+        db.rollback()
+        raise
 
-    db.commit()
     db.refresh(order)
+    _order_changed(order.id)
     return order
 
 
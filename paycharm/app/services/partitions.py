@@ -0,0 +1,229 @@
+# paycharm/app/services/partitions.py
+"""
+Обслуживание помесячных партиций orders и status_history (PostgreSQL, см. миграцию 0008).
+
+- заранее создаёт партиции на months_ahead месяцев вперёд, чтобы новые заказы
+  не падали в DEFAULT-партицию
+- отсоединяет (DETACH) партиции старше keep_months месяцев: они остаются
+  обычными таблицами и больше не участвуют в запросах, VACUUM и индексах
+  основной таблицы; архивировать/удалять их — отдельный шаг
+- партиция, где ещё остались заказы (или история живых заказов), не
+  отсоединяется: у таких заказов есть позиции, исходные тексты и строки
+  sheet_rows, которые без заказа остались бы сиротами. Закрытые заказы
+  уносит в архив order_archive, открытые надо закрыть или перенести вручную
+
+Запуск по cron раз в сутки:
+
+    python -m paycharm.app.services.partitions
+    python -m paycharm.app.services.partitions --months-ahead 6 --keep-months 36 --dry-run
+
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from paycharm.app.config import settings
+from paycharm.app.database import get_db
+
+
+logger = logging.getLogger(__name__)
+
+# Таблица -> колонка, по которой она разбита на партиции
+PARTITIONED_TABLES: Dict[str, str] = {
+    "orders": "created_at",
+    "status_history": "changed_at",
+}
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def list_partitions(db: Session, table: str) -> List[Dict]:
+    """
+    Присоединённые партиции таблицы: [{name, start, end, default}], по возрастанию start.
+    """
+    rows = db.execute(
+        text(
+            """
+            SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :table
+            """
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or "")
+        partitions.append({
+            "name": name,
+            "start": datetime.fromisoformat(match.group(1)).date() if match else None,
+            "end": datetime.fromisoformat(match.group(2)).date() if match else None,
+            "default": bound == "DEFAULT",
+        })
+    return sorted(partitions, key=lambda p: (p["start"] is None, p["start"] or date.min))
+
+
+def ensure_partitions(
+    db: Session,
+    table: str,
+    months_ahead: int,
+    today: Optional[date] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Создать недостающие партиции с текущего месяца на months_ahead вперёд.
+    Строки, успевшие попасть в DEFAULT-партицию за этот месяц, переносятся в новую.
+    Возвращает имена созданных партиций.
+    """
+    column = PARTITIONED_TABLES[table]
+    partitions = list_partitions(db, table)
+    existing = {p["start"] for p in partitions if p["start"]}
+    default = next((p["name"] for p in partitions if p["default"]), None)
+
+    created = []
+    first = month_start(today or date.today())
+    for offset in range(months_ahead + 1):
+        start = add_months(first, offset)
+        if start in existing:
+            continue
+        end = add_months(start, 1)
+        name = partition_name(table, start)
+        created.append(name)
+        if dry_run:
+            continue
+
+        bounds = {"start": start, "end": end}
+        stray = 0
+        if default:
+            stray = db.execute(
+                text(f'SELECT count(*) FROM "{default}" WHERE {column} >= :start AND {column} < :end'),
+                bounds,
+            ).scalar_one()
+
+        if stray:
+            # Новая партиция не создастся, пока подходящие строки лежат в DEFAULT:
+            # временно отсоединяем DEFAULT и переносим строки
+            db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{default}"'))
+        db.execute(
+            text(
+                f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+        if stray:
+            db.execute(
+                text(
+                    f'INSERT INTO "{table}" SELECT * FROM "{default}" '
+                    f"WHERE {column} >= :start AND {column} < :end"
+                ),
+                bounds,
+            )
+            db.execute(text(f'DELETE FROM "{default}" WHERE {column} >= :start AND {column} < :end'), bounds)
+            db.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT'))
+            logger.warning("В %s перенесено строк из %s: %s", name, default, stray)
+        db.commit()
+        logger.info("Создана партиция %s", name)
+    return created
+
+
+def detach_old_partitions(
+    db: Session,
+    table: str,
+    keep_months: int,
+    today: Optional[date] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Отсоединить партиции, целиком лежащие раньше, чем keep_months месяцев назад.
+    Партиции с неархивированными заказами пропускаются (см. _holds_live_orders).
+    Возвращает имена отсоединённых партиций.
+    """
+    cutoff = add_months(month_start(today or date.today()), -keep_months)
+    detached = []
+    for partition in list_partitions(db, table):
+        if partition["default"] or partition["end"] is None or partition["end"] > cutoff:
+            continue
+        if _holds_live_orders(db, table, partition["name"]):
+            logger.warning(
+                "Партиция %s не отсоединена: в ней остались неархивированные заказы", partition["name"]
+            )
+            continue
+        detached.append(partition["name"])
+        if dry_run:
+            continue
+        db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{partition["name"]}"'))
+        db.commit()
+        logger.info("Партиция %s отсоединена от %s", partition["name"], table)
+    return detached
+
+
+def _holds_live_orders(db: Session, table: str, name: str) -> bool:
+    """
+    Есть ли в партиции заказ, который ещё лежит в orders: для orders — любая
+    строка (архив удаляет заказы), для status_history — история такого заказа.
+    """
+    if table == "orders":
+        query = f'SELECT 1 FROM "{name}" LIMIT 1'
+    else:
+        query = (
+            f'SELECT 1 FROM "{name}" h '
+            "WHERE EXISTS (SELECT 1 FROM orders o WHERE o.id = h.order_id) LIMIT 1"
+        )
+    return db.execute(text(query)).first() is not None
+
+
+def maintain(
+    db: Session,
+    months_ahead: int = settings.PARTITION_MONTHS_AHEAD,
+    keep_months: int = settings.PARTITION_KEEP_MONTHS,
+    dry_run: bool = False,
+) -> Dict[str, Dict[str, List[str]]]:
+    result = {}
+    for table in PARTITIONED_TABLES:
+        result[table] = {
+            "created": ensure_partitions(db, table, months_ahead, dry_run=dry_run),
+            "detached": detach_old_partitions(db, table, keep_months, dry_run=dry_run),
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--keep-months", type=int, default=settings.PARTITION_KEEP_MONTHS)
+    parser.add_argument("--dry-run", action="store_true", help="только показать, что будет сделано")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with get_db() as db:
+        result = maintain(db, args.months_ahead, args.keep_months, dry_run=args.dry_run)
+
+    prefix = "[dry-run] " if args.dry_run else ""
+    for table, changes in result.items():
+        print(f"{prefix}{table}: создано {changes['created'] or '—'}, отсоединено {changes['detached'] or '—'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# paycharm/app/services/stock_service.py
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Mapping
+
+from sqlalchemy import Integer, String, column, update, values
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from paycharm.app.models import Product
+
+
+logger = logging.getLogger(__name__)
+
+# Код ошибки PostgreSQL deadlock_detected
+DEADLOCK_PGCODE = "40P01"
+RESERVE_ATTEMPTS = 3
+
+
+def lines_by_sku(items: Iterable[Mapping]) -> Dict[str, int]:
+    """
+    Сводим позиции заказа к {sku: суммарное количество}.
+    Позиции без SKU (не нашли в каталоге) пропускаем.
+    """
+    lines: Dict[str, int] = defaultdict(int)
+    for item in items:
+        sku = item["sku"] if isinstance(item, Mapping) else item.sku
+        quantity = item["quantity"] if isinstance(item, Mapping) else item.quantity
+        if sku and quantity > 0:
+            lines[sku] += quantity
+    return dict(lines)
+
+
+def reserve_stock(db: Session, lines: Mapping[str, int]) -> bool:
+    """
+    Атомарно списать остатки по всем позициям заказа: либо все, либо ничего.
+
+    В PostgreSQL это один запрос
+        UPDATE products SET stock_quantity = stock_quantity - req.qty
+        FROM (VALUES ...) AS req(sku, qty)
+        WHERE products.sku = req.sku AND products.stock_quantity >= req.qty
+    внутри SAVEPOINT: если обновилось меньше строк, чем позиций, откатываем
+    savepoint и возвращаем False. Транзакцию не коммитим — это делает вызывающий.
+
+    Блокировки строк products держатся до commit, поэтому резерв нужно делать
+    последним шагом перед commit, чтобы горячие SKU не выстраивали очередь.
+    """
+    if not lines:
+        return True
+
+    for attempt in range(1, RESERVE_ATTEMPTS + 1):
+        savepoint = db.begin_nested()
+        try:
+            reserved = _apply(db, lines, sign=-1)
+        except OperationalError as e:
+            savepoint.rollback()
+            if getattr(e.orig, "pgcode", None) != DEADLOCK_PGCODE or attempt == RESERVE_ATTEMPTS:
+                raise
+            logger.warning("Deadlock при резерве остатков, повтор %s: %s", attempt, dict(lines))
+            continue
+
+        if reserved != len(lines):
+            savepoint.rollback()
+            return False
+        savepoint.commit()
+        return True
+
+    return False
+
+
+def release_stock(db: Session, lines: Mapping[str, int]) -> None:
+    """
+    Вернуть зарезервированные остатки (например, при отмене заказа).
+    Транзакцию не коммитим — это делает вызывающий.
+    """
+    if lines:
+        _apply(db, lines, sign=1)
+
+
+def _apply(db: Session, lines: Mapping[str, int], sign: int) -> int:
+    """
+    Изменить stock_quantity на sign * qty по каждой позиции.
+    При списании (sign = -1) строки без достаточного остатка не трогаем.
+    Возвращает число обновлённых строк.
+    """
+    # Фиксированный порядок SKU — меньше шансов на взаимные блокировки
+    ordered = sorted(lines.items())
+
+    if db.get_bind().dialect.name == "postgresql":
+        req = values(
+            column("sku", String),
+            column("qty", Integer),
+            name="req",
+        ).data(ordered)
+        stmt = (
+            update(Product)
+            .where(Product.sku == req.c.sku)
+            .values(
+                stock_quantity=Product.stock_quantity + sign * req.c.qty,
+                # Остатки не меняют версию каталога (см. catalog_service)
+                updated_at=Product.updated_at,
+            )
+            .returning(Product.sku)
+            .execution_options(synchronize_session=False)
+        )
+        if sign < 0:
+            stmt = stmt.where(Product.stock_quantity >= req.c.qty)
+        return len(db.execute(stmt).all())
+
+    # Остальные СУБД (SQLite для локальных прогонов) — по запросу на позицию
+    updated = 0
+    for sku, qty in ordered:
+        stmt = (
+            update(Product)
+            .where(Product.sku == sku)
+            .values(
+                stock_quantity=Product.stock_quantity + sign * qty,
+                updated_at=Product.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if sign < 0:
+            stmt = stmt.where(Product.stock_quantity >= qty)
+        updated += db.execute(stmt).rowcount
+    return updated
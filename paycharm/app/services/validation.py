@@ -1,7 +1,14 @@
 # app/services/validation.py
 import re
-from typing import List, Dict, Tuple
-from paycharm.app.utils.product_catalog import PRODUCTS
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, List, Dict, Optional, Sequence, Tuple
+from paycharm.app.config import settings
+from paycharm.app.services.catalog_service import (
+    product_catalog,
+    MATCH_AMBIGUOUS,
+)
+from paycharm.app.utils.enums import OrderStatus
 
 EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 PHONE_RE = re.compile(r"^\+7\d{10}$")  # простой вариант РФ
@@ -19,34 +26,240 @@ def is_valid_phone(phone: str | None) -> bool:
     return bool(PHONE_RE.match(phone))
 
 
+# Поиск контактов в свободном тексте (без модели)
+EMAIL_IN_TEXT_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_IN_TEXT_RE = re.compile(
+    r"(?<![\d+])(?:\+7|8|7)[\s\-]*\(?\d{3}\)?[\s\-]*\d{3}[\s\-]*\d{2}[\s\-]*\d{2}(?!\d)"
+)
+
+
+def extract_email(text: str) -> Optional[str]:
+    """
+    Первый email в тексте или None.
+    """
+    match = EMAIL_IN_TEXT_RE.search(text or "")
+    return match.group(0) if match else None
+
+
+def extract_phone(text: str) -> Optional[str]:
+    """
+    Первый российский номер в тексте, приведённый к +7XXXXXXXXXX, или None.
+    "8 (916) 123-45-67" -> "+79161234567".
+    """
+    match = PHONE_IN_TEXT_RE.search(text or "")
+    if not match:
+        return None
+    digits = re.sub(r"\D", "", match.group(0))
+    return "+7" + digits[1:]
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """
+    Email для поиска клиента (orders.contact_email_norm): без пробелов, в нижнем регистре.
+    """
+    email = (email or "").strip().lower()
+    return email or None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    Телефон для поиска клиента (orders.contact_phone_norm): +7XXXXXXXXXX.
+    "8 (916) 123-45-67", "+7 916 1234567" и "9161234567" дают один номер;
+    не похоже на российский номер — None.
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 11 and digits[0] in "78":
+        digits = digits[1:]
+    if len(digits) != 10:
+        return None
+    return "+7" + digits
+
+
 def check_items_availability(items: List[Dict]) -> Tuple[bool, List[Dict]]:
     """
     items: [{name: str, quantity: int}]
-    return: (all_available, [ {name, quantity, available, unit_price} ])
+    return: (all_available, [ {name, sku, quantity, available, ambiguous,
+                               match_score, candidates, unit_price} ])
+
+    Название ищем в кэше каталога (products): сначала точно по названию/алиасу,
+    затем нечётко по триграммам. Если уверенного совпадения нет, но похожие
+    товары есть — позиция помечается ambiguous (а не "нет в наличии").
+    available — товар найден в каталоге; хватит ли остатка, решает reserve_stock.
     """
+    threshold = settings.PRODUCT_MATCH_THRESHOLD
     result = []
     all_available = True
     for item in items:
-        name = item["name"]
-        quantity = item["quantity"]
-        product = PRODUCTS.get(name)
-        available = bool(product and product.get("in_stock"))
-        if not available:
+        match = _prefetched_match(item) or product_catalog.resolve(item["name"], threshold=threshold)
+        priced = _priced_item(item, match)
+        if not priced["available"]:
             all_available = False
-        unit_price = product["price"] if product else 0
-        result.append(
-            {
-                "name": name,
-                "quantity": quantity,
-                "available": available,
-                "unit_price": unit_price,
-            }
-        )
+        result.append(priced)
     return all_available, result
 
 
-def calculate_total(items_with_prices: List[Dict]) -> float:
-    total = 0.0
+def prefetch_item_match(item: Dict) -> None:
+    """
+    Сопоставить позицию с каталогом, пока модель ещё дописывает ответ
+    (on_item в ai_parser) — check_items_availability возьмёт готовый результат.
+    """
+    name = item.get("name")
+    if isinstance(name, str) and name:
+        # Версию берём до resolve: если каталог перечитается между ними,
+        # совпадение лишь пересчитается лишний раз, а не останется устаревшим
+        version = product_catalog.version
+        item["_match"] = product_catalog.resolve(name, threshold=settings.PRODUCT_MATCH_THRESHOLD)
+        item["_match_version"] = version
+
+
+def _prefetched_match(item: Dict) -> Optional[Dict[str, Any]]:
+    """
+    Совпадение из prefetch_item_match, если каталог с тех пор не менялся.
+    Позиции живут в состоянии разговора между сообщениями — цена или товар
+    за это время могли измениться.
+    """
+    match = item.get("_match")
+    if match is None or item.get("_match_version") != product_catalog.version:
+        return None
+    return match
+
+
+def _priced_item(item: Dict, match: Dict[str, Any]) -> Dict:
+    """
+    Позиция заказа с данными из каталога (общая для одиночной и пакетной проверки).
+    """
+    product = match["product"]
+    return {
+        "name": product["name"] if product else item["name"],
+        "sku": product["sku"] if product else None,
+        "quantity": item["quantity"],
+        # Товар найден в каталоге; хватит ли остатка — решает резерв при создании заказа
+        "available": product is not None,
+        "ambiguous": match["status"] == MATCH_AMBIGUOUS,
+        "match_score": match["score"],
+        "candidates": match["candidates"],
+        "unit_price": product["price"] if product else Decimal("0"),
+    }
+
+
+def to_kopecks(amount) -> int:
+    """
+    Сумма в рублях (Decimal/int/str) -> целые копейки, с округлением до копейки.
+    """
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int((amount * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_kopecks(kopecks: int) -> Decimal:
+    return Decimal(kopecks).scaleb(-2)
+
+
+def calculate_total(items_with_prices: List[Dict]) -> Decimal:
+    """
+    Итоговая сумма заказа. Считаем в целых копейках, чтобы не копить ошибку.
+    """
+    total = 0
     for item in items_with_prices:
-        total += item["unit_price"] * item["quantity"]
-    return total
+        total += to_kopecks(item["unit_price"]) * item["quantity"]
+    return from_kopecks(total)
+
+
+def determine_status(email_ok: bool, phone_ok: bool, items_with_prices: List[Dict]) -> OrderStatus:
+    """
+    Статус нового заказа по результатам проверок.
+    Приоритет: нет в наличии > неоднозначный товар > плохие контакты.
+    """
+    status = OrderStatus.PENDING
+    if not email_ok or not phone_ok:
+        status = OrderStatus.INVALID_CONTACT
+    if any(item["ambiguous"] for item in items_with_prices):
+        status = OrderStatus.AMBIGUOUS_ITEMS
+    if any(not item["available"] and not item["ambiguous"] for item in items_with_prices):
+        status = OrderStatus.OUT_OF_STOCK
+    return status
+
+
+# ==========================
+#  Пакетная проверка (импорт/бэкфилл)
+# ==========================
+
+def validate_orders_batch(
+    emails: Sequence[Optional[str]],
+    phones: Sequence[Optional[str]],
+    items: Sequence[List[Dict]],
+) -> Dict[str, Any]:
+    """
+    Проверка и расчёт сразу для пачки уже распарсенных заказов.
+
+    На вход — колонки одинаковой длины: emails[i], phones[i], items[i] относятся
+    к i-му заказу. Каждый уникальный email/телефон проверяется регуляркой один раз,
+    каждое уникальное название товара сопоставляется с каталогом один раз,
+    суммы считаются в целых копейках.
+
+    Возвращает колонки:
+    {
+        "email_ok": [bool, ...],
+        "phone_ok": [bool, ...],
+        "items": [[{name, sku, quantity, available, ...}, ...], ...],
+        "total_kopecks": array("q"),
+        "status": [OrderStatus, ...],
+    }
+    Статусы совпадают с create_order_from_text до резерва остатков.
+    """
+    if not (len(emails) == len(phones) == len(items)):
+        raise ValueError("emails, phones и items должны быть одной длины")
+
+    email_ok = _match_column(EMAIL_RE, emails)
+    phone_ok = _match_column(PHONE_RE, phones)
+
+    # Сопоставление с каталогом — по уникальным названиям
+    threshold = settings.PRODUCT_MATCH_THRESHOLD
+    matches: Dict[str, Dict[str, Any]] = {}
+    for order_items in items:
+        for item in order_items:
+            name = item["name"]
+            if name not in matches:
+                matches[name] = product_catalog.resolve(name, threshold=threshold)
+
+    price_kopecks: Dict[str, int] = {}
+    for match in matches.values():
+        product = match["product"]
+        if product is not None and product["sku"] not in price_kopecks:
+            price_kopecks[product["sku"]] = to_kopecks(product["price"])
+
+    priced_column: List[List[Dict]] = []
+    total_kopecks = array("q", bytes(8 * len(items)))
+    status_column: List[OrderStatus] = []
+    for i, order_items in enumerate(items):
+        priced = [_priced_item(item, matches[item["name"]]) for item in order_items]
+        total = 0
+        for item in priced:
+            if item["sku"] is not None:
+                total += price_kopecks[item["sku"]] * item["quantity"]
+        priced_column.append(priced)
+        total_kopecks[i] = total
+        status_column.append(determine_status(email_ok[i], phone_ok[i], priced))
+
+    return {
+        "email_ok": email_ok,
+        "phone_ok": phone_ok,
+        "items": priced_column,
+        "total_kopecks": total_kopecks,
+        "status": status_column,
+    }
+
+
+def _match_column(pattern: "re.Pattern[str]", column: Sequence[Optional[str]]) -> List[bool]:
+    """
+    Проверка колонки строк регуляркой: каждое уникальное значение — один раз.
+    """
+    seen: Dict[Optional[str], bool] = {}
+    result: List[bool] = []
+    for value in column:
+        ok = seen.get(value)
+        if ok is None:
+            ok = bool(value) and bool(pattern.match(value))
+            seen[value] = ok
+        result.append(ok)
+    return result
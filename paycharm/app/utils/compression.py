@@ -0,0 +1,32 @@
+# app/utils/compression.py
+"""
+Сжатие редко читаемых текстов (исходные сообщения, сырые ответы модели) в zstd.
+
+zstandard импортируется при первом сжатии/распаковке: процессы, которые
+сырые тексты не трогают, за импорт не платят.
+"""
+from functools import lru_cache
+from typing import Optional
+
+# Тексты короткие, выигрыш от высоких уровней мал, а CPU на запись заказа тратится
+ZSTD_LEVEL = 6
+
+
+@lru_cache(maxsize=1)
+def _zstd():
+    import zstandard
+
+    return zstandard
+
+
+def compress_text(text: Optional[str]) -> Optional[bytes]:
+    if text is None:
+        return None
+    # Компрессор не потокобезопасен, а создать его дёшево — новый на каждый вызов
+    return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(text.encode("utf-8"))
+
+
+def decompress_text(data: Optional[bytes]) -> Optional[str]:
+    if data is None:
+        return None
+    return _zstd().ZstdDecompressor().decompress(bytes(data)).decode("utf-8")
@@ -0,0 +1,54 @@
+# app/utils/debouncer.py
+"""
+Склейка быстрых событий по ключу для asyncio.
+
+Клиент пишет заказ несколькими сообщениями подряд — вместо обработки каждого
+ждём delay секунд тишины в чате и отдаём все накопленные сообщения разом.
+"""
+import asyncio
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class Debouncer:
+    """
+    - on_flush(key, items) вызывается, когда по ключу delay секунд не было
+      новых событий, или сразу, если накопилось max_items
+    - таймеры живут только пока по ключу есть ожидающие события
+    """
+
+    def __init__(
+        self,
+        delay: float,
+        on_flush: Callable[[Hashable, List[Any]], None],
+        max_items: int = 20,
+    ):
+        self.delay = delay
+        self.on_flush = on_flush
+        self.max_items = max_items
+        self._pending: Dict[Hashable, List[Any]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+
+    def add(self, key: Hashable, item: Any) -> None:
+        items = self._pending.setdefault(key, [])
+        items.append(item)
+
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        if len(items) >= self.max_items:
+            self._flush(key)
+            return
+        loop = asyncio.get_running_loop()
+        self._timers[key] = loop.call_later(self.delay, self._flush, key)
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(key, None)
+        if items:
+            self.on_flush(key, items)
+
+    def pending(self) -> int:
+        return len(self._pending)
@@ -1,12 +1,74 @@
 # app/utils/enums.py
 from enum import Enum
+from typing import Dict, FrozenSet
 
 
 class OrderStatus(str, Enum):
+    RECEIVED = "received"  # текст принят, разбор ещё не выполнен
+    PARSE_FAILED = "parse_failed"  # разобрать текст не удалось
     PENDING = "pending"
     INVALID_CONTACT = "invalid_contact"
     OUT_OF_STOCK = "out_of_stock"
+    AMBIGUOUS_ITEMS = "ambiguous_items"  # не смогли однозначно сопоставить товар с каталогом
     CONFIRMED = "confirmed"
     SHIPPED = "shipped"
     DELIVERED = "delivered"
     CANCELLED = "cancelled"
+
+
+# Разрешённые переходы статусов: из ключа можно перейти в любой статус из значения.
+# Повторная установка того же статуса (например, чтобы сменить дату доставки)
+# разрешена всегда и отдельно в таблице не описывается.
+ALLOWED_TRANSITIONS: Dict[OrderStatus, FrozenSet[OrderStatus]] = {
+    OrderStatus.RECEIVED: frozenset({
+        OrderStatus.PARSE_FAILED,
+        OrderStatus.CANCELLED,
+    }),
+    OrderStatus.PARSE_FAILED: frozenset({
+        OrderStatus.RECEIVED,
+        OrderStatus.CANCELLED,
+    }),
+    OrderStatus.PENDING: frozenset({
+        OrderStatus.INVALID_CONTACT,
+        OrderStatus.OUT_OF_STOCK,
+        OrderStatus.CONFIRMED,
+        OrderStatus.CANCELLED,
+    }),
+    OrderStatus.INVALID_CONTACT: frozenset({
+        OrderStatus.PENDING,
+        OrderStatus.CONFIRMED,
+        OrderStatus.CANCELLED,
+    }),
+    OrderStatus.OUT_OF_STOCK: frozenset({
+        OrderStatus.PENDING,
+        OrderStatus.CONFIRMED,
+        OrderStatus.CANCELLED,
+    }),
+    OrderStatus.AMBIGUOUS_ITEMS: frozenset({
+        OrderStatus.PENDING,
+        OrderStatus.INVALID_CONTACT,
+        OrderStatus.OUT_OF_STOCK,
+        OrderStatus.CONFIRMED,
+        OrderStatus.CANCELLED,
+    }),
+    OrderStatus.CONFIRMED: frozenset({
+        OrderStatus.SHIPPED,
+        OrderStatus.CANCELLED,
+    }),
+    OrderStatus.SHIPPED: frozenset({
+        OrderStatus.DELIVERED,
+        OrderStatus.CANCELLED,
+    }),
+    # Финальные статусы
+    OrderStatus.DELIVERED: frozenset(),
+    OrderStatus.CANCELLED: frozenset(),
+}
+
+
+def can_transition(old: OrderStatus, new: OrderStatus) -> bool:
+    """
+    Можно ли перевести заказ из статуса old в статус new.
+    """
+    if old == new:
+        return True
+    return new in ALLOWED_TRANSITIONS.get(old, frozenset())
@@ -0,0 +1,116 @@
+# app/utils/fuzzy_match.py
+"""
+Нечёткий поиск названий товаров по триграммам.
+
+Модель возвращает названия как попало: "айфон 15", "iphone15", "Airpods pro 2".
+Индекс строится один раз при загрузке каталога, поиск — подсчёт общих
+триграмм по инвертированному индексу (без перебора всего каталога).
+"""
+import heapq
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, Hashable, List, Set, Tuple
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-zа-я]+")
+# Граница буквы и цифры: "iphone15" -> "iphone 15", "15pro" -> "15 pro"
+_LETTER_DIGIT_RE = re.compile(r"(?<=[a-zа-я])(?=\d)|(?<=\d)(?=[a-zа-я])")
+
+
+def normalize_name(text: str) -> str:
+    """
+    Нормализация названия: нижний регистр, ё -> е, только буквы/цифры,
+    цифры отделены от букв, одиночные пробелы.
+    """
+    text = text.casefold().replace("ё", "е")
+    text = _NON_ALNUM_RE.sub(" ", text)
+    text = _LETTER_DIGIT_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """
+    Триграммы как в pg_trgm: каждое слово дополняется двумя пробелами слева
+    и одним справа.
+    """
+    grams: Set[str] = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс: триграмма -> номера записей.
+
+    В одну запись кладём одно написание (название или алиас), ключ (например SKU)
+    может иметь несколько записей. Оценка — коэффициент Дайса по триграммам,
+    для ключа берём лучшую из его записей.
+
+    Кандидатов набираем только по «редким» триграммам (список записей не длиннее
+    max_postings): частые вроде "pro" или " 1" есть у половины каталога и
+    ничего не различают. Точную оценку считаем лишь для top_candidates лучших.
+    """
+
+    def __init__(self, max_postings: int = 1000, top_candidates: int = 50) -> None:
+        self.max_postings = max_postings
+        self.top_candidates = top_candidates
+        self._keys: List[Hashable] = []
+        self._grams: List[FrozenSet[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._exact: Dict[str, Hashable] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Hashable, text: str) -> None:
+        normalized = normalize_name(text)
+        if not normalized:
+            return
+        # Точное совпадение после нормализации не перетирает уже добавленное
+        self._exact.setdefault(normalized, key)
+
+        grams = trigrams(normalized)
+        entry_id = len(self._keys)
+        self._keys.append(key)
+        self._grams.append(frozenset(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry_id)
+
+    def search(self, text: str, limit: int = 3) -> List[Tuple[Hashable, float]]:
+        """
+        Лучшие ключи для text: [(key, score)], score от 0 до 1, по убыванию.
+        """
+        normalized = normalize_name(text)
+        if not normalized:
+            return []
+
+        exact_key = self._exact.get(normalized)
+
+        grams = trigrams(normalized)
+        postings = [self._postings[g] for g in grams if g in self._postings]
+        postings.sort(key=len)
+        rare = [p for p in postings if len(p) <= self.max_postings]
+        if not rare:
+            # Одни частые триграммы — берём хотя бы самые редкие из них
+            rare = postings[:2]
+
+        shared: Counter = Counter()
+        for entry_ids in rare:
+            shared.update(entry_ids)
+
+        best: Dict[Hashable, float] = {}
+        query_size = len(grams)
+        for entry_id, _ in shared.most_common(self.top_candidates):
+            entry_grams = self._grams[entry_id]
+            common = len(grams & entry_grams)
+            score = 2.0 * common / (query_size + len(entry_grams))
+            key = self._keys[entry_id]
+            if score > best.get(key, 0.0):
+                best[key] = score
+
+        if exact_key is not None:
+            best[exact_key] = 1.0
+
+        return heapq.nlargest(limit, best.items(), key=lambda kv: kv[1])
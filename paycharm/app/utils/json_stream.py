@@ -0,0 +1,104 @@
+# app/utils/json_stream.py
+"""
+Инкрементальный разбор JSON-объекта, который приходит кусками (стриминг модели).
+
+Полный JSON собирается как обычно, но элементы массива по ключу верхнего уровня
+(например, "items") отдаются в on_item, как только закрылась их скобка —
+не дожидаясь конца ответа.
+
+    parser = StreamingObjectParser("items", on_item=lambda item: ...)
+    for chunk in response:
+        parser.feed(chunk.text)
+    data = parser.close()   # dict, как json.loads(весь текст)
+"""
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+class StreamingObjectParser:
+    """
+    Сканер идёт по тексту один раз: помнит глубину вложенности, находится ли
+    внутри строки и какой ключ верхнего уровня сейчас заполняется.
+    Элементы массива-объекты разбираются json.loads по своей подстроке.
+    """
+
+    def __init__(self, array_key: str, on_item: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.array_key = array_key
+        self.on_item = on_item
+        self.items: List[Dict[str, Any]] = []
+        # Копии как пришли от модели: on_item может дописывать в элементы свои поля
+        self._originals: List[Dict[str, Any]] = []
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self._text += chunk
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start + 1:i]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and self._depth == 1:
+                self._key = self._last_string
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._key == self.array_key:
+                    self._in_array = True
+                elif c == "{" and self._depth == 3 and self._in_array:
+                    self._item_start = i
+            elif c in "}]":
+                if c == "}" and self._depth == 3 and self._item_start is not None:
+                    self._emit(text[self._item_start:i + 1])
+                    self._item_start = None
+                elif c == "]" and self._depth == 2:
+                    self._in_array = False
+                self._depth -= 1
+        self._pos = len(text)
+
+    def _emit(self, fragment: str) -> None:
+        try:
+            item = json.loads(fragment)
+        except json.JSONDecodeError:
+            # Необычный элемент — достанется из полного JSON в close()
+            return
+        self._originals.append(dict(item))
+        self.items.append(item)
+        if self.on_item is not None:
+            self.on_item(item)
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Полный объект. Элементы массива — те же объекты, что ушли в on_item,
+        чтобы вызывающий мог сохранить в них свои пометки.
+        """
+        data = json.loads(self._text)
+        if not isinstance(data, dict):
+            raise json.JSONDecodeError("ожидался JSON-объект", self._text, 0)
+        streamed = data.get(self.array_key)
+        if isinstance(streamed, list) and streamed == self._originals:
+            data[self.array_key] = self.items
+        return data
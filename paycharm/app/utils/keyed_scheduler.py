@@ -0,0 +1,100 @@
+# app/utils/keyed_scheduler.py
+"""
+Планировщик задач по ключу для asyncio.
+
+Задачи с одинаковым ключом (например, id клиента в Telegram) выполняются строго
+по очереди, задачи с разными ключами — параллельно (до max_concurrency сразу).
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class KeyedScheduler:
+    """
+    - у каждого ключа своя очередь не длиннее max_queue_per_key
+      (submit возвращает False, если очередь переполнена)
+    - очередь и её воркер живут, пока по ключу есть работа, и удаляются
+      после idle_seconds простоя — память не растёт с числом клиентов
+    - metrics() — глубины очередей и счётчики для логов/мониторинга
+    """
+
+    def __init__(
+        self,
+        max_queue_per_key: int = 20,
+        max_concurrency: int = 32,
+        idle_seconds: float = 60.0,
+    ):
+        self.max_queue_per_key = max_queue_per_key
+        self.idle_seconds = idle_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queues: Dict[Hashable, asyncio.Queue] = {}
+        self._workers: Dict[Hashable, asyncio.Task] = {}
+        self._running = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._evicted = 0
+
+    def submit(self, key: Hashable, job: Job) -> bool:
+        """
+        Поставить job (корутинную функцию без аргументов) в очередь ключа.
+        """
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.max_queue_per_key)
+            self._queues[key] = queue
+        try:
+            queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            return False
+
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._run_key(key, queue))
+        return True
+
+    async def _run_key(self, key: Hashable, queue: asyncio.Queue) -> None:
+        try:
+            while True:
+                try:
+                    job = await asyncio.wait_for(queue.get(), timeout=self.idle_seconds)
+                except asyncio.TimeoutError:
+                    # Между проверкой и удалением нет await — новая задача
+                    # не может проскочить в уже «выселенную» очередь
+                    if queue.empty():
+                        self._evicted += 1
+                        return
+                    continue
+
+                async with self._semaphore:
+                    self._running += 1
+                    try:
+                        await job()
+                        self._processed += 1
+                    except Exception as e:
+                        self._failed += 1
+                        logger.exception("Ошибка в задаче для ключа %s: %s", key, e)
+                    finally:
+                        self._running -= 1
+                        queue.task_done()
+        finally:
+            self._queues.pop(key, None)
+            self._workers.pop(key, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        depths = [queue.qsize() for queue in self._queues.values()]
+        return {
+            "keys": len(self._queues),
+            "queued": sum(depths),
+            "max_depth": max(depths, default=0),
+            "running": self._running,
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "evicted": self._evicted,
+        }
@@ -0,0 +1,174 @@
+# app/utils/logging_config.py
+"""
+Логирование ботов без блокировки event loop.
+
+Обработчики в event loop только кладут запись в очередь (QueueHandler),
+в stderr пишет отдельный поток (QueueListener). По дороге в очередь:
+
+- длинные сообщения (тексты клиентов) обрезаются до LOG_MAX_MESSAGE_CHARS
+- шумные логгеры прореживаются по LOG_SAMPLE_RATES: {"имя логгера": доля},
+  например 0.1 — пишется каждая десятая запись; WARNING и выше пишутся всегда
+- очередь ограничена LOG_QUEUE_SIZE: при переполнении записи отбрасываются
+  (и считаются), а не тормозят обработчик
+
+Вывод — JSON по строке на запись (LOG_JSON=false — обычный текст).
+
+    from paycharm.app.utils.logging_config import setup_logging
+    setup_logging()
+"""
+import atexit
+import copy
+import itertools
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from paycharm.app.config import settings
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Атрибуты LogRecord; всё остальное пришло через extra= и попадает в JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю rate записей логгера (и его потомков) ниже WARNING.
+    Детерминированно — каждую round(1 / rate)-ю, без случайности.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, itertools.count] = {}
+
+    def _rate(self, name: str) -> Optional[float]:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        counter = self._counters.setdefault(record.name, itertools.count())
+        return next(counter) % round(1 / rate) == 0
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler, который не ждёт места в очереди и обрезает текст записи.
+    Сообщение собирается здесь (аргументы могут измениться, пока запись в очереди),
+    форматирование и запись — в потоке QueueListener.
+    """
+
+    def __init__(self, log_queue: queue.Queue, max_message_chars: int):
+        super().__init__(log_queue)
+        self.max_message_chars = max_message_chars
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if len(message) > self.max_message_chars:
+            message = f"{message[:self.max_message_chars]}… (+{len(message) - self.max_message_chars} симв.)"
+        record = copy.copy(record)
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    json_output: Optional[bool] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+    max_message_chars: Optional[int] = None,
+) -> QueueListener:
+    """
+    Настроить корневой логгер процесса. Повторный вызов возвращает уже запущенный listener.
+    Параметры по умолчанию — из settings (LOG_*).
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(sys.stderr)
+    use_json = settings.LOG_JSON if json_output is None else json_output
+    output.setFormatter(JsonFormatter() if use_json else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(
+        log_queue,
+        max_message_chars=max_message_chars or settings.LOG_MAX_MESSAGE_CHARS,
+    )
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES if sample_rates is None else sample_rates))
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level or settings.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    # Дописать очередь при выходе
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging() -> None:
+    """
+    Дождаться записи всего, что в очереди, и остановить поток вывода.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """
+    Сколько записей отброшено из-за переполненной очереди (для метрик).
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            return handler.dropped
+    return 0
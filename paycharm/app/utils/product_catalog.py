@@ -1,13 +1,19 @@
 # app/utils/product_catalog.py
 
+# Стартовый каталог: им заполняется таблица products (см. catalog_service.seed_products).
+# Дальше цены и остатки меняем в базе, без передеплоя.
 PRODUCTS = {
     "iPhone 15": {
+        "sku": "IPHONE-15",
         "price": 100000,
-        "in_stock": True,
+        "stock_quantity": 100,
+        "aliases": ["айфон 15", "iphone15"],
     },
     "AirPods Pro": {
+        "sku": "AIRPODS-PRO",
         "price": 25000,
-        "in_stock": True,
+        "stock_quantity": 100,
+        "aliases": ["аирподс про", "airpods pro 2"],
     },
     # сюда можно добавлять товары
 }
@@ -0,0 +1,102 @@
+# app/utils/response_cache.py
+"""
+Кэш готовых ответов для asyncio с защитой от «толпы» (single-flight).
+
+Пока значение по ключу считается, остальные запросы с тем же ключом ждут
+тот же результат, а не запускают свой пересчёт. Хранилище — любой объект с
+get/set/pop/clear (по умолчанию TTLCache в памяти процесса; общий кэш,
+например Redis, подключается обёрткой с тем же интерфейсом).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from paycharm.app.utils.ttl_cache import TTLCache
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """
+    - get_or_compute(key, compute) — значение из кэша или один общий пересчёт
+    - invalidate(key) / invalidate() — пересчёт, начатый до инвалидации, в кэш
+      уже не попадёт. Из чужого потока (LISTEN, asyncio.to_thread) вызов
+      переносится в event loop кэша через call_soon_threadsafe: _inflight и
+      _stale меняются только в его потоке
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1000, store: Optional[Any] = None):
+        self.store = store if store is not None else TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Ключи, инвалидированные во время пересчёта: результат не сохраняем
+        self._stale: Set[Hashable] = set()
+        self._generation = 0
+        # Event loop, в котором идут пересчёты; запоминается при первом get_or_compute
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        value = self.store.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.joined += 1
+            # shield: отмена одного ожидающего не должна отменять общий пересчёт
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение получат ожидающие; помечаем его полученным,
+            # чтобы asyncio не ругался, если ожидающих не было
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            stale = key in self._stale
+            self._stale.discard(key)
+
+        if generation == self._generation and not stale:
+            self.store.set(key, value)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key: Hashable = _MISSING) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed() and not _runs_in(loop):
+            loop.call_soon_threadsafe(self._invalidate, key)
+        else:
+            self._invalidate(key)
+
+    def _invalidate(self, key: Hashable) -> None:
+        if key is _MISSING:
+            self._generation += 1
+            self.store.clear()
+        else:
+            if key in self._inflight:
+                self._stale.add(key)
+            self.store.pop(key, None)
+
+    def metrics(self) -> Dict[str, int]:
+        return {"size": len(self.store), "hits": self.hits, "misses": self.misses, "joined": self.joined}
+
+
+def _runs_in(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
@@ -0,0 +1,73 @@
+# app/utils/ttl_cache.py
+"""
+Ограниченный по размеру кэш со временем жизни записей.
+
+Память не растёт с числом ключей: при переполнении вытесняются самые давно
+использованные записи, просроченные удаляются при обращении и при вставке.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    - get/set/pop потокобезопасны (используются и из event loop, и из потоков)
+    - get продлевает «свежесть» записи для LRU, но не её срок жизни
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expired += 1
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            self._purge(now)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _purge(self, now: float) -> None:
+        # Самые старые записи — в начале; у большинства и срок истекает раньше
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at <= now:
+                del self._data[key]
+                self.expired += 1
+            elif len(self._data) > self.maxsize:
+                del self._data[key]
+                self.evicted += 1
+            else:
+                break
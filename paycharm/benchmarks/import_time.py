@@ -0,0 +1,117 @@
+# paycharm/benchmarks/import_time.py
+"""
+Время импорта модулей ботов и воркеров (холодный старт).
+
+Каждый модуль импортируется в отдельном процессе с `python -X importtime`,
+берётся лучшее из нескольких запусков. Проверяется, что при импорте не
+подтягиваются тяжёлые интеграции (Gemini SDK, gspread/google-auth, smtplib) —
+они должны грузиться только при первом использовании.
+
+    python -m paycharm.benchmarks.import_time
+    python -m paycharm.benchmarks.import_time --max-ms 400 paycharm.tg.admin_bot
+
+Код выхода 1 — тяжёлый модуль импортирован или превышен --max-ms
+(удобно для CI как регрессионная проверка).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = [
+    "paycharm.app.services.order_service",
+    "paycharm.app.services.intake_worker",
+    "paycharm.tg.admin_bot",
+    "paycharm.tg.manager_listener",
+]
+
+# Не должны импортироваться при загрузке модулей — только при первом вызове
+HEAVY_MODULES = [
+    "google.generativeai",
+    "gspread",
+    "google.oauth2",
+    "smtplib",
+]
+
+
+def measure(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """
+    Один холодный импорт. Возвращает (cumulative мс модуля, {имя: (self мкс, cumulative мкс)}).
+    """
+    env = dict(os.environ)
+    # Настройкам нужен DATABASE_URL; подключения при импорте быть не должно
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"Не удалось импортировать {module}: {tail[0]}")
+
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        # "import time:      1234 |       5678 |     package.module"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+
+    # Модуль и его родительские пакеты: "paycharm", "paycharm.tg", "paycharm.tg.admin_bot"
+    total_us = sum(cumulative for name, (_, cumulative) in modules.items() if _is_target(name, module))
+    return total_us / 1000, modules
+
+
+def _is_target(name: str, module: str) -> bool:
+    return name == module or module.startswith(name + ".")
+
+
+def run(modules: List[str], repeat: int, top: int, max_ms: float) -> bool:
+    ok = True
+    for module in modules:
+        best_ms, best_modules = None, {}
+        for _ in range(repeat):
+            total_ms, imported = measure(module)
+            if best_ms is None or total_ms < best_ms:
+                best_ms, best_modules = total_ms, imported
+
+        heavy = sorted(
+            name for name in best_modules
+            if any(name == h or name.startswith(h + ".") for h in HEAVY_MODULES)
+        )
+        print(f"{module}: {best_ms:.1f} мс, модулей: {len(best_modules)}")
+        heaviest = sorted(
+            ((name, times) for name, times in best_modules.items() if not _is_target(name, module)),
+            key=lambda kv: kv[1][1],
+            reverse=True,
+        )
+        for name, (_, cumulative_us) in heaviest[:top]:
+            print(f"    {cumulative_us / 1000:8.1f} мс  {name}")
+
+        if heavy:
+            ok = False
+            print(f"  ❌ при импорте загружены тяжёлые модули: {', '.join(heavy[:5])}")
+        if max_ms and best_ms > max_ms:
+            ok = False
+            print(f"  ❌ дольше порога {max_ms:.0f} мс")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="сколько самых тяжёлых импортов показать")
+    parser.add_argument("--max-ms", type=float, default=0, help="порог времени импорта (0 — не проверять)")
+    args = parser.parse_args()
+    if not run(args.modules, args.repeat, args.top, args.max_ms):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
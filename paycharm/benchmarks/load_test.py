@@ -0,0 +1,387 @@
+# paycharm/benchmarks/load_test.py
+"""
+Нагрузочный прогон слушателя менеджера без Telegram и без Gemini.
+
+Корпус реалистичных заказов (одним сообщением и по частям) прогоняется через
+tg/manager_listener.handle_new_message фейковыми сообщениями pyrogram. Весь путь
+настоящий — склейка сообщений, очередь клиента, сборка заказа, каталог, БД,
+резерв остатков, — кроме внешних сервисов:
+
+- Gemini заменён офлайн-разборщиком с задержкой --llm-latency (± --llm-jitter)
+- Google Sheets и SMTP — заглушки с задержками --sheets-latency / --smtp-latency
+- БД — из DATABASE_URL или --database-url (по умолчанию локальный SQLite-файл)
+
+Для каждого уровня параллельности (сколько клиентов пишут одновременно)
+печатается пропускная способность и p50/p95/p99 по этапам; ack — время до
+ответа "обрабатываем", total — до итогового ответа:
+
+    python -m paycharm.benchmarks.load_test --customers 300 --concurrency 1,16,64
+    python -m paycharm.benchmarks.load_test --database-url postgresql://... --json load.json
+
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from paycharm.benchmarks.stats import summarize
+
+DEFAULT_DATABASE_URL = "sqlite:///paycharm_load_test.db"
+
+# Этапы в порядке прохождения заказа
+STAGES = ["debounce", "queue_wait", "ack", "assemble", "db", "total", "sheets", "email"]
+
+ADDRESSES = [
+    "г. Москва, ул. Ленина 15, кв 44",
+    "Санкт-Петербург, Невский пр. 28, офис 3",
+    "Казань, ул. Баумана 7",
+    "Новосибирск, Красный проспект 101, кв 12",
+]
+GREETINGS = ["Здравствуйте!", "Добрый день.", "Привет", ""]
+
+_ADDRESS_RE = re.compile(r"адрес:\s*([^;\n]+)", re.IGNORECASE)
+_QUANTITY_RE = r"(\d+)\s*шт"
+# Размер куска стрима офлайн-модели, символов
+STREAM_CHUNK_CHARS = 24
+
+
+# ==========================
+#  Корпус сообщений
+# ==========================
+
+def build_corpus(size: int, split_ratio: float, seed: int) -> List[List[str]]:
+    """
+    size разговоров; каждый — список сообщений одного клиента.
+    split_ratio — доля заказов, присланных по частям (товары / адрес / контакты).
+    """
+    from paycharm.app.utils.product_catalog import PRODUCTS
+
+    rng = random.Random(seed)
+    names = []
+    for name, data in PRODUCTS.items():
+        names.append(name)
+        names.extend(data.get("aliases", []))
+
+    corpus = []
+    for n in range(size):
+        items = rng.sample(names, k=min(len(names), rng.randint(1, 2)))
+        items_text = ", ".join(f"{name} {rng.randint(1, 3)} шт" for name in items)
+        address = rng.choice(ADDRESSES)
+        email = f"client{n}@example.com"
+        phone = rng.choice(["+7", "8"]) + " 916 " + f"{rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}"
+
+        if rng.random() < split_ratio:
+            corpus.append([
+                f"{rng.choice(GREETINGS)} Хочу заказать: {items_text}".strip(),
+                f"адрес: {address}",
+                f"{phone}, {email}",
+            ])
+        else:
+            corpus.append([
+                f"{rng.choice(GREETINGS)} Хочу заказать: {items_text}; адрес: {address}; "
+                f"почта {email}, телефон {phone}".strip()
+            ])
+    return corpus
+
+
+# ==========================
+#  Заглушки внешних сервисов
+# ==========================
+
+class Timings:
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def add(self, stage: str, seconds: float) -> None:
+        # list.append атомарен — можно звать из потоков
+        self.stages[stage].append(seconds * 1000)
+
+
+def offline_genai(latency: float, jitter: float) -> SimpleNamespace:
+    """
+    Модуль-двойник google.generativeai: генерирует JSON заказа регулярками
+    по тексту пользователя после задержки, похожей на ответ модели.
+    С stream=True ответ приходит кусками, задержка делится между ними.
+    """
+    from paycharm.app.services.validation import extract_email, extract_phone
+    from paycharm.app.utils.product_catalog import PRODUCTS
+
+    patterns = []
+    for name, data in PRODUCTS.items():
+        for alias in [name, *data.get("aliases", [])]:
+            patterns.append((name, re.compile(re.escape(alias) + r"\s*" + _QUANTITY_RE, re.IGNORECASE)))
+
+    class OfflineModel:
+        def __init__(self, model_name: str, **kwargs):
+            self.model_name = model_name
+
+        def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+            delay = max(0.0, random.gauss(latency, jitter))
+            text = prompt.rsplit("Текст пользователя:\n", 1)[-1]
+
+            items = []
+            for name, pattern in patterns:
+                for match in pattern.finditer(text):
+                    items.append({"name": name, "quantity": int(match.group(1))})
+            address = _ADDRESS_RE.search(text)
+            data = {
+                "items": items,
+                "delivery_address": address.group(1).strip() if address else "",
+                "contact_email": extract_email(text) or "",
+                "contact_phone": extract_phone(text) or "",
+                "status": "pending",
+            }
+            raw = json.dumps(data, ensure_ascii=False)
+            if not stream:
+                time.sleep(delay)
+                return SimpleNamespace(text=raw)
+            return self._stream(raw, delay)
+
+        @staticmethod
+        def _stream(raw: str, delay: float):
+            pieces = [raw[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(raw), STREAM_CHUNK_CHARS)]
+            for piece in pieces:
+                time.sleep(delay / len(pieces))
+                yield SimpleNamespace(text=piece)
+
+    return SimpleNamespace(GenerativeModel=OfflineModel, configure=lambda **kwargs: None)
+
+
+def sink(stage: str, latency: float, timings: Timings) -> Callable[[Any], None]:
+    def call(order) -> None:
+        started = time.perf_counter()
+        time.sleep(latency)
+        timings.add(stage, time.perf_counter() - started)
+
+    return call
+
+
+def timed(stage: str, func: Callable, timings: Timings) -> Callable:
+    def call(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.add(stage, time.perf_counter() - started)
+
+    return call
+
+
+class FakeMessage:
+    """
+    Минимум pyrogram.types.Message, который использует слушатель.
+    """
+
+    def __init__(self, message_id: int, chat_id: int, text: str, on_reply: Callable[[str], None]):
+        self.id = message_id
+        self.text = text
+        self.caption = None
+        self.from_user = SimpleNamespace(id=chat_id)
+        self.chat = SimpleNamespace(id=chat_id)
+        self._on_reply = on_reply
+
+    async def reply(self, text: str, **kwargs) -> "FakeMessage":
+        self._on_reply(text)
+        return FakeMessage(self.id + 1_000_000, self.chat.id, text, self._on_reply)
+
+    async def edit_text(self, text: str, **kwargs) -> None:
+        self.text = text
+        self._on_reply(text)
+
+
+# ==========================
+#  Прогон
+# ==========================
+
+# Настоящие функции слушателя (до подмены обёртками) и задержки заглушек
+_ORIGINAL: Dict[str, Callable] = {}
+_SINK_LATENCY: Dict[str, float] = {}
+
+
+def prepare_database() -> None:
+    from sqlalchemy import update
+
+    from paycharm.app.database import get_db, get_engine
+    from paycharm.app.models import Base, Product
+    from paycharm.app.services.catalog_service import product_catalog, seed_products
+
+    Base.metadata.create_all(bind=get_engine())
+    with get_db() as db:
+        seed_products(db)
+        # Остатков хватает на весь прогон — меряем путь заказа, а не OUT_OF_STOCK
+        db.execute(update(Product).values(stock_quantity=10_000_000))
+        db.commit()
+    product_catalog.invalidate()
+
+
+async def run_level(
+    listener,
+    corpus: List[List[str]],
+    concurrency: int,
+    chat_base: int,
+    typing_gap: float,
+    timeout: float,
+) -> Dict[str, Any]:
+    timings = Timings()
+    first_seen: Dict[int, float] = {}
+    flushed_at: Dict[int, float] = {}
+
+    # Подменяем этапы слушателя обёртками с замером времени
+    listener.absorb_messages = timed("assemble", _ORIGINAL["absorb_messages"], timings)
+    listener.create_order_from_parsed = timed("db", _ORIGINAL["create_order_from_parsed"], timings)
+    listener.append_order_to_sheet = sink("sheets", _SINK_LATENCY["sheets"], timings)
+    listener.send_order_notification_email = sink("email", _SINK_LATENCY["email"], timings)
+
+    def on_flush(chat_id, batch):
+        now = time.perf_counter()
+        flushed_at[chat_id] = now
+        timings.add("debounce", now - first_seen.get(chat_id, now))
+        _ORIGINAL["submit_batch"](chat_id, batch)
+
+    async def process_messages(message, texts, user_id, chat_id):
+        timings.add("queue_wait", time.perf_counter() - flushed_at.get(chat_id, time.perf_counter()))
+        await _ORIGINAL["process_messages"](message, texts, user_id, chat_id)
+
+    listener.debouncer.on_flush = on_flush
+    listener.process_messages = process_messages
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {"ok": 0, "failed": 0, "timeout": 0, "asked": 0}
+
+    async def customer(index: int, messages: List[str]) -> None:
+        chat_id = chat_base + index
+        async with semaphore:
+            done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+            def on_reply(text: str) -> None:
+                if text == listener.ORDER_ACK_TEXT:
+                    timings.add("ack", time.perf_counter() - started)
+                elif text.startswith("✅") or text.startswith("❌"):
+                    if not done.done():
+                        done.set_result(text)
+                else:
+                    results["asked"] += 1
+
+            started = time.perf_counter()
+            first_seen[chat_id] = started
+            for n, text in enumerate(messages):
+                await listener.handle_new_message(None, FakeMessage(n + 1, chat_id, text, on_reply))
+                if n < len(messages) - 1:
+                    await asyncio.sleep(typing_gap)
+            try:
+                reply = await asyncio.wait_for(done, timeout)
+            except asyncio.TimeoutError:
+                results["timeout"] += 1
+                return
+            timings.add("total", time.perf_counter() - started)
+            results["ok" if reply.startswith("✅") else "failed"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(customer(i, messages) for i, messages in enumerate(corpus)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "customers": len(corpus),
+        "elapsed_s": elapsed,
+        "orders_per_s": results["ok"] / elapsed if elapsed else 0.0,
+        **results,
+        "stages_ms": {stage: summarize(values) for stage, values in timings.stages.items()},
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(
+        f"concurrency={result['concurrency']} customers={result['customers']}: "
+        f"{result['elapsed_s']:.1f} c, {result['orders_per_s']:.1f} заказов/с "
+        f"(ok={result['ok']} failed={result['failed']} timeout={result['timeout']} "
+        f"уточнений={result['asked']})"
+    )
+    print(f"    {'этап':<11} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  мс")
+    for stage in STAGES:
+        s = result["stages_ms"][stage]
+        if not s["count"]:
+            continue
+        print(f"    {stage:<11} {s['count']:>6} {s['p50']:>9.1f} {s['p95']:>9.1f} {s['p99']:>9.1f} {s['max']:>9.1f}")
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    # Слушатель импортируем после настройки окружения: settings читается при импорте
+    from paycharm.app.config import settings
+    from paycharm.app.services import ai_parser
+    from paycharm.tg import manager_listener as listener
+
+    settings.INTAKE_QUEUE_ENABLED = False
+    logging.getLogger().setLevel(logging.WARNING)
+
+    fake = offline_genai(args.llm_latency, args.llm_jitter)
+    ai_parser._genai = lambda: fake
+    listener.debouncer.delay = args.debounce
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+
+    _ORIGINAL.update(
+        absorb_messages=listener.absorb_messages,
+        create_order_from_parsed=listener.create_order_from_parsed,
+        submit_batch=listener.submit_batch,
+        process_messages=listener.process_messages,
+    )
+    _SINK_LATENCY.update(sheets=args.sheets_latency, email=args.smtp_latency)
+
+    await asyncio.to_thread(prepare_database)
+    corpus = build_corpus(args.customers, args.split_ratio, args.seed)
+
+    results = []
+    chat_base = 10**12 + int(time.time()) * 10**4  # новые чаты на каждый прогон
+    for level, concurrency in enumerate(args.concurrency):
+        result = await run_level(
+            listener,
+            corpus,
+            concurrency,
+            chat_base=chat_base + level * len(corpus),
+            typing_gap=args.typing_gap,
+            timeout=args.timeout,
+        )
+        print_report(result)
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 16, 64])
+    parser.add_argument("--split-ratio", type=float, default=0.3, help="доля заказов, присланных по частям")
+    parser.add_argument("--typing-gap", type=float, default=0.2, help="пауза между сообщениями клиента, с")
+    parser.add_argument("--debounce", type=float, default=0.5, help="окно склейки сообщений, с")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--sheets-latency", type=float, default=0.3)
+    parser.add_argument("--smtp-latency", type=float, default=0.2)
+    parser.add_argument("--threads", type=int, default=32, help="размер пула потоков event loop")
+    parser.add_argument("--timeout", type=float, default=60.0, help="сколько клиент ждёт ответа, с")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=None, help=f"по умолчанию DATABASE_URL или {DEFAULT_DATABASE_URL}")
+    parser.add_argument("--json", dest="json_path", default=None, help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+    results = asyncio.run(run(args))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
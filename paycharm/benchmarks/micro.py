@@ -0,0 +1,310 @@
+# paycharm/benchmarks/micro.py
+"""
+Микробенчмарки горячих функций order_service, метрик и форматирования админки.
+
+Перед замером база досеивается до --orders заказов (см. seed_orders.py),
+каждая функция вызывается, пока не наберётся --min-rounds вызовов и --min-time
+секунд. Результаты можно сохранить как baseline и сравнить с ним следующий
+прогон: медиана хуже baseline больше чем на --threshold — регрессия (код выхода 1).
+
+    python -m paycharm.benchmarks.micro --orders 100000 --save baseline-100k.json
+    # ... оптимизация ...
+    python -m paycharm.benchmarks.micro --orders 100000 --compare baseline-100k.json
+    python -m paycharm.benchmarks.micro -k metrics       # только совпадающие по имени
+
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from paycharm.benchmarks.stats import summarize
+
+# name -> setup(ctx) -> функция без аргументов, которую меряем
+BENCHMARKS: Dict[str, Callable[[SimpleNamespace], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+# ==========================
+#  Бенчмарки
+# ==========================
+
+PARSED_ORDER = {
+    "items": [{"name": "iPhone 15", "quantity": 1}, {"name": "айфон 15", "quantity": 1}],
+    "delivery_address": "г. Москва, ул. Ленина 15, кв 44",
+    "contact_email": "bench@example.com",
+    "contact_phone": "+79161234567",
+}
+
+
+@benchmark("order_service.create_order_from_text")
+def bench_create_order(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services import order_service
+
+    # Модель не вызываем: меряем валидацию, каталог, БД и резерв
+    order_service.parse_order_text_with_raw = lambda text, **kwargs: (dict(PARSED_ORDER), "{}")
+
+    def run():
+        with get_db() as db:
+            return order_service.create_order_from_text(db, "bench order")
+
+    return run
+
+
+@benchmark("order_service.set_order_status")
+def bench_set_status(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.order_service import create_order_from_parsed, set_order_status
+
+    # INVALID_CONTACT <-> PENDING: разрешённый переход туда-обратно без движения остатков
+    with get_db() as db:
+        order_id = create_order_from_parsed(db, {**PARSED_ORDER, "contact_email": ""}, raw_text="bench").id
+    state = {"status": "invalid_contact"}
+
+    def run():
+        state["status"] = "pending" if state["status"] == "invalid_contact" else "invalid_contact"
+        with get_db() as db:
+            return set_order_status(db, order_id, state["status"])
+
+    return run
+
+
+@benchmark("order_service.list_recent_orders")
+def bench_list_recent(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.order_service import list_recent_orders
+
+    def run():
+        with get_db() as db:
+            return list_recent_orders(db, limit=10)
+
+    return run
+
+
+@benchmark("order_queries.list_order_summaries")
+def bench_list_summaries(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.order_queries import list_order_summaries
+
+    def run():
+        with get_db() as db:
+            return list_order_summaries(db, limit=10)
+
+    return run
+
+
+@benchmark("order_queries.get_order_with_items")
+def bench_order_with_items(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.order_queries import get_order_with_items
+
+    order_id = _recent_orders_with_items(limit=1)[0].id
+
+    def run():
+        with get_db() as db:
+            return get_order_with_items(db, order_id)
+
+    return run
+
+
+@benchmark("metrics_service.get_sales_metrics")
+def bench_sales_metrics(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.metrics_service import get_sales_metrics
+
+    def run():
+        with get_db() as db:
+            return get_sales_metrics(db, days=30)
+
+    return run
+
+
+@benchmark("metrics_service.get_delivery_metrics")
+def bench_delivery_metrics(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.metrics_service import get_delivery_metrics
+
+    def run():
+        with get_db() as db:
+            return get_delivery_metrics(db, days=30)
+
+    return run
+
+
+@benchmark("validation.check_items_availability")
+def bench_items_availability(ctx):
+    from paycharm.app.services.validation import check_items_availability
+
+    items = [
+        {"name": "iPhone 15", "quantity": 1},   # точное
+        {"name": "айфон 15", "quantity": 2},    # алиас
+        {"name": "airpods pro2", "quantity": 1},  # нечёткое
+        {"name": "чехол для телефона", "quantity": 1},  # нет в каталоге
+    ]
+    check_items_availability(items)  # прогреть кэш каталога
+    return lambda: check_items_availability(items)
+
+
+@benchmark("admin_bot.format_order_short")
+def bench_format_short(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.order_queries import list_order_summaries
+    from paycharm.tg.admin_bot import format_order_short
+
+    with get_db() as db:
+        orders = list_order_summaries(db, limit=10)
+    return lambda: [format_order_short(order) for order in orders]
+
+
+@benchmark("admin_bot.format_order_full")
+def bench_format_full(ctx):
+    from paycharm.tg.admin_bot import format_order_full
+
+    orders = _recent_orders_with_items()
+    return lambda: [format_order_full(order) for order in orders]
+
+
+@benchmark("admin_bot.format_stats")
+def bench_format_stats(ctx):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.metrics_service import get_delivery_metrics, get_sales_metrics
+    from paycharm.tg.admin_bot import format_stats
+
+    with get_db() as db:
+        sales = get_sales_metrics(db, days=30)
+        delivery = get_delivery_metrics(db, days=30)
+    return lambda: format_stats(30, sales, delivery)
+
+
+def _recent_orders_with_items(limit: int = 10) -> List[Any]:
+    from sqlalchemy import func, select
+
+    from paycharm.app.database import get_db
+    from paycharm.app.models import Order
+    from paycharm.app.services.order_queries import get_orders_with_items
+
+    with get_db() as db:
+        last_id = db.execute(select(func.max(Order.id))).scalar_one()
+        return get_orders_with_items(db, range(last_id - limit + 1, last_id + 1))
+
+
+# ==========================
+#  Замер и сравнение
+# ==========================
+
+def measure(func: Callable[[], Any], min_rounds: int, min_time: float, max_rounds: int) -> Dict[str, float]:
+    func()  # прогрев: кэши, подготовленные запросы, ленивые импорты
+    timings: List[float] = []
+    started = time.perf_counter()
+    while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return {**summarize(timings), "min": min(timings)}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """
+    Печатает сравнение медиан с baseline. Возвращает False, если есть регрессии.
+    """
+    if baseline["meta"].get("orders") != results["meta"]["orders"]:
+        print(
+            f"⚠️  baseline снят на {baseline['meta'].get('orders')} заказах, "
+            f"текущий прогон — на {results['meta']['orders']}"
+        )
+
+    ok = True
+    print(f"{'бенчмарк':<40} {'baseline':>10} {'сейчас':>10} {'Δ':>8}")
+    for name, current in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            print(f"{name:<40} {'—':>10} {current['p50']:>10.3f} {'new':>8}")
+            continue
+        delta = (current["p50"] - base["p50"]) / base["p50"] if base["p50"] else 0.0
+        mark = ""
+        if delta > threshold:
+            mark, ok = "❌ медленнее", False
+        elif delta < -threshold:
+            mark = "✅ быстрее"
+        print(f"{name:<40} {base['p50']:>10.3f} {current['p50']:>10.3f} {delta:>+8.1%}  {mark}")
+    return ok
+
+
+def run(
+    orders: int,
+    selected: Optional[str],
+    min_rounds: int,
+    min_time: float,
+    max_rounds: int,
+) -> Dict[str, Any]:
+    from paycharm.app.database import get_engine
+    from paycharm.benchmarks.seed_orders import ensure_orders
+
+    total = ensure_orders(orders)
+    ctx = SimpleNamespace(orders=total)
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "orders": total,
+            "dialect": get_engine().dialect.name,
+            "python": platform.python_version(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "benchmarks": {},
+    }
+    print(f"orders={total} dialect={results['meta']['dialect']}, время в мс")
+    print(f"{'бенчмарк':<40} {'rounds':>7} {'min':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+    for name, setup in BENCHMARKS.items():
+        if selected and selected not in name:
+            continue
+        stats = measure(setup(ctx), min_rounds, min_time, max_rounds)
+        results["benchmarks"][name] = stats
+        print(
+            f"{name:<40} {stats['count']:>7} {stats['min']:>9.3f} {stats['p50']:>9.3f} "
+            f"{stats['p95']:>9.3f} {stats['max']:>9.3f}"
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10_000, help="размер набора: 10000 / 100000 / 1000000")
+    parser.add_argument("-k", dest="selected", default=None, help="только бенчмарки, содержащие подстроку")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=1.0, help="секунд на бенчмарк, не меньше")
+    parser.add_argument("--max-rounds", type=int, default=10_000)
+    parser.add_argument("--save", default=None, help="сохранить результаты (baseline) в JSON")
+    parser.add_argument("--compare", default=None, help="сравнить с baseline из JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="допустимое ухудшение медианы, доля")
+    args = parser.parse_args()
+
+    results = run(args.orders, args.selected, args.min_rounds, args.min_time, args.max_rounds)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Сохранено: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        if not compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# paycharm/benchmarks/seed_orders.py
+"""
+Синтетические заказы для бенчмарков: 10k / 100k / 1M.
+
+Заказы раскиданы по последним --days дням, статусы и сроки доставки похожи
+на реальные, у каждого заказа 1–3 позиции из каталога и запись в истории
+статусов. Вставка пачками через Core, без ORM-объектов.
+
+    python -m paycharm.benchmarks.seed_orders --orders 100000
+    python -m paycharm.benchmarks.seed_orders --orders 1000000 --until   # досеять до 1M
+
+Не запускайте на рабочей базе: заказы настоящие с точки зрения схемы.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from paycharm.app.database import get_db, get_engine
+from paycharm.app.models import Base, Order, OrderItem, OrderRawMessage, Product, StatusHistory
+from paycharm.app.services.catalog_service import seed_products
+from paycharm.app.services.order_queries import raw_search_text
+from paycharm.app.utils.compression import compress_text
+from paycharm.app.utils.enums import OrderStatus
+from paycharm.app.utils.product_catalog import PRODUCTS
+
+BATCH_SIZE = 10_000
+
+# Доли статусов среди синтетических заказов
+STATUS_WEIGHTS = [
+    (OrderStatus.DELIVERED, 40),
+    (OrderStatus.SHIPPED, 10),
+    (OrderStatus.CONFIRMED, 15),
+    (OrderStatus.PENDING, 15),
+    (OrderStatus.INVALID_CONTACT, 5),
+    (OrderStatus.OUT_OF_STOCK, 5),
+    (OrderStatus.CANCELLED, 10),
+]
+# У этих статусов есть ожидаемая дата доставки
+WITH_DELIVERY_DATE = {OrderStatus.CONFIRMED, OrderStatus.SHIPPED, OrderStatus.DELIVERED}
+RESERVED = {OrderStatus.PENDING, OrderStatus.INVALID_CONTACT, *WITH_DELIVERY_DATE}
+
+
+def prepare_schema(db: Session) -> None:
+    """
+    Таблицы (если базы ещё нет), каталог и остатки «без дна» —
+    бенчмарки не должны упираться в OUT_OF_STOCK.
+    """
+    Base.metadata.create_all(bind=get_engine())
+    seed_products(db)
+    db.execute(update(Product).values(stock_quantity=10_000_000, updated_at=Product.updated_at))
+    db.commit()
+
+
+def count_orders(db: Session) -> int:
+    return db.execute(select(func.count(Order.id))).scalar_one()
+
+
+def seed_orders(db: Session, count: int, days: int = 365, seed: int = 42) -> int:
+    """
+    Добавить count заказов. Возвращает число добавленных.
+    """
+    rng = random.Random(seed + count_orders(db))
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    catalog = [(name, data["sku"], Decimal(str(data["price"]))) for name, data in PRODUCTS.items()]
+
+    next_id = (db.execute(select(func.max(Order.id))).scalar() or 0) + 1
+    now = datetime.utcnow()
+    added = 0
+    while added < count:
+        size = min(BATCH_SIZE, count - added)
+        orders: List[Dict[str, Any]] = []
+        items: List[Dict[str, Any]] = []
+        history: List[Dict[str, Any]] = []
+        raw: List[Dict[str, Any]] = []
+
+        for order_id in range(next_id, next_id + size):
+            status = rng.choices(statuses, weights)[0]
+            created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+
+            total = Decimal("0")
+            lines = []
+            for name, sku, price in rng.sample(catalog, k=rng.randint(1, len(catalog))):
+                quantity = rng.randint(1, 3)
+                line_amount = price * quantity
+                total += line_amount
+                lines.append(name)
+                items.append({
+                    "order_id": order_id,
+                    "name": name,
+                    "sku": sku,
+                    "quantity": quantity,
+                    "unit_price": price,
+                    "line_amount": line_amount,
+                })
+
+            expected = actual = None
+            if status in WITH_DELIVERY_DATE:
+                expected = created_at + timedelta(days=rng.randint(2, 7))
+            if status == OrderStatus.DELIVERED:
+                actual = expected + timedelta(days=rng.randint(-2, 3))
+
+            orders.append({
+                "id": order_id,
+                "created_at": created_at,
+                "updated_at": actual or created_at,
+                "status": status.value,
+                "delivery_address": f"г. Москва, ул. Тестовая {order_id % 200 + 1}",
+                "contact_email": f"client{order_id % 50000}@example.com",
+                "contact_phone": f"+7916{order_id % 10_000_000:07d}",
+                "total_amount": total,
+                "expected_delivery_date": expected,
+                "actual_delivery_date": actual,
+                "stock_reserved": status in RESERVED,
+                "version": 1,
+            })
+            source_message = f"Хочу {', '.join(lines)}"
+            raw.append({
+                "order_id": order_id,
+                "created_at": created_at,
+                "source_message": compress_text(source_message),
+                "search_text": raw_search_text(source_message),
+            })
+            history.append({
+                "order_id": order_id,
+                "old_status": None,
+                "new_status": status.value,
+                "changed_at": created_at,
+                "comment": "Seeded for benchmarks",
+            })
+
+        db.execute(insert(Order.__table__), orders)
+        db.execute(insert(OrderItem.__table__), items)
+        db.execute(insert(StatusHistory.__table__), history)
+        db.execute(insert(OrderRawMessage.__table__), raw)
+        db.commit()
+
+        next_id += size
+        added += size
+
+    if get_engine().dialect.name == "postgresql":
+        # id вставляли явно — двигаем последовательность, иначе новые заказы упадут на PK
+        db.execute(text("SELECT setval(pg_get_serial_sequence('orders', 'id'), (SELECT max(id) FROM orders))"))
+        db.commit()
+    return added
+
+
+def ensure_orders(count: int, days: int = 365) -> int:
+    """
+    Досеять базу до count заказов. Возвращает итоговое число заказов.
+    """
+    with get_db() as db:
+        prepare_schema(db)
+        existing = count_orders(db)
+        if existing < count:
+            seed_orders(db, count - existing, days=days)
+        return max(existing, count)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365, help="за сколько дней раскидать заказы")
+    parser.add_argument("--until", action="store_true", help="досеять до --orders, а не добавить --orders")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.until:
+        total = ensure_orders(args.orders, days=args.days)
+        print(f"Заказов в базе: {total}")
+    else:
+        with get_db() as db:
+            prepare_schema(db)
+            added = seed_orders(db, args.orders, days=args.days)
+            total = count_orders(db)
+        print(f"Добавлено заказов: {added}, всего: {total}")
+    print(f"Время: {time.perf_counter() - started:.1f} c")
+
+
+if __name__ == "__main__":
+    main()
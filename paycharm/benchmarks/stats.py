@@ -0,0 +1,30 @@
+# paycharm/benchmarks/stats.py
+"""
+Общая статистика для бенчмарков: перцентили задержек.
+"""
+from __future__ import annotations
+
+import statistics
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """
+    {count, p50, p95, p99, max, mean} по списку значений (единицы — как у входа).
+    """
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values, default=0.0),
+        "mean": statistics.mean(values) if values else 0.0,
+    }
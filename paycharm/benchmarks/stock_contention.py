@@ -0,0 +1,100 @@
+# paycharm/benchmarks/stock_contention.py
+"""
+Бенчмарк конкуренции за остатки одного SKU (флеш-распродажа).
+
+Сотни потоков одновременно резервируют один и тот же товар через
+stock_service.reserve_stock, каждая попытка — отдельная транзакция.
+Проверяем, что не продали больше, чем было, и меряем пропускную способность
+и задержки.
+
+Запуск (нужна PostgreSQL из DATABASE_URL):
+
+    python -m paycharm.benchmarks.stock_contention --threads 200 --stock 1000 --orders 5000
+
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.orm import sessionmaker
+
+from paycharm.app.config import settings
+from paycharm.app.models import Product
+from paycharm.app.services.stock_service import reserve_stock
+from paycharm.benchmarks.stats import summarize
+
+
+def run(threads: int, stock: int, orders: int, quantity: int, extra_skus: int) -> None:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        pool_size=threads,
+        max_overflow=0,
+        future=True,
+    )
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+
+    run_id = uuid.uuid4().hex[:8]
+    hot_sku = f"BENCH-HOT-{run_id}"
+    cold_skus = [f"BENCH-COLD-{run_id}-{i}" for i in range(extra_skus)]
+
+    with Session() as db:
+        db.add(Product(sku=hot_sku, name=f"Bench hot {run_id}", aliases=[], price=1, stock_quantity=stock))
+        for sku in cold_skus:
+            db.add(Product(sku=sku, name=sku, aliases=[], price=1, stock_quantity=orders * quantity))
+        db.commit()
+
+    def one_order(n: int) -> Tuple[bool, float]:
+        lines = {hot_sku: quantity}
+        if cold_skus:
+            # Заказы из нескольких SKU в разном порядке — проверяем отсутствие дедлоков
+            lines[cold_skus[n % len(cold_skus)]] = 1
+        started = time.perf_counter()
+        with Session() as db:
+            ok = reserve_stock(db, lines)
+            db.commit()
+        return ok, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one_order, range(orders)))
+    elapsed = time.perf_counter() - started
+
+    with Session() as db:
+        left = db.execute(select(Product.stock_quantity).where(Product.sku == hot_sku)).scalar_one()
+        db.execute(delete(Product).where(Product.sku.in_([hot_sku, *cold_skus])))
+        db.commit()
+    engine.dispose()
+
+    succeeded = sum(1 for ok, _ in results if ok)
+    latencies_ms = [latency * 1000 for _, latency in results]
+    expected = min(orders, stock // quantity)
+
+    print(f"threads={threads} orders={orders} stock={stock} qty={quantity} extra_skus={extra_skus}")
+    print(f"  время:         {elapsed:.2f} c, {orders / elapsed:.0f} попыток/с")
+    print(f"  успешно:       {succeeded} (ожидалось {expected}), остаток {left}")
+    print("  задержка, мс:  p50={p50:.1f} p95={p95:.1f} p99={p99:.1f} max={max:.1f} mean={mean:.1f}".format(
+        **summarize(latencies_ms)
+    ))
+    if succeeded != expected or left != stock - succeeded * quantity:
+        raise SystemExit("❌ Остатки разошлись: продали больше, чем было, или потеряли резервы")
+    print("  ✅ лишнего не продали")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--extra-skus", type=int, default=0, help="добавлять в заказы второй SKU из N штук")
+    args = parser.parse_args()
+    run(args.threads, args.stock, args.orders, args.quantity, args.extra_skus)
+
+
+if __name__ == "__main__":
+    main()
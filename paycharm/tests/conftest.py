@@ -0,0 +1,23 @@
+# paycharm/tests/conftest.py
+import os
+import tempfile
+
+import pytest
+
+# settings читается при импорте, engine создаётся при первом обращении —
+# база теста задаётся до импорта приложения
+_DB_DIR = tempfile.mkdtemp(prefix="paycharm-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}")
+
+
+@pytest.fixture(scope="session")
+def database():
+    from paycharm.app.database import get_db, get_engine
+    from paycharm.app.models import Base
+    from paycharm.app.services.catalog_service import product_catalog, seed_products
+
+    Base.metadata.create_all(bind=get_engine())
+    with get_db() as db:
+        seed_products(db)
+    product_catalog.invalidate()
+    return get_engine()
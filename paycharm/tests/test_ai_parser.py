@@ -0,0 +1,50 @@
+# paycharm/tests/test_ai_parser.py
+from types import SimpleNamespace
+
+
+class FakeCache:
+    def __init__(self):
+        self.deleted = False
+
+    def delete(self):
+        self.deleted = True
+
+
+def _fake_genai(created):
+    def create(**kwargs):
+        cache = FakeCache()
+        created.append(cache)
+        return cache
+
+    return SimpleNamespace(
+        caching=SimpleNamespace(CachedContent=SimpleNamespace(create=create)),
+        GenerativeModel=SimpleNamespace(from_cached_content=lambda cached_content, **kwargs: object()),
+    )
+
+
+def test_replaced_context_cache_is_deleted_after_grace(monkeypatch):
+    from paycharm.app.services import ai_parser
+
+    created = []
+    catalog = [("Товар А",)]
+    clock = [1000.0]
+    monkeypatch.setattr(ai_parser, "_genai", lambda: _fake_genai(created))
+    monkeypatch.setattr(ai_parser, "_catalog_names", lambda: catalog[0])
+    monkeypatch.setattr(ai_parser.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(ai_parser.settings, "GEMINI_CONTEXT_CACHE", True)
+    monkeypatch.setattr(ai_parser.settings, "GEMINI_CONTEXT_CACHE_TTL_SECONDS", 3600)
+
+    holder = ai_parser._ModelHolder()
+    holder.get()
+    old = created[0]
+
+    # Каталог сменился: новая модель, но старый кэш ещё нужен запросам в полёте
+    catalog[0] = ("Товар А", "Товар Б")
+    holder.get()
+    assert len(created) == 2
+    assert not old.deleted
+
+    clock[0] += ai_parser.CONTEXT_CACHE_RETIRE_GRACE_SECONDS + 1
+    holder.get()
+    assert old.deleted
+    assert not created[1].deleted
@@ -0,0 +1,28 @@
+# paycharm/tests/test_api.py
+from fastapi.testclient import TestClient
+
+
+def test_create_and_get_order_json(database):
+    from paycharm.app.api.main import app
+    from paycharm.app.utils.product_catalog import PRODUCTS
+
+    name = next(iter(PRODUCTS))
+    client = TestClient(app)
+
+    response = client.post(
+        "/orders",
+        json={
+            "items": [{"name": name, "quantity": 2}],
+            "delivery_address": "г. Москва, ул. Ленина 15",
+            "contact_email": "client@example.com",
+            "contact_phone": "+79161234567",
+        },
+    )
+    assert response.status_code == 201, response.text
+    created = response.json()
+    assert created["items"][0]["name"] == name
+    assert created["items"][0]["quantity"] == 2
+
+    response = client.get(f"/orders/{created['id']}")
+    assert response.status_code == 200, response.text
+    assert response.json()["id"] == created["id"]
@@ -0,0 +1,27 @@
+# paycharm/tests/test_catalog_service.py
+from decimal import Decimal
+
+from sqlalchemy import text
+
+
+def test_raw_sql_price_change_is_picked_up_on_notify(database):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import Product
+    from paycharm.app.services.catalog_service import product_catalog
+
+    with get_db() as db:
+        db.add(Product(sku="TEST-PRICE", name="Тестовый товар цены", aliases=[], price=100, stock_quantity=1))
+        db.commit()
+    product_catalog.invalidate()
+    assert product_catalog.get_by_sku("TEST-PRICE")["price"] == Decimal("100")
+
+    # Правка из psql: updated_at не меняется, версия каталога та же
+    with get_db() as db:
+        db.execute(text("UPDATE products SET price = 150 WHERE sku = 'TEST-PRICE'"))
+        db.commit()
+    product_catalog.invalidate()
+    assert product_catalog.get_by_sku("TEST-PRICE")["price"] == Decimal("100")
+
+    # NOTIFY от триггера products_notify перечитывает каталог без сверки версии
+    product_catalog.invalidate(force=True)
+    assert product_catalog.get_by_sku("TEST-PRICE")["price"] == Decimal("150")
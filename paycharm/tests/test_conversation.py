@@ -0,0 +1,28 @@
+# paycharm/tests/test_conversation.py
+import pytest
+
+
+@pytest.mark.parametrize("texts", [
+    ["как в прошлый раз"],
+    ["То же самое, пожалуйста!"],
+    ["Здравствуйте! Повторите мой последний заказ"],
+    ["то же самое", "что и в прошлый раз"],
+    ["ещё раз то же самое, спасибо"],
+])
+def test_repeat_request(texts):
+    from paycharm.app.services.conversation import is_repeat_request
+
+    assert is_repeat_request(texts)
+
+
+@pytest.mark.parametrize("texts", [
+    ["то же самое, но без чехла"],
+    ["как в прошлый раз, только на работу"],
+    ["как в прошлый раз, но 2 штуки"],
+    ["хочу айфон 15"],
+    ["то же самое " + "очень " * 20],
+])
+def test_not_repeat_request(texts):
+    from paycharm.app.services.conversation import is_repeat_request
+
+    assert not is_repeat_request(texts)
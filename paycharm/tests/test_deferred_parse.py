@@ -0,0 +1,33 @@
+# paycharm/tests/test_deferred_parse.py
+from datetime import datetime, timedelta
+
+
+def test_find_stale_orders(database):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import StatusHistory
+    from paycharm.app.services.deferred_parse import find_stale_orders
+    from paycharm.app.services.order_service import register_order_text
+    from paycharm.app.utils.enums import OrderStatus
+
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+    with get_db() as db:
+        fresh = register_order_text(db, "свежий заказ")
+        stale = register_order_text(db, "забытый заказ")
+        stale.created_at = long_ago
+        exhausted = register_order_text(db, "неразбираемый заказ")
+        exhausted.status = OrderStatus.PARSE_FAILED.value
+        db.add_all(
+            StatusHistory(order_id=exhausted.id, new_status=OrderStatus.PARSE_FAILED.value)
+            for _ in range(3)
+        )
+        db.flush()
+        exhausted.updated_at = long_ago
+        db.commit()
+
+        found = find_stale_orders(db, stale_seconds=60, max_attempts=3)
+        assert stale.id in found
+        assert fresh.id not in found
+        assert exhausted.id not in found
+
+        found = find_stale_orders(db, stale_seconds=60, max_attempts=4)
+        assert exhausted.id in found
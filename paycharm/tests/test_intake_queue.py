@@ -0,0 +1,24 @@
+# paycharm/tests/test_intake_queue.py
+
+
+def test_only_owner_completes_message(database):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import IntakeMessage
+    from paycharm.app.services.intake_queue import (
+        STATUS_DONE,
+        claim_messages,
+        complete_message,
+        enqueue_message,
+        extend_visibility,
+    )
+
+    with get_db() as db:
+        message_id = enqueue_message(db, "тест", telegram_user_id=777)
+        [message] = claim_messages(db, worker_id="a", visibility_timeout=60)
+        assert message.id == message_id
+
+        assert not extend_visibility(db, message_id, "b", 60)
+        assert not complete_message(db, message_id, order_id=None, worker_id="b")
+        assert extend_visibility(db, message_id, "a", 60)
+        assert complete_message(db, message_id, order_id=None, worker_id="a")
+        assert db.get(IntakeMessage, message_id).status == STATUS_DONE
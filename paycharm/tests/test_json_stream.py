@@ -0,0 +1,79 @@
+# paycharm/tests/test_json_stream.py
+import json
+
+from paycharm.app.utils.json_stream import StreamingObjectParser
+
+
+def _parse(chunks):
+    seen = []
+    parser = StreamingObjectParser("items", on_item=seen.append)
+    streamed_before_close = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        streamed_before_close.append(len(seen))
+    return parser.close(), seen, streamed_before_close
+
+
+def _by_char(text):
+    return list(text)
+
+
+def test_items_are_streamed_before_close():
+    text = '{"items": [{"name": "iPhone 15", "quantity": 1}, {"name": "AirPods", "quantity": 2}], "delivery_address": "Москва"}'
+    data, seen, counts = _parse(_by_char(text))
+
+    assert data == json.loads(text)
+    assert seen == [{"name": "iPhone 15", "quantity": 1}, {"name": "AirPods", "quantity": 2}]
+    # Первый элемент отдан сразу после своей скобки, задолго до конца ответа
+    assert counts[text.index("}")] == 1
+    assert data["items"][0] is seen[0]
+
+
+def test_escaped_quotes_and_braces_inside_strings():
+    text = (
+        '{"comment": "скобки } ] { [ и \\"кавычки\\"", '
+        '"items": [{"name": "Чехол \\"Люкс\\" {синий}", "quantity": 1}, '
+        '{"name": "обратный слеш \\\\", "quantity": 2}]}'
+    )
+    data, seen, _ = _parse(_by_char(text))
+
+    assert data == json.loads(text)
+    assert [item["name"] for item in seen] == ['Чехол "Люкс" {синий}', "обратный слеш \\"]
+
+
+def test_key_split_across_chunks():
+    text = '{"delivery_address": "items", "items": [{"name": "iPhone 15", "quantity": 1}]}'
+    split = text.index('"items": [') + 3
+    data, seen, _ = _parse([text[:split], text[split:]])
+
+    assert data == json.loads(text)
+    assert seen == [{"name": "iPhone 15", "quantity": 1}]
+
+
+def test_string_value_equal_to_key_does_not_open_array():
+    text = '{"note": "items", "other": [{"name": "x"}], "items": []}'
+    data, seen, _ = _parse(_by_char(text))
+
+    assert data == json.loads(text)
+    assert seen == []
+
+
+def test_nested_objects_inside_items():
+    text = (
+        '{"items": [{"name": "iPhone 15", "quantity": 1, '
+        '"options": {"color": "black", "extra": [{"name": "чехол"}]}}, '
+        '{"name": "AirPods", "quantity": 1}]}'
+    )
+    data, seen, _ = _parse(_by_char(text))
+
+    assert data == json.loads(text)
+    # Вложенные объекты — часть элемента, а не отдельные элементы
+    assert seen == json.loads(text)["items"]
+
+
+def test_items_array_without_objects():
+    for text in ('{"items": [], "contact_email": "a@b.ru"}', '{"items": ["iPhone", 2, null]}'):
+        data, seen, _ = _parse(_by_char(text))
+
+        assert data == json.loads(text)
+        assert seen == []
@@ -0,0 +1,108 @@
+# paycharm/tests/test_order_archive.py
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+
+def _add_order(db, created_at, status, total, delivered_late_days=None):
+    from paycharm.app.models import Order, OrderItem, OrderRawMessage, SheetRow, StatusHistory
+    from paycharm.app.utils.compression import compress_text
+
+    order = Order(created_at=created_at, updated_at=created_at, status=status, total_amount=total)
+    if delivered_late_days is not None:
+        order.expected_delivery_date = created_at + timedelta(days=2)
+        order.actual_delivery_date = order.expected_delivery_date + timedelta(days=delivered_late_days)
+    db.add(order)
+    db.flush()
+    db.add(OrderItem(order_id=order.id, name="iPhone 15", sku="IPH15", quantity=1, unit_price=total, line_amount=total))
+    db.add(StatusHistory(order_id=order.id, old_status=None, new_status=status, changed_at=created_at))
+    db.add(OrderRawMessage(order_id=order.id, created_at=created_at, source_message=compress_text("заказ")))
+    db.add(SheetRow(order_id=order.id, row_number=order.id + 1, row_hash="0" * 32))
+    return order
+
+
+@pytest.fixture
+def archive(database, tmp_path, monkeypatch):
+    """
+    Закрытые заказы десятидневной давности (архивируются) и открытый заказ
+    того же дня (остаётся в базе); метрики читают архив из tmp_path.
+    """
+    pytest.importorskip("pyarrow")
+    from paycharm.app.config import settings
+    from paycharm.app.database import get_db
+    from paycharm.app.utils.enums import OrderStatus
+
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    created = datetime.utcnow().replace(microsecond=0) - timedelta(days=10)
+    with get_db() as db:
+        closed = [
+            _add_order(db, created, OrderStatus.DELIVERED.value, Decimal("1000.50"), delivered_late_days=0),
+            _add_order(db, created + timedelta(hours=1), OrderStatus.DELIVERED.value, Decimal("250.25"), delivered_late_days=3),
+            _add_order(db, created + timedelta(days=1), OrderStatus.CANCELLED.value, Decimal("99.99")),
+        ]
+        kept = _add_order(db, created, OrderStatus.CONFIRMED.value, Decimal("10.00"))
+        db.commit()
+        ids = [order.id for order in closed]
+        kept_id = kept.id
+    # Граница архива — позже тестовых заказов, но раньше заказов других тестов
+    return tmp_path, created + timedelta(days=2), ids, kept_id
+
+
+def _remaining(db, ids):
+    from sqlalchemy import func, select
+
+    from paycharm.app.models import Order, OrderItem, OrderRawMessage, SheetRow, StatusHistory
+
+    return {
+        model.__tablename__: db.execute(select(func.count()).select_from(model).where(column.in_(ids))).scalar_one()
+        for model, column in (
+            (Order, Order.id),
+            (OrderItem, OrderItem.order_id),
+            (StatusHistory, StatusHistory.order_id),
+            (OrderRawMessage, OrderRawMessage.order_id),
+            (SheetRow, SheetRow.order_id),
+        )
+    }
+
+
+def test_archive_keeps_metrics_and_moves_rows_to_files(archive):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import Order
+    from paycharm.app.services.metrics_service import get_delivery_metrics, get_sales_metrics
+    from paycharm.app.services.order_archive import archive_orders
+
+    root, before, ids, kept_id = archive
+    with get_db() as db:
+        sales, delivery = get_sales_metrics(db), get_delivery_metrics(db)
+
+        totals = archive_orders(db, before)
+        assert totals == {"orders": 3, "order_items": 3, "status_history": 3}
+        assert set(_remaining(db, ids).values()) == {0}
+        assert db.get(Order, kept_id) is not None
+
+        assert get_sales_metrics(db) == sales
+        assert get_delivery_metrics(db) == delivery
+
+    for kind in ("orders", "order_items", "status_history"):
+        files = list((root / kind).glob("month=*/*.parquet"))
+        assert len(files) == 1, kind
+    assert not list(root.rglob("*.tmp"))
+
+
+def test_failed_commit_removes_files(archive, monkeypatch):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.order_archive import archive_orders
+
+    root, before, ids, _ = archive
+    with get_db() as db:
+        def failing_commit():
+            raise RuntimeError("commit failed")
+
+        monkeypatch.setattr(db, "commit", failing_commit)
+        with pytest.raises(RuntimeError):
+            archive_orders(db, before)
+
+        # Откат: заказы со всеми строками остались в базе
+        assert set(_remaining(db, ids).values()) == {len(ids)}
+    assert not [path for path in root.rglob("*") if path.is_file()]
@@ -0,0 +1,101 @@
+# paycharm/tests/test_order_service.py
+from sqlalchemy import update
+
+
+def _parsed(name: str) -> dict:
+    return {
+        "items": [{"name": name, "quantity": 1}],
+        "delivery_address": "г. Москва, ул. Ленина 15",
+        "contact_email": "client@example.com",
+        "contact_phone": "+79161234567",
+    }
+
+
+def test_restock_is_seen_without_catalog_refresh(database):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import Product
+    from paycharm.app.services.catalog_service import product_catalog
+    from paycharm.app.services.order_service import create_order_from_parsed
+    from paycharm.app.utils.enums import OrderStatus
+
+    with get_db() as db:
+        db.add(Product(sku="TEST-RESTOCK", name="Тестовый товар рестока", aliases=[], price=10, stock_quantity=0))
+        db.commit()
+    product_catalog.invalidate()
+
+    with get_db() as db:
+        order = create_order_from_parsed(db, _parsed("Тестовый товар рестока"), raw_text="тест")
+        assert order.status == OrderStatus.OUT_OF_STOCK.value
+
+        # Остатки меняются мимо версии каталога — кэш не сбрасывается
+        db.execute(
+            update(Product)
+            .where(Product.sku == "TEST-RESTOCK")
+            .values(stock_quantity=5, updated_at=Product.updated_at)
+        )
+        db.commit()
+
+        order = create_order_from_parsed(db, _parsed("Тестовый товар рестока"), raw_text="тест")
+        assert order.status == OrderStatus.PENDING.value
+        assert order.stock_reserved
+
+
+def test_redelivered_intake_message_creates_one_order(database):
+    from paycharm.app.database import get_db
+    from paycharm.app.services.order_service import create_order_from_parsed, get_intake_order
+
+    parsed = {**_parsed("iPhone 15"), "items": []}
+    with get_db() as db:
+        first = create_order_from_parsed(db, parsed, raw_text="тест", intake_message_id=9001)
+        second = create_order_from_parsed(db, parsed, raw_text="тест", intake_message_id=9001)
+        assert second.id == first.id
+        assert get_intake_order(db, 9001).id == first.id
+
+
+def _stock(db, sku):
+    from paycharm.app.models import Product
+
+    db.expire_all()
+    return db.query(Product).filter(Product.sku == sku).one().stock_quantity
+
+
+def test_status_changes_reserve_and_release_stock(database):
+    import pytest
+
+    from paycharm.app.database import get_db
+    from paycharm.app.models import Product
+    from paycharm.app.services.catalog_service import product_catalog
+    from paycharm.app.services.order_service import (
+        InsufficientStockError,
+        create_order_from_parsed,
+        set_order_status,
+    )
+    from paycharm.app.utils.enums import OrderStatus
+
+    with get_db() as db:
+        db.add(Product(sku="TEST-STATUS", name="Тестовый товар статусов", aliases=[], price=10, stock_quantity=1))
+        db.commit()
+    product_catalog.invalidate()
+
+    with get_db() as db:
+        order = create_order_from_parsed(db, _parsed("Тестовый товар статусов"), raw_text="тест")
+        assert order.stock_reserved
+        assert _stock(db, "TEST-STATUS") == 0
+
+        # Нет в наличии — резерв возвращается
+        order = set_order_status(db, order.id, OrderStatus.OUT_OF_STOCK.value)
+        assert not order.stock_reserved
+        assert _stock(db, "TEST-STATUS") == 1
+
+        # Остаток забрал другой заказ — подтвердить нельзя
+        other = create_order_from_parsed(db, _parsed("Тестовый товар статусов"), raw_text="тест")
+        assert other.stock_reserved
+        with pytest.raises(InsufficientStockError):
+            set_order_status(db, order.id, OrderStatus.CONFIRMED.value)
+        assert db.get(type(order), order.id).status == OrderStatus.OUT_OF_STOCK.value
+
+        # Другой заказ отменили — подтверждение списывает остаток
+        set_order_status(db, other.id, OrderStatus.CANCELLED.value)
+        order = set_order_status(db, order.id, OrderStatus.CONFIRMED.value)
+        assert order.stock_reserved
+        assert _stock(db, "TEST-STATUS") == 0
@@ -0,0 +1,29 @@
+# paycharm/tests/test_response_cache.py
+import asyncio
+import threading
+
+
+def test_invalidate_from_thread_drops_inflight_result():
+    from paycharm.app.utils.response_cache import ResponseCache
+
+    cache = ResponseCache(ttl=60)
+
+    async def scenario():
+        async def compute():
+            # Сброс из чужого потока посреди пересчёта
+            thread = threading.Thread(target=cache.invalidate, args=("key",))
+            thread.start()
+            await asyncio.to_thread(thread.join)
+            await asyncio.sleep(0)
+            return "old"
+
+        assert await cache.get_or_compute("key", compute) == "old"
+        assert cache.store.get("key") is None
+
+        async def fresh():
+            return "new"
+
+        assert await cache.get_or_compute("key", fresh) == "new"
+        assert cache.store.get("key") == "new"
+
+    asyncio.run(scenario())
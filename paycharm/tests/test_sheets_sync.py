@@ -0,0 +1,126 @@
+# paycharm/tests/test_sheets_sync.py
+from datetime import datetime, timedelta
+
+import pytest
+
+
+class FakeSheet:
+    """
+    Первый лист таблицы: колонка Order ID и дописанные строки, без сети.
+    """
+
+    title = "sheet1"
+
+    def __init__(self):
+        self.rows = [["Order ID"]]
+        self.calls = []
+
+    def col_values(self, column):
+        self.calls.append("col_values")
+        return [row[column - 1] for row in self.rows]
+
+    def append_rows(self, rows):
+        self.calls.append("append_rows")
+        first = len(self.rows) + 1
+        self.rows.extend(rows)
+        return {"updates": {"updatedRange": f"'{self.title}'!A{first}:J{len(self.rows)}"}}
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.batches = []
+
+    def values_batch_update(self, body):
+        self.batches.append(body)
+
+
+@pytest.fixture
+def sheets(database, monkeypatch):
+    from paycharm.app.database import get_db
+    from paycharm.app.integrations import sheets_sync
+
+    sheet, spreadsheet = FakeSheet(), FakeSpreadsheet()
+    monkeypatch.setattr(sheets_sync, "get_sheet", lambda created_at=None: sheet)
+    monkeypatch.setattr(sheets_sync, "get_spreadsheet", lambda: spreadsheet)
+    with get_db() as db:
+        sheets_sync.reset(db)
+    return sheet, spreadsheet
+
+
+def _new_order(db):
+    from paycharm.app.services.order_service import create_order_from_parsed
+
+    parsed = {
+        "items": [{"name": "iPhone 15", "quantity": 1}],
+        "delivery_address": "г. Москва, ул. Ленина 15",
+        "contact_email": "client@example.com",
+        "contact_phone": "+79161234567",
+    }
+    return create_order_from_parsed(db, parsed, raw_text="тест")
+
+
+def test_first_appended_row():
+    from paycharm.app.integrations.sheets_sync import _first_appended_row
+
+    assert _first_appended_row({"updates": {"updatedRange": "'2026-10'!A12:J14"}}) == 12
+    assert _first_appended_row({"updates": {"updatedRange": "Sheet1!A2:J2"}}) == 2
+    assert _first_appended_row({"updates": {}}) is None
+    assert _first_appended_row(None) is None
+
+
+def test_sync_appends_then_skips_unchanged_then_updates(sheets):
+    from paycharm.app.database import get_db
+    from paycharm.app.integrations.sheets_sync import sync_orders
+    from paycharm.app.models import Order, SheetRow
+
+    sheet, spreadsheet = sheets
+    with get_db() as db:
+        order_id = _new_order(db).id
+
+        totals = sync_orders(db, batch_size=2, overlap_seconds=3600)
+        assert totals["appended"] == totals["checked"] > 0
+        assert spreadsheet.batches == []
+        row_number = db.get(SheetRow, order_id).row_number
+        assert sheet.rows[row_number - 1][0] == str(order_id)
+
+        # Водяной знак не дальше now - overlap: те же заказы читаются снова,
+        # но хэши строк совпали — ни одного запроса к таблице
+        sheet.calls.clear()
+        totals = sync_orders(db, batch_size=2, overlap_seconds=3600)
+        assert totals["checked"] > 0
+        assert totals["updated"] == totals["appended"] == 0
+        assert sheet.calls == [] and spreadsheet.batches == []
+
+        db.get(Order, order_id).delivery_address = "г. Москва, ул. Тверская 1"
+        db.commit()
+        totals = sync_orders(db, batch_size=2, overlap_seconds=3600)
+        assert totals == {"checked": totals["checked"], "updated": 1, "appended": 0}
+        assert sheet.calls == []
+        [batch] = spreadsheet.batches
+        [data] = batch["data"]
+        assert data["range"] == f"'sheet1'!A{row_number}:J{row_number}"
+        assert data["values"][0][5] == "г. Москва, ул. Тверская 1"
+
+
+def test_watermark_never_passes_overlap_horizon(sheets):
+    from sqlalchemy import update
+
+    from paycharm.app.database import get_db
+    from paycharm.app.integrations.sheets_sync import SYNC_NAME, sync_orders
+    from paycharm.app.models import Order, SyncState
+
+    with get_db() as db:
+        old_id = _new_order(db).id
+        db.execute(
+            update(Order).where(Order.id == old_id).values(updated_at=datetime.utcnow() - timedelta(days=1))
+        )
+        db.commit()
+        _new_order(db)
+
+        started = datetime.utcnow()
+        sync_orders(db, batch_size=1, overlap_seconds=600)
+        state = db.get(SyncState, SYNC_NAME)
+        assert state.watermark <= datetime.utcnow() - timedelta(seconds=600)
+        # Недавние заказы остаются выше водяного знака и перечитываются
+        recent = db.query(Order).filter(Order.updated_at > started - timedelta(seconds=600)).all()
+        assert recent and all(order.updated_at > state.watermark for order in recent)
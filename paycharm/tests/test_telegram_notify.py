@@ -0,0 +1,63 @@
+# paycharm/tests/test_telegram_notify.py
+import asyncio
+
+
+class FailingClient:
+    def __init__(self, error):
+        self.error = error
+
+    async def send_message(self, chat_id, text):
+        raise self.error
+
+
+def _notification(order_id):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import StatusNotification
+
+    with get_db() as db:
+        row = StatusNotification(order_id=order_id, chat_id=42, old_status="pending", new_status="confirmed")
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+        db.expunge(row)
+    return row
+
+
+def _reload(row_id):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import StatusNotification
+
+    with get_db() as db:
+        return db.get(StatusNotification, row_id)
+
+
+def test_transient_error_is_retried_later(database):
+    from paycharm.app.integrations.telegram_notify import StatusNotifier
+
+    row = _notification(5001)
+    notifier = StatusNotifier(FailingClient(ConnectionError("timeout")), per_chat_interval=0, max_attempts=3)
+    assert asyncio.run(notifier._send_group([row])) == 0
+
+    row = _reload(row.id)
+    assert row.sent_at is None
+    assert row.attempts == 1
+    assert row.retry_after is not None
+
+    # Последняя попытка — событие бросаем
+    row.attempts = 2
+    asyncio.run(notifier._send_group([row]))
+    assert _reload(row.id).sent_at is not None
+
+
+def test_blocked_user_is_not_retried(database):
+    from pyrogram.errors import UserIsBlocked
+
+    from paycharm.app.integrations.telegram_notify import StatusNotifier
+
+    row = _notification(5002)
+    notifier = StatusNotifier(FailingClient(UserIsBlocked()), per_chat_interval=0)
+    asyncio.run(notifier._send_group([row]))
+
+    row = _reload(row.id)
+    assert row.sent_at is not None
+    assert row.attempts == 0
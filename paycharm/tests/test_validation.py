@@ -0,0 +1,106 @@
+# paycharm/tests/test_validation.py
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.mark.parametrize("phone, expected", [
+    ("+7 916 123-45-67", "+79161234567"),
+    ("8 (916) 123-45-67", "+79161234567"),
+    ("79161234567", "+79161234567"),
+    ("9161234567", "+79161234567"),
+    ("+1 916 123 45 67", None),
+    ("12345", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_phone(phone, expected):
+    from paycharm.app.services.validation import normalize_phone
+
+    assert normalize_phone(phone) == expected
+
+
+def test_prefetched_match_is_dropped_after_catalog_change(database):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import Product
+    from paycharm.app.services.catalog_service import product_catalog
+    from paycharm.app.services.validation import check_items_availability, prefetch_item_match
+
+    with get_db() as db:
+        db.add(Product(sku="TEST-PREFETCH", name="Тестовый товар разговора", aliases=[], price=100, stock_quantity=1))
+        db.commit()
+    product_catalog.invalidate()
+
+    # Позиция разобрана в первом сообщении разговора и ждёт адреса/телефона
+    item = {"name": "Тестовый товар разговора", "quantity": 1}
+    prefetch_item_match(item)
+    assert check_items_availability([item])[1][0]["unit_price"] == Decimal("100")
+
+    with get_db() as db:
+        db.query(Product).filter_by(sku="TEST-PREFETCH").one().price = 150
+        db.commit()
+    product_catalog.invalidate()
+
+    assert check_items_availability([item])[1][0]["unit_price"] == Decimal("150")
+
+
+def test_validate_orders_batch_matches_single_order_path(database):
+    from paycharm.app.database import get_db
+    from paycharm.app.models import Product
+    from paycharm.app.services.catalog_service import product_catalog
+    from paycharm.app.services.validation import (
+        calculate_total,
+        check_items_availability,
+        determine_status,
+        from_kopecks,
+        is_valid_email,
+        is_valid_phone,
+        validate_orders_batch,
+    )
+    from paycharm.app.utils.enums import OrderStatus
+
+    with get_db() as db:
+        db.add_all([
+            Product(sku="TEST-BATCH-DIME", name="Пакетный тестовый винтик", aliases=[], price=Decimal("0.10"), stock_quantity=100),
+            Product(sku="TEST-BATCH-ODD", name="Пакетная тестовая гайка", aliases=[], price=Decimal("19.99"), stock_quantity=100),
+            Product(sku="TEST-BATCH-RED", name="Пакетный кабель красный", aliases=[], price=Decimal("33.33"), stock_quantity=100),
+            Product(sku="TEST-BATCH-BLUE", name="Пакетный кабель синий", aliases=[], price=Decimal("33.34"), stock_quantity=100),
+        ])
+        db.commit()
+    product_catalog.invalidate()
+
+    screw = {"name": "Пакетный тестовый винтик", "quantity": 3}
+    nut = {"name": "Пакетная тестовая гайка", "quantity": 7}
+    cable = {"name": "Пакетный кабель", "quantity": 1}
+    unknown = {"name": "Совершенно неизвестная штуковина", "quantity": 2}
+    orders = [
+        ("client@example.com", "+79161234567", [screw, nut]),
+        ("not-an-email", "+79161234567", [screw]),
+        ("client@example.com", "8 916 123 45 67", [nut]),
+        (None, None, []),
+        ("client@example.com", "+79161234567", [screw, cable]),
+        ("client@example.com", "+79161234567", [unknown, nut]),
+        ("bad", "bad", [cable, unknown]),
+        ("client@example.com", "+79161234567", [nut, nut]),
+    ]
+    emails, phones, items = (list(column) for column in zip(*orders))
+
+    batch = validate_orders_batch(emails, phones, items)
+
+    for i, (email, phone, order_items) in enumerate(orders):
+        _, priced = check_items_availability(order_items)
+        email_ok, phone_ok = is_valid_email(email), is_valid_phone(phone)
+        assert batch["email_ok"][i] == email_ok
+        assert batch["phone_ok"][i] == phone_ok
+        assert batch["items"][i] == priced
+        assert from_kopecks(batch["total_kopecks"][i]) == calculate_total(priced)
+        assert batch["status"][i] == determine_status(email_ok, phone_ok, priced)
+
+    # Набор покрывает все ветки статусов и копеечное округление
+    assert set(batch["status"]) == {
+        OrderStatus.PENDING,
+        OrderStatus.INVALID_CONTACT,
+        OrderStatus.AMBIGUOUS_ITEMS,
+        OrderStatus.OUT_OF_STOCK,
+    }
+    assert from_kopecks(batch["total_kopecks"][0]) == Decimal("140.23")
@@ -1,35 +1,83 @@
+import asyncio
 import logging
+import re
 from contextlib import contextmanager
 from datetime import datetime
+from typing import List, Optional, Tuple
 
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
 from pyrogram.types import Message
 
 from paycharm.app.config import settings
-from paycharm.app.database import SessionLocal
+from paycharm.app.database import listen, new_session
 from paycharm.app.services.order_service import (
-    list_recent_orders,
-    get_order_by_id,
+    ORDERS_CHANNEL,
+    order_change_listeners,
     set_order_status,
+    InvalidStatusTransition,
+    OrderConcurrencyError,
 )
 from paycharm.app.services.metrics_service import (
     get_sales_metrics,
     get_delivery_metrics,
 )
+from paycharm.app.read_models import (
+    CustomerOrders,
+    OrderRawText,
+    OrderSearchHit,
+    OrderSummary,
+    OrderWithItems,
+)
+from paycharm.app.services.order_queries import (
+    SEARCH_MIN_QUERY_CHARS,
+    find_customer_orders,
+    find_orders,
+    get_order_raw_text,
+    get_order_with_items,
+    list_order_summaries,
+)
+from paycharm.app.utils.logging_config import setup_logging
+from paycharm.app.utils.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 
 @contextmanager
 def db_session():
-    db = SessionLocal()
+    db = new_session()
     try:
         yield db
     finally:
         db.close()
 
 
+# Готовые тексты ответов: /order <id> по id заказа, /stats по числу дней
+order_cache = ResponseCache(ttl=settings.ADMIN_CACHE_TTL_SECONDS, maxsize=settings.ADMIN_CACHE_MAX_ENTRIES)
+stats_cache = ResponseCache(ttl=settings.ADMIN_CACHE_TTL_SECONDS, maxsize=settings.ADMIN_CACHE_MAX_ENTRIES)
+
+
+def invalidate_order_responses(order_id: int) -> None:
+    """
+    Заказ создан или изменён: сбрасываем его карточку и всю статистику.
+    Вызывается из order_service (этот процесс, поток asyncio.to_thread) и по NOTIFY
+    (другие процессы, поток listen) — ResponseCache переносит сброс в event loop.
+    """
+    order_cache.invalidate(order_id)
+    stats_cache.invalidate()
+
+
+order_change_listeners.append(invalidate_order_responses)
+
+
+def _on_orders_notify(payload: str) -> None:
+    try:
+        invalidate_order_responses(int(payload))
+    except ValueError:
+        # Неизвестный формат — сбрасываем всё
+        order_cache.invalidate()
+        stats_cache.invalidate()
+
+
 def is_admin(message: Message) -> bool:
     """
     Простейшая проверка, что пишет именно админ.
@@ -55,69 +103,140 @@ def require_admin(func):
     return wrapper
 
 
-def format_order_short(order) -> str:
-    created_at = getattr(order, "created_at", None)
-    created_str = created_at.strftime("%Y-%m-%d %H:%M") if isinstance(created_at, datetime) else "—"
-    status = getattr(order, "status", "unknown")
-    total = getattr(order, "total_price", "?")
-    currency = getattr(order, "currency", "₽")
-    return f"#{order.id} | {created_str} | {status} | {total} {currency}"
+def _format_dt(value, fmt: str = "%Y-%m-%d %H:%M") -> str:
+    if isinstance(value, datetime):
+        return value.strftime(fmt)
+    return str(value) if value else "—"
 
 
-def format_order_full(order) -> str:
+def format_order_short(order: OrderSummary) -> str:
+    return f"#{order.id} | {_format_dt(order.created_at)} | {order.status} | {order.total_amount} ₽"
+
+
+def format_order_full(order: OrderWithItems) -> str:
     lines = [f"🧾 Заказ #{order.id}"]
-    created_at = getattr(order, "created_at", None)
-    created_str = created_at.strftime("%Y-%m-%d %H:%M") if isinstance(created_at, datetime) else "—"
-    status = getattr(order, "status", "unknown")
-    total = getattr(order, "total_price", "?")
-    currency = getattr(order, "currency", "₽")
-
-    lines.append(f"Дата создания: {created_str}")
-    lines.append(f"Статус: {status}")
-    lines.append(f"Сумма: {total} {currency}")
-
-    addr = getattr(order, "delivery_address", None)
-    if addr:
-        lines.append(f"Адрес: {addr}")
-
-    email = getattr(order, "contact_email", None)
-    phone = getattr(order, "contact_phone", None)
-    if email or phone:
+    lines.append(f"Дата создания: {_format_dt(order.created_at)}")
+    lines.append(f"Статус: {order.status}")
+    lines.append(f"Сумма: {order.total_amount} ₽")
+
+    if order.delivery_address:
+        lines.append(f"Адрес: {order.delivery_address}")
+
+    if order.contact_email or order.contact_phone:
         lines.append("Контакты:")
-        if email:
-            lines.append(f"  • Email: {email}")
-        if phone:
-            lines.append(f"  • Телефон: {phone}")
+        if order.contact_email:
+            lines.append(f"  • Email: {order.contact_email}")
+        if order.contact_phone:
+            lines.append(f"  • Телефон: {order.contact_phone}")
 
-    if getattr(order, "items", None):
+    if order.items:
         lines.append("")
         lines.append("Товары:")
         for item in order.items:
-            name = getattr(item, "name", "Товар")
-            qty = getattr(item, "quantity", 1)
-            price = getattr(item, "total_price", None)
-            if price is not None:
-                lines.append(f"  • {name} — {qty} шт, {price} {currency}")
-            else:
-                lines.append(f"  • {name} — {qty} шт")
+            lines.append(f"  • {item.name} — {item.quantity} шт, {item.line_amount} ₽")
 
     # Даты доставки
-    expected = getattr(order, "expected_delivery_date", None)
-    actual = getattr(order, "actual_delivery_date", None)
+    expected = order.expected_delivery_date
+    actual = order.actual_delivery_date
     if expected or actual:
         lines.append("")
         if expected:
-            if isinstance(expected, datetime):
-                expected_str = expected.strftime("%Y-%m-%d")
-            else:
-                expected_str = str(expected)
-            lines.append(f"Ожидаемая дата доставки: {expected_str}")
+            lines.append(f"Ожидаемая дата доставки: {_format_dt(expected, '%Y-%m-%d')}")
         if actual:
-            if isinstance(actual, datetime):
-                actual_str = actual.strftime("%Y-%m-%d")
-            else:
-                actual_str = str(actual)
-            lines.append(f"Фактическая дата доставки: {actual_str}")
+            lines.append(f"Фактическая дата доставки: {_format_dt(actual, '%Y-%m-%d')}")
+
+    return "\n".join(lines)
+
+
+# Лимит Telegram — 4096 символов на сообщение, оставляем запас на заголовки
+RAW_TEXT_LIMIT = 1800
+
+
+def _clip(text: str, limit: int = RAW_TEXT_LIMIT) -> str:
+    return text if len(text) <= limit else text[:limit] + f"… (+{len(text) - limit} симв.)"
+
+
+def format_order_raw(raw: OrderRawText) -> str:
+    lines = [f"📨 Заказ #{raw.order_id}: исходное сообщение", _clip(raw.source_message)]
+    lines.append("")
+    lines.append("🤖 Ответ модели:")
+    lines.append(_clip(raw.llm_response) if raw.llm_response else "—")
+    return "\n".join(lines)
+
+
+def format_customer(customer: CustomerOrders) -> str:
+    lines = [f"👤 Клиент {customer.contact}"]
+    lines.append(f"Заказов: {customer.orders_count}, на сумму {customer.total_spent} ₽ (без отменённых)")
+    lines.append(f"Последний заказ: {_format_dt(customer.last_order_at)}")
+    if customer.orders:
+        lines.append("")
+        lines.extend(format_order_short(order) for order in customer.orders)
+    return "\n".join(lines)
+
+
+# /find: результатов на страницу; номер страницы — последним словом "p=2"
+FIND_PAGE_SIZE = 10
+FIND_PAGE_RE = re.compile(r"^p=(\d+)$")
+
+
+def format_find_results(query: str, page: int, hits: List[OrderSearchHit], has_more: bool) -> str:
+    lines = [f"🔎 «{query}», стр. {page}:"]
+    for hit in hits:
+        line = format_order_short(hit.order)
+        if hit.delivery_address:
+            line += f" | {_clip(hit.delivery_address, 60)}"
+        lines.append(line)
+    if has_more:
+        lines.append("")
+        lines.append(f"Дальше: /find {query} p={page + 1}")
+    return "\n".join(lines)
+
+
+def format_stats(days: int, sales: dict, delivery: dict) -> str:
+    # Ожидаемый формат sales / delivery:
+    # sales = {
+    #   "total_revenue": ...,
+    #   "total_orders": ...,
+    #   "by_day": [{"date": date, "orders": int, "revenue": Decimal}, ...]
+    # }
+    # delivery = {
+    #   "avg_delay_days": ...,
+    #   "on_time": int,
+    #   "late": int,
+    #   "by_day": [...]
+    # }
+
+    lines = [f"📊 Статистика за последние {days} дней:"]
+
+    if sales:
+        lines.append("")
+        lines.append("💵 Продажи:")
+        total_rev = sales.get("total_revenue", 0)
+        total_orders = sales.get("total_orders", 0)
+        lines.append(f"  • Заказов: {total_orders}")
+        lines.append(f"  • Общая выручка: {total_rev}")
+
+        by_day = sales.get("by_day") or []
+        if by_day:
+            lines.append("  • По дням:")
+            for row in by_day:
+                d = row.get("date")
+                orders_count = row.get("orders")
+                revenue = row.get("revenue")
+                d_str = d.strftime("%Y-%m-%d") if hasattr(d, "strftime") else str(d)
+                lines.append(f"    - {d_str}: {orders_count} заказов, {revenue} ₽")
+
+    if delivery:
+        lines.append("")
+        lines.append("🚚 Доставка:")
+        avg_delay = delivery.get("avg_delay_days")
+        on_time = delivery.get("on_time")
+        late = delivery.get("late")
+
+        if avg_delay is not None:
+            lines.append(f"  • Среднее отклонение по доставке: {avg_delay:.2f} дн.")
+        if on_time is not None and late is not None:
+            lines.append(f"  • В срок: {on_time}, с задержкой: {late}")
 
     return "\n".join(lines)
 
@@ -142,6 +261,9 @@ async def cmd_start(client: Client, message: Message):
         "Доступные команды:\n"
         "/orders — последние заказы\n"
         "/order <id> — детали заказа\n"
+        "/order <id> raw — исходный текст и ответ модели\n"
+        "/customer <телефон|email> — заказы клиента\n"
+        "/find <текст> [p=N] — поиск по адресу, товарам и тексту заказа\n"
         "/set_status <id> <status> [YYYY-MM-DD] — сменить статус (и, опционально, дату доставки)\n"
         "/stats — метрики продаж и доставки\n"
     )
@@ -160,7 +282,7 @@ async def cmd_orders(client: Client, message: Message):
             pass
 
     with db_session() as db:
-        orders = list_recent_orders(db, limit=limit)
+        orders = list_order_summaries(db, limit=limit)
 
     if not orders:
         await message.reply("Пока нет заказов.")
@@ -176,9 +298,9 @@ async def cmd_orders(client: Client, message: Message):
 @admin_app.on_message(filters.command("order"))
 @require_admin
 async def cmd_order(client: Client, message: Message):
-    args = message.command  # ['/order', '123']
+    args = message.command  # ['/order', '123'] или ['/order', '123', 'raw']
     if len(args) < 2:
-        await message.reply("Использование: /order <id>")
+        await message.reply("Использование: /order <id> [raw]")
         return
 
     try:
@@ -187,14 +309,98 @@ async def cmd_order(client: Client, message: Message):
         await message.reply("ID заказа должен быть числом.")
         return
 
-    with db_session() as db:
-        order = get_order_by_id(db, order_id)
+    if len(args) >= 3 and args[2].lower() == "raw":
+        # Читается редко — без кэша, распаковка в потоке
+        text = await asyncio.to_thread(_order_raw_text, order_id)
+        await message.reply(text or f"Заказ #{order_id} не найден.")
+        return
 
-    if not order:
+    text = await order_cache.get_or_compute(
+        order_id, lambda: asyncio.to_thread(_order_text, order_id)
+    )
+    if text is None:
         await message.reply(f"Заказ #{order_id} не найден.")
         return
 
-    await message.reply(format_order_full(order))
+    await message.reply(text)
+
+
+def _order_text(order_id: int) -> Optional[str]:
+    with db_session() as db:
+        order = get_order_with_items(db, order_id)
+    return format_order_full(order) if order else None
+
+
+def _order_raw_text(order_id: int) -> Optional[str]:
+    with db_session() as db:
+        raw = get_order_raw_text(db, order_id)
+    return format_order_raw(raw) if raw else None
+
+
+@admin_app.on_message(filters.command("customer"))
+@require_admin
+async def cmd_customer(client: Client, message: Message):
+    """
+    /customer <телефон|email>
+
+    Телефон — в любом написании: +7 916 123-45-67, 89161234567, ...
+    """
+    args = message.command
+    if len(args) < 2:
+        await message.reply("Использование: /customer <телефон|email>")
+        return
+
+    contact = " ".join(args[1:])
+    customer = await asyncio.to_thread(_customer_orders, contact)
+    if customer is None:
+        await message.reply("Не похоже ни на телефон, ни на email.")
+        return
+    if not customer.orders_count:
+        await message.reply(f"Заказов клиента {customer.contact} не найдено.")
+        return
+
+    await message.reply(format_customer(customer))
+
+
+def _customer_orders(contact: str) -> Optional[CustomerOrders]:
+    with db_session() as db:
+        return find_customer_orders(db, contact)
+
+
+@admin_app.on_message(filters.command("find"))
+@require_admin
+async def cmd_find(client: Client, message: Message):
+    """
+    /find <текст> [p=N]
+
+    Примеры:
+      /find ленина 15
+      /find airpods p=2
+    """
+    args = message.command[1:]
+    page = 1
+    if args:
+        match = FIND_PAGE_RE.match(args[-1])
+        if match:
+            page = max(int(match.group(1)), 1)
+            args = args[:-1]
+
+    query = " ".join(args)
+    if len(query) < SEARCH_MIN_QUERY_CHARS:
+        await message.reply(f"Использование: /find <текст> [p=N], не короче {SEARCH_MIN_QUERY_CHARS} символов.")
+        return
+
+    hits, has_more = await asyncio.to_thread(_find_orders, query, page)
+    if not hits:
+        await message.reply(f"По запросу «{query}» ничего не найдено." if page == 1 else "Больше результатов нет.")
+        return
+
+    await message.reply(format_find_results(query, page, hits, has_more))
+
+
+def _find_orders(query: str, page: int) -> Tuple[List[OrderSearchHit], bool]:
+    with db_session() as db:
+        return find_orders(db, query, limit=FIND_PAGE_SIZE, offset=(page - 1) * FIND_PAGE_SIZE)
 
 
 @admin_app.on_message(filters.command("set_status"))
@@ -236,16 +442,21 @@ async def cmd_set_status(client: Client, message: Message):
                 new_status=new_status,
                 expected_delivery_date=expected_date,
             )
+        except OrderConcurrencyError:
+            await message.reply(
+                f"⏳ Заказ #{order_id} сейчас меняет кто-то другой, попробуйте ещё раз."
+            )
+            return
+        except InvalidStatusTransition as e:
+            await message.reply(f"Нельзя сменить статус: {e}")
+            return
         except Exception as e:
             logger.exception("Ошибка при смене статуса заказа: %s", e)
             await message.reply("Не удалось обновить статус заказа.")
             return
 
-    # Здесь предполагается, что set_order_status:
-    #   - обновляет БД
-    #   - обновляет Google Sheets
-    #   - шлёт уведомление пользователю (по telegram_user_id / chat_id)
-    # Если нет — можно реализовать это внутри order_service.py
+    # Клиенту уведомление уйдёт само: set_order_status пишет событие в outbox
+    # (status_notifications), а отправляет его manager_listener.
 
     await message.reply(f"✅ Статус заказа #{order.id} обновлён на '{order.status}'.")
 
@@ -265,58 +476,27 @@ async def cmd_stats(client: Client, message: Message):
         except ValueError:
             pass
 
+    # Несколько админов с одинаковым /stats ждут один пересчёт
+    text = await stats_cache.get_or_compute(days, lambda: asyncio.to_thread(_stats_text, days))
+    await message.reply(text)
+
+
+def _stats_text(days: int) -> str:
     with db_session() as db:
         sales = get_sales_metrics(db, days=days)
         delivery = get_delivery_metrics(db, days=days)
+    return format_stats(days, sales, delivery)
 
-    # Ожидаемый формат sales / delivery:
-    # sales = {
-    #   "total_revenue": ...,
-    #   "total_orders": ...,
-    #   "by_day": [{"date": date, "orders": int, "revenue": Decimal}, ...]
-    # }
-    # delivery = {
-    #   "avg_delay_days": ...,
-    #   "on_time": int,
-    #   "late": int,
-    #   "by_day": [...]
-    # }
-
-    lines = [f"📊 Статистика за последние {days} дней:"]
 
-    if sales:
-        lines.append("")
-        lines.append("💵 Продажи:")
-        total_rev = sales.get("total_revenue", 0)
-        total_orders = sales.get("total_orders", 0)
-        lines.append(f"  • Заказов: {total_orders}")
-        lines.append(f"  • Общая выручка: {total_rev}")
-
-        by_day = sales.get("by_day") or []
-        if by_day:
-            lines.append("  • По дням:")
-            for row in by_day:
-                d = row.get("date")
-                orders_count = row.get("orders")
-                revenue = row.get("revenue")
-                d_str = d.strftime("%Y-%m-%d") if hasattr(d, "strftime") else str(d)
-                lines.append(f"    - {d_str}: {orders_count} заказов, {revenue} ₽")
-
-    if delivery:
-        lines.append("")
-        lines.append("🚚 Доставка:")
-        avg_delay = delivery.get("avg_delay_days")
-        on_time = delivery.get("on_time")
-        late = delivery.get("late")
-
-        if avg_delay is not None:
-            lines.append(f"  • Среднее отклонение по доставке: {avg_delay:.2f} дн.")
-        if on_time is not None and late is not None:
-            lines.append(f"  • В срок: {on_time}, с задержкой: {late}")
-
-    await message.reply("\n".join(lines))
+async def main() -> None:
+    # Заказы создают и меняют другие процессы (слушатель, воркеры, API) —
+    # узнаём об этом по NOTIFY от триггера на orders
+    listen(ORDERS_CHANNEL, _on_orders_notify)
+    async with admin_app:
+        await idle()
 
 
 if __name__ == "__main__":
+    setup_logging()
     logger.info("Запуск admin_bot (kurigram/pyrogram)…")
-    admin_app.run()
+    admin_app.run(main())
@@ -1,63 +1,117 @@
+import asyncio
 import logging
 from contextlib import contextmanager
+from typing import Any, Coroutine, Dict, List, Optional, Set, Tuple
 
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
 from pyrogram.types import Message
 
 from paycharm.app.config import settings
-from paycharm.app.database import SessionLocal
-from paycharm.app.services.order_service import create_order_from_text
+from paycharm.app.database import new_session
+from paycharm.app.services.order_service import create_order_from_parsed
+from paycharm.app.services.catalog_service import start_catalog_listener
+from paycharm.app.services.conversation import (
+    absorb_messages,
+    conversation_llm_response,
+    conversation_text,
+    format_missing_request,
+    is_repeat_request,
+    missing_fields,
+    new_conversation,
+    repeat_order_parsed,
+)
+from paycharm.app.services.intake_queue import (
+    STATUS_DONE,
+    enqueue_message,
+    fetch_unsent_replies,
+    mark_reply_sent,
+)
+from paycharm.app.services.order_queries import (
+    get_last_customer_order,
+    get_order_with_items,
+    order_with_items_from_orm,
+)
+from paycharm.app.utils.debouncer import Debouncer
+from paycharm.app.utils.keyed_scheduler import KeyedScheduler
+from paycharm.app.utils.logging_config import dropped_records, setup_logging
+from paycharm.app.utils.ttl_cache import TTLCache
 from paycharm.app.integrations.google_sheets import append_order_to_sheet
 from paycharm.app.integrations.email_service import send_order_notification_email
+from paycharm.app.integrations.telegram_notify import StatusNotifier
+from paycharm.app.read_models import OrderWithItems
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+# Каждое входящее сообщение — отдельный логгер, чтобы прореживать его (LOG_SAMPLE_RATES)
+message_logger = logging.getLogger("paycharm.tg.manager_listener.messages")
+
+ORDER_FAILED_TEXT = (
+    "❌ Не удалось обработать заказ. "
+    "Проверьте, пожалуйста, корректность данных (товары, адрес, email, телефон) "
+    "или попробуйте ещё раз."
+)
+ORDER_QUEUED_TEXT = "📝 Заказ получен, обрабатываем — пришлём подтверждение через минуту."
+# Первый ответ сразу после паузы в переписке; потом редактируется итогом
+ORDER_ACK_TEXT = "⏳ Принято, обрабатываем…"
+
+NO_ITEMS_TEXT = (
+    "🤔 Не получилось понять, какие товары вы хотите заказать. "
+    "Напишите, пожалуйста, заказ одним сообщением: товары, количество, адрес и контакты."
+)
+
+TOO_MANY_MESSAGES_TEXT = "⏳ Вы прислали много сообщений подряд — подождите, пожалуйста, пока мы обработаем предыдущие."
+
+# Как часто слушатель проверяет, что воркеры обработали сообщения из очереди
+REPLY_POLL_SECONDS = 1.0
+# Как часто писать в лог метрики очередей по клиентам
+SCHEDULER_METRICS_SECONDS = 60.0
+
+scheduler = KeyedScheduler(
+    max_queue_per_key=settings.LISTENER_MAX_QUEUE_PER_USER,
+    max_concurrency=settings.LISTENER_MAX_CONCURRENCY,
+    idle_seconds=settings.LISTENER_IDLE_USER_SECONDS,
+)
+
+# Фоновые задачи слушателя: event loop держит на задачи только слабые ссылки,
+# без этого множества задачу может собрать GC посреди работы
+background_tasks: Set[asyncio.Task] = set()
+
+# Недособранные заказы по чатам: {chat_id: состояние из services/conversation.py}
+conversations = TTLCache(
+    maxsize=settings.CONVERSATION_MAX_CHATS,
+    ttl=settings.CONVERSATION_TTL_SECONDS,
+)
 
 
 @contextmanager
 def db_session():
     """Контекстный менеджер для сессии БД."""
-    db = SessionLocal()
+    db = new_session()
     try:
         yield db
     finally:
         db.close()
 
 
-def format_order_summary(order) -> str:
+def format_order_summary(order: OrderWithItems) -> str:
     """
     Красивый текст для ответа пользователю.
-    Предполагаем у order:
-      - id
-      - total_price
-      - currency (опционально)
-      - status
-      - items (relationship), у items: name, quantity
     """
     lines = [f"✅ Ваш заказ №{order.id} принят!"]
 
     # Состав заказа
-    if getattr(order, "items", None):
+    if order.items:
         lines.append("")
         lines.append("🧾 Состав заказа:")
         for item in order.items:
-            # предполагаем поля name и quantity
-            name = getattr(item, "name", "Товар")
-            qty = getattr(item, "quantity", 1)
-            lines.append(f"• {name} — {qty} шт")
+            lines.append(f"• {item.name} — {item.quantity} шт")
 
     # Итоговая сумма
-    total_price = getattr(order, "total_price", None)
-    currency = getattr(order, "currency", "₽")
-
-    if total_price is not None:
-        lines.append("")
-        lines.append(f"💰 Итоговая сумма: {total_price} {currency}")
+    lines.append("")
+    lines.append(f"💰 Итоговая сумма: {order.total_amount} ₽")
 
     # Статус
-    status = getattr(order, "status", "pending")
     lines.append("")
-    lines.append(f"📦 Текущий статус: {status}")
+    lines.append(f"📦 Текущий статус: {order.status}")
 
     lines.append("")
     lines.append("Мы свяжемся с вами, когда заказ будет обработан 🙌")
@@ -87,11 +141,18 @@ async def handle_new_message(client: Client, message: Message):
     Ловим новые личные сообщения на аккаунт менеджера.
 
     Поток:
-      1. Берём текст сообщения
-      2. Парсим и создаём заказ через create_order_from_text
-      3. Пишем заказ в Google Sheets
-      4. Шлём уведомление на email
-      5. Отвечаем пользователю суммой и статусом
+      1. Копим сообщения чата, пока клиент пишет (CONVERSATION_DEBOUNCE_SECONDS тишины)
+      2. Дозаполняем недособранный заказ чата: контакты — регулярками,
+         остальное — моделью, и только недостающие поля.
+         "То же самое, что в прошлый раз" — копия прошлого заказа клиента, без модели
+      3. Чего-то не хватает — просим прислать, иначе создаём заказ
+      4. Сразу отвечаем "принято, обрабатываем", а когда заказ создан —
+         редактируем этот ответ в итог с суммой и статусом
+      5. Пишем заказ в Google Sheets, шлём уведомление на email
+
+    С INTAKE_QUEUE_ENABLED пачка сообщений целиком уходит в очередь, заказ
+    создают воркеры (services/intake_worker.py), а ответ "обрабатываем"
+    в итог редактирует deliver_queued_replies.
     """
     if not (message.text or message.caption):
         await message.reply("Я вижу только медиа без текста, пришлите, пожалуйста, текст заказа 🙏")
@@ -101,45 +162,295 @@ async def handle_new_message(client: Client, message: Message):
     user_id = message.from_user.id
     chat_id = message.chat.id
 
-    logger.info("Получено новое сообщение от %s: %s", user_id, raw_text)
+    message_logger.info("Получено новое сообщение от %s: %s", user_id, raw_text)
 
-    with db_session() as db:
+    debouncer.add(chat_id, (message, raw_text, user_id))
+
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """
+    Запустить задачу в фоне, сохранив ссылку на неё до завершения.
+    Исключение задачи пишем в лог (иначе его никто не увидит).
+    """
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(_task_done)
+    return task
+
+
+def _task_done(task: asyncio.Task) -> None:
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Фоновая задача %s упала", task.get_name(), exc_info=task.exception())
+
+
+def submit_batch(chat_id: int, batch) -> None:
+    """
+    Пачка сообщений чата дождалась паузы — в очередь клиента.
+    Сообщения одного клиента обрабатываются строго по порядку,
+    разных клиентов — параллельно.
+    """
+    message, _, user_id = batch[-1]
+    texts = [text for _, text, _ in batch]
+    accepted = scheduler.submit(
+        user_id,
+        lambda: process_messages(message, texts, user_id, chat_id),
+    )
+    if not accepted:
+        logger.warning("Очередь клиента %s переполнена: %s", user_id, scheduler.metrics())
+        spawn(message.reply(TOO_MANY_MESSAGES_TEXT))
+
+
+debouncer = Debouncer(
+    delay=settings.CONVERSATION_DEBOUNCE_SECONDS,
+    on_flush=submit_batch,
+    max_items=settings.CONVERSATION_MAX_MESSAGES,
+)
+
+
+async def process_messages(message: Message, texts: List[str], user_id: int, chat_id: int) -> None:
+    """
+    message — последнее сообщение пачки, на него и отвечаем.
+
+    Ответ уходит сразу, до модели, и потом редактируется: клиент видит,
+    что заказ принят, а не ждёт молча, пока модель дописывает ответ.
+    """
+    if settings.INTAKE_QUEUE_ENABLED:
+        ack = await message.reply(ORDER_QUEUED_TEXT)
         try:
-            # ВАЖНО:
-            # предполагаем, что create_order_from_text умеет принимать
-            # telegram_user_id и telegram_chat_id (можно добавить эти поля в функцию)
-            order = create_order_from_text(
-                db=db,
-                raw_text=raw_text,
-                telegram_user_id=user_id,
-                telegram_chat_id=chat_id,
+            await asyncio.to_thread(_enqueue, "\n".join(texts), user_id, chat_id, message.id, ack.id)
+        except Exception as e:
+            logger.exception("Ошибка при постановке заказа в очередь: %s", e)
+            await _edit_reply(message, ack, ORDER_FAILED_TEXT)
+        return
+
+    ack = await message.reply(ORDER_ACK_TEXT)
+    try:
+        # БД и модель блокирующие — уводим из event loop
+        reply_text, order = await asyncio.to_thread(_assemble_order, texts, user_id, chat_id)
+    except Exception as e:
+        logger.exception("Ошибка при обработке заказа: %s", e)
+        await _edit_reply(message, ack, ORDER_FAILED_TEXT)
+        return
+
+    # Итог — клиенту сразу, Sheets и SMTP уже после ответа
+    await _edit_reply(message, ack, reply_text)
+    if order is not None:
+        await asyncio.to_thread(_notify_integrations, order)
+
+
+async def _edit_reply(message: Message, ack: Message, text: str) -> None:
+    """
+    Заменить текст ответа "обрабатываем"; не вышло (сообщение удалено,
+    истёк срок редактирования) — ответить новым сообщением.
+    """
+    try:
+        await ack.edit_text(text)
+    except Exception as e:
+        logger.warning("Не удалось отредактировать ответ %s: %s", ack.id, e)
+        await message.reply(text)
+
+
+def _assemble_order(texts: List[str], user_id: int, chat_id: int) -> Tuple[str, Optional[OrderWithItems]]:
+    """
+    Дозаполнить заказ чата новыми сообщениями; если собран — создать.
+    Возвращает текст ответа клиенту и созданный заказ (или None, если ждём данных).
+    """
+    state = conversations.get(chat_id)
+    if state is None and is_repeat_request(texts):
+        order = _repeat_last_order(texts, user_id, chat_id)
+        if order is not None:
+            return format_order_summary(order), order
+
+    state = state or new_conversation()
+    absorb_messages(state, texts)
+
+    missing = missing_fields(state)
+    exhausted = (
+        len(state["texts"]) >= settings.CONVERSATION_MAX_MESSAGES
+        or state["model_calls"] >= settings.CONVERSATION_MAX_MODEL_CALLS
+    )
+    if missing and not exhausted:
+        conversations.set(chat_id, state)
+        return format_missing_request(state, missing), None
+
+    conversations.pop(chat_id)
+    if not state["items"]:
+        # Лимит исчерпан, а товаров нет — заказ не соберётся, переписку забываем
+        logger.info(
+            "Переписка чата %s сброшена: %s сообщений, %s вызовов модели, товаров нет",
+            chat_id, len(state["texts"]), state["model_calls"],
+        )
+        return NO_ITEMS_TEXT, None
+
+    # Без контактов заказ создаём с тем, что есть — уточнит менеджер
+    logger.info(
+        "Заказ чата %s собран из %s сообщений за %s вызовов модели",
+        chat_id, len(state["texts"]), state["model_calls"],
+    )
+    order = _create_order(
+        state, conversation_text(state), user_id, chat_id, llm_response=conversation_llm_response(state)
+    )
+    return format_order_summary(order), order
+
+
+def _create_order(
+    parsed: Dict[str, Any],
+    raw_text: str,
+    user_id: int,
+    chat_id: int,
+    llm_response: Optional[str] = None,
+) -> OrderWithItems:
+    """
+    Создать заказ. Возвращает снимок заказа для ответа и интеграций.
+    """
+    with db_session() as db:
+        order = create_order_from_parsed(
+            db,
+            parsed,
+            raw_text=raw_text,
+            telegram_user_id=user_id,
+            telegram_chat_id=chat_id,
+            llm_response=llm_response,
+        )
+        # Дальше по конвейеру — снимок без сессии и ленивых связей
+        return order_with_items_from_orm(order)
+
+
+def _repeat_last_order(texts: List[str], user_id: int, chat_id: int) -> Optional[OrderWithItems]:
+    """
+    Повторить последний заказ клиента: те же товары, адрес и контакты,
+    цены и наличие — текущие. Прошлых заказов нет — None (разбираем как обычно).
+    """
+    with db_session() as db:
+        last = get_last_customer_order(db, user_id)
+        if last is None or not last.items:
+            return None
+        order = create_order_from_parsed(
+            db,
+            repeat_order_parsed(last),
+            raw_text="\n".join(texts),
+            telegram_user_id=user_id,
+            telegram_chat_id=chat_id,
+            comment=f"Repeat of order #{last.id}",
+        )
+        logger.info("Заказ чата %s — повтор заказа #%s без модели", chat_id, last.id)
+        return order_with_items_from_orm(order)
+
+
+def _notify_integrations(order: OrderWithItems) -> None:
+    """
+    Записать заказ в Google Sheets и отправить email. Ошибки только логируем:
+    заказ уже создан и клиенту ответили.
+    """
+    # Пишем в Google Sheets
+    try:
+        append_order_to_sheet(order)
+    except Exception as e:
+        logger.exception("Ошибка при записи заказа в Google Sheets: %s", e)
+
+    # Email уведомление админу/менеджеру
+    try:
+        send_order_notification_email(order)
+    except Exception as e:
+        logger.exception("Ошибка при отправке email уведомления: %s", e)
+
+
+def _enqueue(raw_text: str, user_id: int, chat_id: int, message_id: int, ack_message_id: Optional[int]) -> int:
+    with db_session() as db:
+        return enqueue_message(
+            db,
+            text=raw_text,
+            telegram_user_id=user_id,
+            telegram_chat_id=chat_id,
+            telegram_message_id=message_id,
+            ack_message_id=ack_message_id,
+        )
+
+
+def _collect_replies():
+    """
+    [(intake_id, chat_id, reply_to_message_id, ack_message_id, text)] для обработанных сообщений очереди.
+    """
+    replies = []
+    with db_session() as db:
+        for queued in fetch_unsent_replies(db):
+            text = ORDER_FAILED_TEXT
+            if queued.status == STATUS_DONE and queued.order_id is not None:
+                order = get_order_with_items(db, queued.order_id)
+                if order:
+                    text = format_order_summary(order)
+            replies.append(
+                (queued.id, queued.telegram_chat_id, queued.telegram_message_id, queued.ack_message_id, text)
             )
+    return replies
 
-            # Пишем в Google Sheets
-            try:
-                append_order_to_sheet(order)
-            except Exception as e:
-                logger.exception("Ошибка при записи заказа в Google Sheets: %s", e)
 
-            # Email уведомление админу/менеджеру
-            try:
-                send_order_notification_email(order)
-            except Exception as e:
-                logger.exception("Ошибка при отправке email уведомления: %s", e)
+def _mark_sent(intake_id: int) -> None:
+    with db_session() as db:
+        mark_reply_sent(db, intake_id)
 
-            # Ответ пользователю
-            reply_text = format_order_summary(order)
-            await message.reply(reply_text)
 
+async def deliver_queued_replies(client: Client) -> None:
+    """
+    Фоновая задача: отвечаем клиентам по сообщениям, которые разобрали воркеры.
+    Ответ "обрабатываем" редактируется в итог; если его нет — новое сообщение.
+    """
+    while True:
+        try:
+            replies = await asyncio.to_thread(_collect_replies)
+            for intake_id, chat_id, reply_to, ack_id, text in replies:
+                if chat_id is not None:
+                    await _deliver_reply(client, chat_id, reply_to, ack_id, text)
+                await asyncio.to_thread(_mark_sent, intake_id)
         except Exception as e:
-            logger.exception("Ошибка при обработке заказа: %s", e)
-            await message.reply(
-                "❌ Не удалось обработать заказ. "
-                "Проверьте, пожалуйста, корректность данных (товары, адрес, email, телефон) "
-                "или попробуйте ещё раз."
-            )
+            logger.exception("Ошибка при отправке ответов по очереди: %s", e)
+        await asyncio.sleep(REPLY_POLL_SECONDS)
+
+
+async def _deliver_reply(
+    client: Client, chat_id: int, reply_to: Optional[int], ack_id: Optional[int], text: str
+) -> None:
+    if ack_id is not None:
+        try:
+            await client.edit_message_text(chat_id, ack_id, text)
+            return
+        except Exception as e:
+            logger.warning("Не удалось отредактировать ответ %s в чате %s: %s", ack_id, chat_id, e)
+    await client.send_message(chat_id, text, reply_to_message_id=reply_to)
+
+
+async def log_scheduler_metrics() -> None:
+    while True:
+        await asyncio.sleep(SCHEDULER_METRICS_SECONDS)
+        logger.info(
+            "Очереди клиентов: %s, ждут паузы: %s чатов, недособранных заказов: %s, потеряно строк лога: %s",
+            scheduler.metrics(), debouncer.pending(), len(conversations), dropped_records(),
+        )
+
+
+async def main() -> None:
+    # Gemini SDK грузится лениво — проверяем ключ сразу, а не на первом заказе
+    if not settings.INTAKE_QUEUE_ENABLED and not settings.AI_KEY:
+        raise RuntimeError("AI_KEY не задан в .env. Укажи AI_KEY=... (ключ Gemini) и перезапусти.")
+    start_catalog_listener()
+    async with app:
+        if settings.INTAKE_QUEUE_ENABLED:
+            spawn(deliver_queued_replies(app))
+        # Клиенты пишут на аккаунт менеджера — с него же шлём уведомления о статусе
+        spawn(StatusNotifier(app).run())
+        spawn(log_scheduler_metrics())
+        try:
+            await idle()
+        finally:
+            # Циклы доставки — до остановки клиента, иначе они пишут в закрытую сессию
+            tasks = list(background_tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
 
 if __name__ == "__main__":
+    setup_logging()
     logger.info("Запуск слушателя менеджера (kurigram/pyrogram)…")
-    app.run()
+    app.run(main())